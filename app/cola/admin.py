@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Tarea
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nombre', 'estado', 'intentos', 'disponible_en', 'creada')
+    list_filter = ('estado', 'nombre')
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class ColaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'cola'
+
+    def ready(self):
+        # Registra las tareas definidas en el módulo `tareas` de cada app
+        autodiscover_modules('tareas')
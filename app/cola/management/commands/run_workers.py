@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from cola import trabajador
+
+
+def _proceso_trabajador(espera, una_vez):
+    detenido = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: detenido.set())
+    signal.signal(signal.SIGINT, lambda *args: detenido.set())
+    trabajador.trabajar(detenido.is_set, espera=espera, una_vez=una_vez)
+
+
+class Command(BaseCommand):
+    help = "Levanta un grupo de procesos que ejecutan las tareas de la cola local."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos', type=int, default=os.cpu_count() or 1,
+            help="Número de procesos trabajadores (por defecto, uno por CPU)."
+        )
+        parser.add_argument(
+            '--espera', type=float, default=1.0,
+            help="Segundos entre consultas cuando la cola está vacía."
+        )
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help="Termina cuando ya no quedan tareas disponibles."
+        )
+
+    def handle(self, *args, **options):
+        # Cada proceso abre sus propias conexiones
+        connections.close_all()
+
+        procesos = [
+            multiprocessing.Process(
+                target=_proceso_trabajador,
+                args=(options['espera'], options['una_vez']),
+                name=f'cola-{numero}',
+            )
+            for numero in range(options['procesos'])
+        ]
+        for proceso in procesos:
+            proceso.start()
+        self.stdout.write(f"{len(procesos)} trabajadores en ejecución.")
+
+        try:
+            for proceso in procesos:
+                proceso.join()
+        except KeyboardInterrupt:
+            for proceso in procesos:
+                proceso.terminate()
+            for proceso in procesos:
+                proceso.join()
+
+        self.stdout.write(self.style.SUCCESS("Trabajadores detenidos."))
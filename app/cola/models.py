@@ -0,0 +1,35 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Tarea(models.Model):
+    """
+    Trabajo pendiente de la cola local. Las tareas completadas se borran; las
+    que agotan sus intentos se quedan como 'fallida' (dead letter).
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('fallida', 'Fallida'),
+    ]
+
+    nombre = models.CharField(max_length=200)
+    argumentos = models.JSONField(default=dict)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    # No se toma antes de esta fecha (reintentos con espera)
+    disponible_en = models.DateTimeField(default=timezone.now)
+    # Tiempo de visibilidad: si el trabajador muere, otro la retoma después de esta fecha
+    bloqueada_hasta = models.DateTimeField(null=True, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'disponible_en'], name='tarea_estado_disponible_idx'),
+            models.Index(fields=['estado', 'bloqueada_hasta'], name='tarea_estado_bloqueo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.estado})"
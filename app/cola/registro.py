@@ -0,0 +1,64 @@
+"""
+Registro de tareas y encolado.
+
+    from cola.registro import tarea
+
+    @tarea
+    def procesar(publicacion_id):
+        ...
+
+    procesar.encolar(publicacion_id=pub.id)
+
+`encolar` inserta la fila en la transacción actual, así la tarea solo se
+vuelve visible para los trabajadores si la escritura que la originó se
+confirma. Con `COLA_SINCRONA = True` se ejecuta en el mismo proceso al
+confirmar la transacción (útil en desarrollo y pruebas).
+
+`espera` (un timedelta) retrasa la tarea: los trabajadores no la toman antes.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Tarea
+
+_tareas = {}
+
+
+class TareaNoRegistrada(KeyError):
+    """No hay ninguna función registrada con ese nombre."""
+
+
+def tarea(funcion=None, *, nombre=None, max_intentos=5):
+    def registrar(funcion):
+        clave = nombre or f'{funcion.__module__}.{funcion.__name__}'
+        _tareas[clave] = (funcion, max_intentos)
+        funcion.nombre_tarea = clave
+        funcion.encolar = lambda **argumentos: encolar(clave, **argumentos)
+        return funcion
+
+    if funcion is not None:
+        return registrar(funcion)
+    return registrar
+
+
+def obtener(nombre):
+    try:
+        return _tareas[nombre]
+    except KeyError:
+        raise TareaNoRegistrada(nombre) from None
+
+
+def encolar(nombre, espera=None, **argumentos):
+    funcion, max_intentos = obtener(nombre)
+
+    if getattr(settings, 'COLA_SINCRONA', False):
+        transaction.on_commit(lambda: funcion(**argumentos))
+        return None
+
+    return Tarea.objects.create(
+        nombre=nombre, argumentos=argumentos, max_intentos=max_intentos,
+        disponible_en=timezone.now() + (espera or timedelta()),
+    )
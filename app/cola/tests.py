@@ -0,0 +1,172 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+
+from . import trabajador
+from .models import Tarea
+from .registro import encolar, tarea
+
+# Lo que hicieron las tareas de prueba
+ejecutadas = []
+
+
+@tarea(nombre='cola.prueba.anotar')
+def anotar(valor):
+    ejecutadas.append(valor)
+
+
+@tarea(nombre='cola.prueba.fallar', max_intentos=2)
+def fallar():
+    raise RuntimeError('falla de prueba')
+
+
+class ProcesoEnLinea:
+    """
+    Sustituye a multiprocessing.Process en run_workers: corre el trabajador en
+    este mismo proceso, con la base de datos de pruebas.
+    """
+
+    def __init__(self, target, args, name):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.target(*self.args)
+
+    def join(self):
+        pass
+
+
+class ColaTests(TestCase):
+
+    def setUp(self):
+        ejecutadas.clear()
+
+    def disponible(self, tarea):
+        Tarea.objects.filter(pk=tarea.pk).update(disponible_en=timezone.now())
+
+    def test_reclamar_y_ejecutar(self):
+        creada = encolar('cola.prueba.anotar', valor=1)
+
+        reclamada = trabajador.reclamar()
+        self.assertEqual(reclamada.pk, creada.pk)
+        self.assertEqual((reclamada.estado, reclamada.intentos), ('en_proceso', 1))
+        # Apartada: nadie más la toma mientras no venza la visibilidad
+        self.assertIsNone(trabajador.reclamar())
+
+        self.assertTrue(trabajador.ejecutar(reclamada))
+        self.assertEqual(ejecutadas, [1])
+        self.assertFalse(Tarea.objects.exists())
+
+    def test_espera_retrasa_la_tarea(self):
+        encolar('cola.prueba.anotar', espera=timedelta(minutes=5), valor=1)
+        self.assertIsNone(trabajador.reclamar())
+
+    def test_reintento_con_espera_y_fallida(self):
+        creada = encolar('cola.prueba.fallar')
+
+        with self.assertLogs('cola.trabajador', 'WARNING'):
+            self.assertFalse(trabajador.ejecutar(trabajador.reclamar()))
+        creada.refresh_from_db()
+        self.assertEqual((creada.estado, creada.intentos), ('pendiente', 1))
+        self.assertIsNone(creada.bloqueada_hasta)
+        self.assertGreater(creada.disponible_en, timezone.now())
+        self.assertIn('falla de prueba', creada.ultimo_error)
+        self.assertIsNone(trabajador.reclamar())
+
+        # Segundo y último intento: queda como 'fallida' y ya no se reclama
+        self.disponible(creada)
+        with self.assertLogs('cola.trabajador', 'ERROR'):
+            self.assertFalse(trabajador.ejecutar(trabajador.reclamar()))
+        creada.refresh_from_db()
+        self.assertEqual((creada.estado, creada.intentos), ('fallida', 2))
+        self.disponible(creada)
+        self.assertIsNone(trabajador.reclamar())
+
+    def test_se_retoma_al_vencer_la_visibilidad(self):
+        creada = encolar('cola.prueba.anotar', valor=1)
+        trabajador.reclamar()
+
+        # El trabajador que la tenía murió
+        Tarea.objects.filter(pk=creada.pk).update(bloqueada_hasta=timezone.now() - timedelta(seconds=1))
+        retomada = trabajador.reclamar()
+        self.assertEqual((retomada.pk, retomada.intentos), (creada.pk, 2))
+        self.assertTrue(trabajador.ejecutar(retomada))
+        self.assertEqual(ejecutadas, [1])
+
+    def test_sin_intentos_al_retomar_va_a_fallidas(self):
+        creada = encolar('cola.prueba.fallar')
+        Tarea.objects.filter(pk=creada.pk).update(
+            estado='en_proceso', intentos=2, bloqueada_hasta=timezone.now() - timedelta(seconds=1)
+        )
+        with self.assertLogs('cola.trabajador', 'ERROR'):
+            self.assertFalse(trabajador.ejecutar(trabajador.reclamar()))
+        creada.refresh_from_db()
+        self.assertEqual(creada.estado, 'fallida')
+        self.assertIn('visibilidad', creada.ultimo_error)
+
+    def test_tarea_no_registrada_va_directo_a_fallidas(self):
+        creada = Tarea.objects.create(nombre='cola.prueba.no_existe')
+        with self.assertLogs('cola.trabajador', 'ERROR'):
+            trabajador.ejecutar(trabajador.reclamar())
+        creada.refresh_from_db()
+        self.assertEqual((creada.estado, creada.intentos), ('fallida', 1))
+
+    @override_settings(COLA_SINCRONA=True)
+    def test_cola_sincrona_ejecuta_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(encolar('cola.prueba.anotar', valor=1))
+            self.assertEqual(ejecutadas, [])
+        self.assertEqual(ejecutadas, [1])
+        self.assertFalse(Tarea.objects.exists())
+
+
+class RunWorkersTests(TransactionTestCase):
+    """
+    run_workers cierra las conexiones y el trabajador las renueva en cada
+    vuelta: fuera de la transacción de TestCase.
+    """
+
+    def setUp(self):
+        ejecutadas.clear()
+
+    def test_run_workers_una_vez_vacia_la_cola(self):
+        for valor in range(3):
+            encolar('cola.prueba.anotar', valor=valor)
+        fallida = encolar('cola.prueba.fallar')
+
+        salida = StringIO()
+        with mock.patch('multiprocessing.Process', ProcesoEnLinea), \
+                mock.patch('signal.signal'), self.assertLogs('cola.trabajador', 'WARNING'):
+            call_command('run_workers', procesos=1, una_vez=True, stdout=salida)
+
+        self.assertEqual(ejecutadas, [0, 1, 2])
+        self.assertEqual(list(Tarea.objects.values_list('pk', 'estado')), [(fallida.pk, 'pendiente')])
+        self.assertIn('Trabajadores detenidos.', salida.getvalue())
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class ReclamarConcurrenteTests(TransactionTestCase):
+
+    def test_salta_las_tareas_bloqueadas(self):
+        primera = encolar('cola.prueba.anotar', valor=1)
+        segunda = encolar('cola.prueba.anotar', valor=2)
+        reclamadas = []
+
+        def otro_trabajador():
+            reclamadas.append(trabajador.reclamar().pk)
+            connection.close()
+
+        # Otro trabajador tiene la primera a medio reclamar
+        with transaction.atomic():
+            Tarea.objects.select_for_update().get(pk=primera.pk)
+            hilo = threading.Thread(target=otro_trabajador)
+            hilo.start()
+            hilo.join()
+
+        self.assertEqual(reclamadas, [segunda.pk])
@@ -0,0 +1,111 @@
+"""
+Ciclo de los trabajadores de la cola: reclamar una tarea, ejecutarla y
+registrar el resultado (borrarla, reprogramarla o mandarla a 'fallida').
+"""
+import logging
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Tarea
+from .registro import TareaNoRegistrada, obtener
+
+logger = logging.getLogger(__name__)
+
+# Segundos que una tarea queda apartada para el trabajador que la tomó
+VISIBILIDAD = getattr(settings, 'COLA_VISIBILIDAD', 300)
+
+# Tope de la espera entre reintentos, en segundos
+ESPERA_MAXIMA = 3600
+
+
+def reclamar(visibilidad=VISIBILIDAD):
+    """
+    Aparta la siguiente tarea disponible (o una cuyo trabajador expiró).
+    Regresa None si no hay nada que hacer.
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        tarea = (
+            Tarea.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(estado='pendiente', disponible_en__lte=ahora)
+                | Q(estado='en_proceso', bloqueada_hasta__lt=ahora)
+            )
+            .order_by('disponible_en', 'id')
+            .first()
+        )
+        if tarea is None:
+            return None
+
+        tarea.estado = 'en_proceso'
+        tarea.intentos += 1
+        tarea.bloqueada_hasta = ahora + timedelta(seconds=visibilidad)
+        tarea.save(update_fields=['estado', 'intentos', 'bloqueada_hasta'])
+    return tarea
+
+
+def _fallar(tarea, error):
+    if tarea.intentos >= tarea.max_intentos:
+        logger.error("Tarea %s (%s) enviada a fallidas: %s", tarea.id, tarea.nombre, error)
+        Tarea.objects.filter(pk=tarea.pk).update(
+            estado='fallida', bloqueada_hasta=None, ultimo_error=error
+        )
+        return
+
+    # Backoff exponencial con jitter para no reintentar todas a la vez
+    espera = min(2 ** tarea.intentos, ESPERA_MAXIMA) * random.uniform(0.5, 1.5)
+    logger.warning("Tarea %s (%s) falló, reintento en %.0fs", tarea.id, tarea.nombre, espera)
+    Tarea.objects.filter(pk=tarea.pk).update(
+        estado='pendiente',
+        bloqueada_hasta=None,
+        disponible_en=timezone.now() + timedelta(seconds=espera),
+        ultimo_error=error,
+    )
+
+
+def ejecutar(tarea):
+    """
+    Ejecuta una tarea ya reclamada. Regresa True si terminó bien.
+    """
+    if tarea.intentos > tarea.max_intentos:
+        # El trabajador anterior murió en el último intento
+        _fallar(tarea, tarea.ultimo_error or "Se agotó el tiempo de visibilidad.")
+        return False
+
+    try:
+        funcion, _ = obtener(tarea.nombre)
+        funcion(**tarea.argumentos)
+    except TareaNoRegistrada:
+        tarea.intentos = tarea.max_intentos
+        _fallar(tarea, f"No hay ninguna tarea registrada como '{tarea.nombre}'.")
+        return False
+    except Exception:
+        _fallar(tarea, traceback.format_exc())
+        return False
+
+    Tarea.objects.filter(pk=tarea.pk).delete()
+    return True
+
+
+def trabajar(detener, espera=1.0, una_vez=False):
+    """
+    Procesa tareas hasta que `detener()` sea verdadero. Con `una_vez` termina
+    en cuanto la cola queda vacía.
+    """
+    while not detener():
+        close_old_connections()
+        tarea = reclamar()
+        if tarea is None:
+            if una_vez:
+                return
+            time.sleep(espera)
+            continue
+        ejecutar(tarea)
@@ -0,0 +1,110 @@
+"""
+Almacenamiento de medios direccionado por contenido.
+
+Cada archivo se guarda una sola vez bajo `blobs/ab/cd/<sha256><ext>`: el
+hash se calcula mientras se copia la subida a un temporal y, si el blob ya
+existía, el temporal se descarta. `Blob.referencias` cuenta cuántos campos
+apuntan a cada archivo; `delete()` solo borra el archivo cuando llega a cero.
+Como el contenido de una ruta nunca cambia, se puede servir con caché
+inmutable.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+CARPETA_BLOBS = 'blobs'
+
+# Extensiones equivalentes que se guardan con un solo nombre
+EXTENSIONES = {'.jpeg': '.jpg', '.jpe': '.jpg'}
+
+
+def nombre_blob(digest, extension):
+    extension = extension.lower()
+    extension = EXTENSIONES.get(extension, extension)
+    return f"{CARPETA_BLOBS}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def es_blob(nombre):
+    return bool(nombre) and nombre.startswith(f"{CARPETA_BLOBS}/")
+
+
+class AlmacenamientoPorContenido(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre final lo decide el contenido en _save
+        return name
+
+    def _copiar_a_temporal(self, content):
+        carpeta = self.path(f"{CARPETA_BLOBS}/tmp")
+        os.makedirs(carpeta, exist_ok=True)
+        digest = hashlib.sha256()
+        tamano = 0
+        # En la misma partición que el destino, para que os.replace sea atómico
+        with tempfile.NamedTemporaryFile(dir=carpeta, delete=False) as temporal:
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            for bloque in content.chunks():
+                digest.update(bloque)
+                temporal.write(bloque)
+                tamano += len(bloque)
+        return temporal.name, digest.hexdigest(), tamano
+
+    def _save(self, name, content):
+        from .models import Blob
+
+        temporal, digest, tamano = self._copiar_a_temporal(content)
+        nombre = nombre_blob(digest, os.path.splitext(name)[1])
+        ruta = self.path(nombre)
+
+        try:
+            # El candado sobre la fila evita que un delete() simultáneo borre
+            # el archivo entre la comprobación y el incremento
+            with transaction.atomic():
+                blob, _ = Blob.objects.select_for_update().get_or_create(
+                    nombre=nombre, defaults={'tamano': tamano}
+                )
+                if not os.path.exists(ruta):
+                    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                    os.replace(temporal, ruta)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(ruta, self.file_permissions_mode)
+                Blob.objects.filter(pk=blob.pk).update(referencias=F('referencias') + 1)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+        return nombre
+
+    def delete(self, name):
+        """
+        Suelta una referencia; el archivo se borra al quedar sin ninguna.
+        Los archivos anteriores a los blobs se borran como siempre.
+        """
+        if not es_blob(name):
+            return super().delete(name)
+
+        from .models import Blob
+
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(nombre=name).first()
+            if blob is None:
+                return
+            if blob.referencias > 1:
+                Blob.objects.filter(pk=blob.pk).update(referencias=F('referencias') - 1)
+                return
+            blob.delete()
+            super().delete(name)
+
+
+def liberar(storage, *nombres):
+    """
+    Suelta los archivos al confirmar la transacción actual (así un rollback
+    no deja campos apuntando a blobs borrados).
+    """
+    nombres = [nombre for nombre in nombres if nombre]
+    if nombres:
+        transaction.on_commit(lambda: [storage.delete(nombre) for nombre in nombres])
@@ -10,4 +10,6 @@ class FeedConfig(AppConfig):
     name = 'feed'
 
     def ready(self):
-        import feed.signals
\ No newline at end of file
+        import feed.signals
+        from feed import likes
+        likes.comprobar_buffer()
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+Búsqueda local de lugares ya registrados (autocompletado).
+
+En MySQL usa el índice FULLTEXT `lugar_busqueda_ft` sobre
+(nombre, ubicacion, categoria) en modo booleano con prefijos; en otros
+motores cae a icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import LugarTuristico
+
+# innodb_ft_min_token_size: palabras más cortas no entran al índice FULLTEXT
+LONGITUD_MINIMA_TOKEN = 3
+
+
+def _terminos(query):
+    return re.findall(r'\w+', query.casefold())
+
+
+def _a_dict(lugar):
+    return {
+        "id": lugar.id,
+        "nombre": lugar.nombre,
+        "ubicacion": lugar.ubicacion,
+        "place_id": lugar.place_id,
+        "latitud": lugar.latitud,
+        "longitud": lugar.longitud,
+        "tipos": [],
+    }
+
+
+def buscar_locales(query, limite=10):
+    """
+    Lugares registrados cuyo nombre, ubicación o categoría empiezan con cada
+    palabra de `query`, los más relevantes primero.
+    """
+    terminos = _terminos(query)
+    if not terminos:
+        return []
+
+    lugares = LugarTuristico.objects.all()
+    indexables = [t for t in terminos if len(t) >= LONGITUD_MINIMA_TOKEN]
+    cortos = [t for t in terminos if len(t) < LONGITUD_MINIMA_TOKEN]
+
+    if connection.vendor == 'mysql' and indexables:
+        expresion = " ".join(f"+{t}*" for t in indexables)
+        relevancia = RawSQL(
+            "MATCH (nombre, ubicacion, categoria) AGAINST (%s IN BOOLEAN MODE)",
+            (expresion,),
+        )
+        lugares = lugares.annotate(relevancia=relevancia).filter(relevancia__gt=0)
+        orden = ['-relevancia', 'nombre']
+    else:
+        cortos = terminos
+        orden = ['nombre']
+
+    for termino in cortos:
+        lugares = lugares.filter(
+            Q(nombre__icontains=termino)
+            | Q(ubicacion__icontains=termino)
+            | Q(categoria__icontains=termino)
+        )
+
+    return [_a_dict(lugar) for lugar in lugares.order_by(*orden)[:limite]]
@@ -0,0 +1,81 @@
+"""
+Contadores desnormalizados (likes, comentarios, seguidores, siguiendo).
+
+Se actualizan con expresiones F() desde las señales de Like, Comentario y
+Seguidor, dentro de la misma transacción que la escritura que los provoca.
+`reconciliar_contadores` corrige cualquier desviación.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from usuarios.models import Seguidor, Turista
+from .models import Comentario, Like, Publicacion
+
+
+def incrementar(modelo, pk, campo, delta=1):
+    """
+    Suma `delta` al contador `campo` de la fila `pk` sin leerla antes.
+    """
+    filas = modelo.objects.filter(pk=pk)
+    if delta >= 0:
+        filas.update(**{campo: F(campo) + delta})
+        return
+    # Los contadores son UNSIGNED en MySQL: `campo - n` con menos de n falla
+    # antes que cualquier GREATEST, así que solo se resta donde alcanza
+    if not filas.filter(**{f'{campo}__gte': -delta}).update(**{campo: F(campo) + delta}):
+        filas.filter(**{f'{campo}__lt': -delta}).update(**{campo: 0})
+
+
+def _conteo(modelo, campo_fk, campo_conteo='pk'):
+    return Coalesce(
+        Subquery(
+            modelo.objects
+            .filter(**{campo_fk: OuterRef('pk')})
+            .order_by()
+            .values(campo_fk)
+            .annotate(total=Count(campo_conteo))
+            .values('total')
+        ),
+        0,
+    )
+
+
+# Campos contadores por modelo y la expresión que los recalcula desde cero
+CONTADORES = {
+    Publicacion: {
+        'likes_count': lambda: _conteo(Like, 'publicacion'),
+        'comentarios_count': lambda: _conteo(Comentario, 'publicacion'),
+    },
+    Turista: {
+        'seguidores_count': lambda: _conteo(Seguidor, 'turista_seguido'),
+        'siguiendo_count': lambda: _conteo(Seguidor, 'turista_seguidor'),
+    },
+}
+
+
+def reconciliar(modelo, desde_pk, hasta_pk):
+    """
+    Recalcula los contadores de `modelo` para pk en [desde_pk, hasta_pk) y
+    corrige solo las filas desviadas. Regresa cuántas filas se corrigieron.
+    """
+    campos = CONTADORES[modelo]
+    filas = (
+        modelo.objects
+        .filter(pk__gte=desde_pk, pk__lt=hasta_pk)
+        .annotate(**{f'real_{campo}': expresion() for campo, expresion in campos.items()})
+        .only('pk', *campos)
+    )
+
+    desviadas = []
+    for fila in filas:
+        desviada = False
+        for campo in campos:
+            real = getattr(fila, f'real_{campo}')
+            if getattr(fila, campo) != real:
+                setattr(fila, campo, real)
+                desviada = True
+        if desviada:
+            desviadas.append(fila)
+
+    modelo.objects.bulk_update(desviadas, list(campos))
+    return len(desviadas)
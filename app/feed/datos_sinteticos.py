@@ -0,0 +1,202 @@
+"""
+Datos sintéticos para pruebas de carga (manage.py generar_datos y
+manage.py benchmark_feed).
+
+La popularidad sigue una ley de potencias, como en una red social real: pocas
+cuentas concentran casi todos los seguidores, likes y publicaciones, y la
+mayoría tiene muy pocos. Todo se inserta con bulk_create (sin señales), así
+que al final se recalculan contadores, timelines y notificaciones con el
+mismo código que usa la aplicación para repararlos.
+"""
+import random
+from collections import defaultdict
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+from PIL import Image
+
+from usuarios.models import Seguidor, Turista
+from . import contadores, timeline
+from .almacenamiento import es_blob
+from .models import (
+    Blob, Comentario, EntradaTimeline, Fotografia, Like, LugarTuristico, Notificacion, Publicacion, Resena,
+)
+
+# Exponente de la ley de potencias (más alto = más concentrado)
+ALFA = 1.2
+
+# Días hacia atrás en los que se reparten las publicaciones
+DIAS = 90
+
+PREFIJO = 'sintetico'
+LOTE = 1000
+
+
+def _pesos(n):
+    return [1 / (rango + 1) ** ALFA for rango in range(n)]
+
+
+def _cuantos(aleatorio, media, maximo):
+    # Pareto desplazada: la mayoría cerca de 0, unos pocos muy arriba
+    return min(int((aleatorio.paretovariate(1.5) - 1) * media), maximo)
+
+
+def _elegir(aleatorio, poblacion, pesos, k, excluir=None):
+    if k <= 0:
+        return set()
+    elegidos = set(aleatorio.choices(poblacion, weights=pesos, k=k))
+    elegidos.discard(excluir)
+    return elegidos
+
+
+def _foto():
+    imagen = Image.new('RGB', (640, 480), (90, 140, 200))
+    salida = BytesIO()
+    imagen.save(salida, 'JPEG', quality=70)
+    return default_storage.save('fotos_resenas/sintetica.jpg', ContentFile(salida.getvalue()))
+
+
+def _rango(modelo):
+    limites = modelo.objects.aggregate(desde=Min('pk'), hasta=Max('pk'))
+    return limites['desde'] or 0, (limites['hasta'] or 0) + 1
+
+
+def generar(turistas, publicaciones, semilla=0, log=print):
+    """
+    Agrega `turistas` turistas y `publicaciones` publicaciones (con likes,
+    comentarios, fotos, seguidores y notificaciones) a la base actual.
+    """
+    aleatorio = random.Random(semilla)
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        inicio = User.objects.filter(username__startswith=PREFIJO).count()
+        nombres = [f'{PREFIJO}{inicio + i}' for i in range(turistas)]
+        # '!' = contraseña inutilizable; los benchmarks entran con force_login
+        User.objects.bulk_create([User(username=nombre, password='!') for nombre in nombres], batch_size=LOTE)
+        usuarios = User.objects.filter(username__in=nombres).values_list('id', flat=True)
+        Turista.objects.bulk_create(
+            [Turista(usuario_id=usuario_id, fecha_nac='1990-01-01') for usuario_id in usuarios], batch_size=LOTE
+        )
+        ids = list(Turista.objects.filter(usuario__username__in=nombres).values_list('id', flat=True))
+        aleatorio.shuffle(ids)
+        pesos = _pesos(len(ids))
+        log(f"{len(ids)} turistas")
+
+        # ---------- Seguidores ----------
+        seguidores = defaultdict(set)
+        for turista_id in ids:
+            for seguido in _elegir(aleatorio, ids, pesos, _cuantos(aleatorio, 10, len(ids) - 1), turista_id):
+                seguidores[seguido].add(turista_id)
+        Seguidor.objects.bulk_create(
+            [
+                Seguidor(turista_seguidor_id=seguidor, turista_seguido_id=seguido)
+                for seguido, grupo in seguidores.items() for seguidor in grupo
+            ],
+            batch_size=LOTE, ignore_conflicts=True,
+        )
+        en_lectura = [seguido for seguido, grupo in seguidores.items() if len(grupo) > timeline.UMBRAL_DISTRIBUCION]
+        Turista.objects.filter(id__in=en_lectura).update(distribucion_en_lectura=True)
+        cache.delete(timeline.CLAVE_EN_LECTURA)
+        log(f"{sum(len(g) for g in seguidores.values())} relaciones de seguimiento")
+
+        # ---------- Lugares, reseñas y publicaciones ----------
+        lugares = list(LugarTuristico.objects.values_list('id', flat=True))
+        if not lugares:
+            LugarTuristico.objects.bulk_create(
+                LugarTuristico(nombre=f'Lugar {i}', ubicacion='Centro', categoria=categoria)
+                for i, (categoria, _) in enumerate(LugarTuristico.CATEGORIAS * 10)
+            )
+            lugares = list(LugarTuristico.objects.values_list('id', flat=True))
+
+        desde_resena = _rango(Resena)[1]
+        Resena.objects.bulk_create(
+            [
+                Resena(
+                    lugar_turistico_id=aleatorio.choice(lugares), descripcion='Reseña sintética',
+                    fecha_visita=ahora, calificacion=aleatorio.randint(1, 10),
+                )
+                for _ in range(publicaciones)
+            ],
+            batch_size=LOTE,
+        )
+        resenas = list(
+            Resena.objects.filter(pk__gte=desde_resena).values_list('id', 'lugar_turistico__categoria')
+        )
+
+        desde_publicacion = _rango(Publicacion)[1]
+        autores = aleatorio.choices(ids, weights=pesos, k=len(resenas))
+        Publicacion.objects.bulk_create(
+            [
+                Publicacion(turista_id=autor, resena_id=resena, categoria=categoria)
+                for autor, (resena, categoria) in zip(autores, resenas)
+            ],
+            batch_size=LOTE,
+        )
+        # fecha_publicacion es auto_now_add: se reparte después en el tiempo
+        nuevas = list(Publicacion.objects.filter(pk__gte=desde_publicacion).only('id', 'turista_id'))
+        for publicacion in nuevas:
+            publicacion.fecha_publicacion = ahora - timedelta(seconds=aleatorio.randint(0, DIAS * 86400))
+        Publicacion.objects.bulk_update(nuevas, ['fecha_publicacion'], batch_size=LOTE)
+        log(f"{len(nuevas)} publicaciones")
+
+        # ---------- Fotos (un solo archivo, como tras la deduplicación) ----------
+        nombre = _foto()
+        fotos = [
+            Fotografia(resena_id=resena, fotografia=nombre)
+            for resena, _ in resenas if aleatorio.random() < 0.4
+            for _ in range(aleatorio.randint(1, 3))
+        ]
+        Fotografia.objects.bulk_create(fotos, batch_size=LOTE)
+        if es_blob(nombre):
+            Blob.objects.filter(nombre=nombre).update(referencias=F('referencias') + len(fotos))
+
+        # ---------- Likes, comentarios y notificaciones agrupadas ----------
+        likes, comentarios, notificaciones = [], [], []
+        for publicacion in nuevas:
+            autor = publicacion.turista_id
+            # Las publicaciones de cuentas populares reciben más likes
+            escala = 1 + len(seguidores.get(autor, ())) / 10
+            for tipo, media, modelo, filas in (
+                ('like', 3 * escala, Like, likes),
+                ('comentario', escala, Comentario, comentarios),
+            ):
+                quienes = _elegir(aleatorio, ids, pesos, _cuantos(aleatorio, media, len(ids) - 1), autor)
+                extra = {'texto': 'Comentario sintético'} if modelo is Comentario else {}
+                filas += [modelo(publicacion_id=publicacion.id, turista_id=quien, **extra) for quien in quienes]
+                if quienes:
+                    notificaciones.append(Notificacion(
+                        receptor_id=autor, emisor_id=next(iter(quienes)), tipo=tipo,
+                        publicacion_id=publicacion.id, total=len(quienes),
+                        leida=aleatorio.random() < 0.5, fecha=publicacion.fecha_publicacion,
+                    ))
+        Like.objects.bulk_create(likes, batch_size=LOTE, ignore_conflicts=True)
+        Comentario.objects.bulk_create(comentarios, batch_size=LOTE)
+        Notificacion.objects.bulk_create(notificaciones, batch_size=LOTE)
+        log(f"{len(likes)} likes, {len(comentarios)} comentarios, {len(notificaciones)} notificaciones")
+
+        # ---------- Timelines (fan-out) y contadores ----------
+        por_autor = defaultdict(list)
+        for publicacion in nuevas:
+            por_autor[publicacion.turista_id].append(publicacion)
+        entradas = [
+            EntradaTimeline(
+                turista_id=seguidor, publicacion_id=publicacion.id,
+                autor_id=autor, fecha_publicacion=publicacion.fecha_publicacion,
+            )
+            for autor, grupo in seguidores.items() if autor not in en_lectura
+            for seguidor in grupo
+            for publicacion in por_autor.get(autor, ())
+        ]
+        EntradaTimeline.objects.bulk_create(entradas, batch_size=LOTE, ignore_conflicts=True)
+        log(f"{len(entradas)} entradas de timeline")
+
+        for modelo in contadores.CONTADORES:
+            contadores.reconciliar(modelo, *_rango(modelo))
@@ -0,0 +1,84 @@
+"""
+Fan-out de una publicación nueva hacia los seguidores de su autor:
+notificaciones y timeline, por bloques de ids con bulk_create.
+
+La cola puede correr la tarea más de una vez (reintento tras un bloque que
+falló, o otro trabajador que la toma al vencer COLA_VISIBILIDAD), así que
+cada bloque se salta a quienes ya tienen su notificación y el timeline
+ignora los duplicados.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from usuarios.models import Seguidor
+from . import notificaciones, timeline
+from .models import Notificacion, Publicacion
+
+TAMANO_BLOQUE = getattr(settings, 'FAN_OUT_TAMANO_BLOQUE', 1000)
+
+
+def _en_bloques(iterable, tamano):
+    iterador = iter(iterable)
+    while bloque := list(islice(iterador, tamano)):
+        yield bloque
+
+
+def distribuir_publicacion(publicacion_id):
+    """
+    Crea las notificaciones 'nueva_publicacion' y las entradas de timeline de
+    todos los seguidores del autor, un bloque por transacción.
+    """
+    publicacion = (
+        Publicacion.objects
+        .select_related('turista__usuario')
+        .filter(pk=publicacion_id)
+        .first()
+    )
+    if publicacion is None:
+        # Se eliminó antes de distribuirse
+        return
+
+    autor = publicacion.turista
+
+    seguidor_ids = (
+        Seguidor.objects
+        .filter(turista_seguido=autor)
+        .order_by('id')
+        .values_list('turista_seguidor_id', flat=True)
+        .iterator(chunk_size=TAMANO_BLOQUE)
+    )
+
+    for bloque in _en_bloques(seguidor_ids, TAMANO_BLOQUE):
+        with transaction.atomic():
+            # Dos trabajadores con la misma publicación van de uno en uno
+            Publicacion.objects.select_for_update().filter(pk=publicacion.pk).exists()
+            ya_notificados = set(
+                Notificacion.objects
+                .filter(publicacion=publicacion, tipo='nueva_publicacion', receptor_id__in=bloque)
+                .values_list('receptor_id', flat=True)
+            )
+            nuevos = [seguidor_id for seguidor_id in bloque if seguidor_id not in ya_notificados]
+            if nuevos:
+                creadas = Notificacion.objects.bulk_create([
+                    Notificacion(
+                        receptor_id=seguidor_id,
+                        emisor=autor,
+                        tipo='nueva_publicacion',
+                        publicacion=publicacion,
+                    )
+                    for seguidor_id in nuevos
+                ])
+                if creadas[0].pk is None:
+                    # MySQL no regresa los ids del bulk_create
+                    creadas = Notificacion.objects.select_related('emisor__usuario').filter(
+                        publicacion=publicacion, tipo='nueva_publicacion', receptor_id__in=nuevos
+                    )
+                # bulk_create no dispara señales: contadores y SSE se atienden a mano
+                notificaciones.invalidar(nuevos)
+                notificaciones.emitir(creadas)
+
+            # Los autores con distribución en lectura no se copian a los timelines
+            if not autor.distribucion_en_lectura:
+                timeline.distribuir_publicacion(publicacion, bloque)
@@ -0,0 +1,147 @@
+"""
+Pub/sub de eventos para el SSE de notificaciones (feed:eventos_notificaciones).
+
+Cada conexión SSE se suscribe con una asyncio.Queue por turista. `publicar`
+se puede llamar desde código síncrono (señales, tareas) y entrega el evento a
+las colas del proceso.
+
+Con varios procesos (Apache, run_workers, varios workers de uvicorn) hace
+falta `EVENTOS_BROKER = 'host:puerto'`: los publicadores mandan cada evento al
+broker (`manage.py broker_eventos`) y cada proceso ASGI mantiene una conexión
+suscrita que reparte lo que llega entre sus colas locales. El protocolo es una
+línea JSON por evento; la línea `SUB` convierte la conexión en suscriptora.
+"""
+import asyncio
+import json
+import logging
+import socket
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BROKER = getattr(settings, 'EVENTOS_BROKER', None)
+
+# Eventos pendientes por conexión antes de empezar a descartar
+TAMANO_COLA = 100
+
+# turista_id -> {(loop, cola)}
+_suscriptores = {}
+_candado = threading.Lock()
+
+
+def _direccion():
+    host, puerto = BROKER.rsplit(':', 1)
+    return host, int(puerto)
+
+
+# ---------- Suscripción (conexiones SSE) ----------
+def suscribir(turista_id):
+    loop = asyncio.get_running_loop()
+    cola = asyncio.Queue(maxsize=TAMANO_COLA)
+    with _candado:
+        _suscriptores.setdefault(turista_id, set()).add((loop, cola))
+    if BROKER:
+        _escuchar_broker(loop)
+    return cola
+
+
+def desuscribir(turista_id, cola):
+    with _candado:
+        colas = _suscriptores.get(turista_id, set())
+        colas.difference_update({s for s in colas if s[1] is cola})
+        if not colas:
+            _suscriptores.pop(turista_id, None)
+
+
+def _encolar(cola, evento):
+    try:
+        cola.put_nowait(evento)
+    except asyncio.QueueFull:
+        # Cliente demasiado lento: al reconectar se pone al día con Last-Event-ID
+        pass
+
+
+def _repartir(turista_id, evento):
+    with _candado:
+        destinos = list(_suscriptores.get(turista_id, ()))
+    for loop, cola in destinos:
+        if loop.is_closed():
+            continue
+        loop.call_soon_threadsafe(_encolar, cola, evento)
+
+
+# ---------- Publicación ----------
+class _ConexionBroker:
+    """
+    Conexión de publicación al broker, una por proceso, que se reabre si se cae.
+    """
+
+    def __init__(self):
+        self.socket = None
+        self.candado = threading.Lock()
+
+    def _abrir(self):
+        self.socket = socket.create_connection(_direccion(), timeout=1)
+
+    def enviar(self, linea):
+        with self.candado:
+            for intento in range(2):
+                try:
+                    if self.socket is None:
+                        self._abrir()
+                    self.socket.sendall(linea)
+                    return
+                except OSError as e:
+                    if self.socket is not None:
+                        self.socket.close()
+                    self.socket = None
+                    if intento:
+                        logger.warning("No se pudo publicar el evento en el broker: %s", e)
+
+
+_conexion = _ConexionBroker()
+
+
+def publicar(turista_id, evento):
+    """
+    Manda `evento` (dict serializable) a las conexiones SSE de `turista_id`.
+    """
+    if BROKER:
+        linea = json.dumps({'turista': turista_id, 'evento': evento}) + '\n'
+        _conexion.enviar(linea.encode())
+    else:
+        _repartir(turista_id, evento)
+
+
+# ---------- Suscripción al broker (procesos ASGI) ----------
+_escuchas = {}
+
+
+def _escuchar_broker(loop):
+    tarea = _escuchas.get(loop)
+    if tarea is None or tarea.done():
+        _escuchas[loop] = loop.create_task(_escuchar(loop))
+
+
+async def _escuchar(loop):
+    espera = 0.5
+    while True:
+        try:
+            lector, escritor = await asyncio.open_connection(*_direccion())
+            escritor.write(b'SUB\n')
+            await escritor.drain()
+            espera = 0.5
+            async for linea in lector:
+                mensaje = json.loads(linea)
+                with _candado:
+                    destinos = list(_suscriptores.get(mensaje['turista'], ()))
+                for loop_destino, cola in destinos:
+                    if loop_destino is loop:
+                        _encolar(cola, mensaje['evento'])
+            escritor.close()
+        except (OSError, ValueError) as e:
+            logger.warning("Conexión con el broker de eventos perdida: %s", e)
+        await asyncio.sleep(espera)
+        espera = min(espera * 2, 10)
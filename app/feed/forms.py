@@ -3,6 +3,7 @@ from django.utils import timezone
 from datetime import timedelta
 from django.core.exceptions import ValidationError
 from .models import Resena
+from .subidas import TAMANO_MAXIMO, detectar_tipo
 
 
 # ---------- WIDGETS PERSONALIZADOS ----------
@@ -108,7 +109,14 @@ class FormResena(forms.ModelForm):
 
         formatos_validos = ['image/jpeg', 'image/png', 'image/webp']
         for foto in fotos:
-            if foto.content_type not in formatos_validos:
+            # El tipo sale de los primeros bytes (ver subidas.py), no del navegador
+            tipo = getattr(foto, 'tipo_detectado', None)
+            if tipo is None:
+                tipo = detectar_tipo(foto.read(16))
+                foto.seek(0)
+            if foto.size > TAMANO_MAXIMO:
+                raise ValidationError(f"El archivo '{foto.name}' es demasiado grande.")
+            if tipo not in formatos_validos:
                 raise ValidationError(
                     f"El archivo '{foto.name}' no es válido. Solo se permiten JPG, PNG o WEBP."
                 )
@@ -0,0 +1,97 @@
+"""
+Procesamiento de las fotografías de las reseñas, fuera de la petición
+(tarea `procesar_fotografia`): se quitan los metadatos EXIF, se reduce el
+original y se generan versiones WebP a varios anchos para el `srcset`.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Lado mayor con el que se conserva el original
+LADO_MAXIMO = getattr(settings, 'FOTOS_LADO_MAXIMO', 2048)
+
+# Anchos de las versiones WebP (los que superan al original se omiten)
+ANCHOS_RENDICION = getattr(settings, 'FOTOS_ANCHOS_RENDICION', (320, 640, 1024))
+
+CALIDAD_JPEG = 85
+CALIDAD_WEBP = 80
+
+
+def _a_archivo(imagen, formato, **opciones):
+    buffer = BytesIO()
+    imagen.save(buffer, formato, **opciones)
+    return ContentFile(buffer.getvalue())
+
+
+def _limpiar_original(imagen, formato):
+    """
+    Imagen reducida y sin metadatos, en su formato original.
+    Pillow no copia el EXIF al guardar si no se le pide.
+    """
+    imagen.thumbnail((LADO_MAXIMO, LADO_MAXIMO), Image.LANCZOS)
+    if formato == 'JPEG':
+        if imagen.mode not in ('RGB', 'L'):
+            imagen = imagen.convert('RGB')
+        return imagen, _a_archivo(imagen, 'JPEG', quality=CALIDAD_JPEG, optimize=True, progressive=True)
+    if formato == 'WEBP':
+        return imagen, _a_archivo(imagen, 'WEBP', quality=CALIDAD_WEBP, method=6)
+    return imagen, _a_archivo(imagen, 'PNG', optimize=True)
+
+
+def _rendiciones(imagen, storage, base):
+    """
+    Guarda una versión WebP por cada ancho y regresa {ancho: nombre}. El
+    almacenamiento decide la ruta por contenido; del nombre sugerido solo
+    cuenta la extensión.
+    """
+    if imagen.mode not in ('RGB', 'RGBA'):
+        imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() or 'transparency' in imagen.info else 'RGB')
+
+    rendiciones = {}
+    for ancho in sorted(ANCHOS_RENDICION):
+        if ancho > imagen.width:
+            # La última versión queda al tamaño del original
+            ancho = imagen.width
+        alto = max(1, round(imagen.height * ancho / imagen.width))
+        version = imagen if ancho == imagen.width else imagen.resize((ancho, alto), Image.LANCZOS)
+        nombre = storage.save(
+            f"{base}-{ancho}.webp",
+            _a_archivo(version, 'WEBP', quality=CALIDAD_WEBP, method=6),
+        )
+        rendiciones[str(ancho)] = nombre
+        if ancho == imagen.width:
+            break
+    return rendiciones
+
+
+def procesar_fotografia(fotografia):
+    """
+    Reemplaza el archivo de `fotografia` por uno limpio y reducido, genera sus
+    versiones WebP y guarda dimensiones y rendiciones en el modelo.
+    """
+    campo = fotografia.fotografia
+    storage = campo.storage
+
+    with campo.open('rb') as archivo:
+        imagen = Image.open(archivo)
+        formato = imagen.format
+        # Aplica la orientación de la cámara antes de descartar el EXIF
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen.load()
+
+    imagen, contenido = _limpiar_original(imagen, formato)
+
+    anterior = campo.name
+    base = os.path.splitext(os.path.basename(anterior))[0]
+    campo.save(os.path.basename(anterior), contenido, save=False)
+
+    fotografia.ancho, fotografia.alto = imagen.size
+    fotografia.rendiciones = _rendiciones(imagen, storage, base)
+    fotografia.save(update_fields=['fotografia', 'ancho', 'alto', 'rendiciones'])
+
+    # El original ya no se usa; con el almacenamiento por contenido esto solo
+    # suelta una referencia
+    storage.delete(anterior)
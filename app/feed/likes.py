@@ -0,0 +1,255 @@
+"""
+Likes: dar y quitar, y qué publicaciones de una página ya tienen like de
+quien mira.
+
+`dar` y `quitar` son idempotentes: un solo INSERT que ignora el duplicado (o
+un DELETE) y, si cambió algo, el contador con F(), en una transacción. Como no
+pasan por el ORM no disparan las señales de Like; lo que ellas hacen
+(contador, notificación, filtro) se hace aquí. La notificación se encola al
+confirmar y la agrupa un trabajador, fuera de la transacción del like.
+
+Con LIKES_BUFFER = True el contador se acumula en la caché al confirmarse la
+transacción y una tarea lo vuelca cada LIKES_BUFFER_SEGUNDOS por publicación:
+una ráfaga de likes a una publicación viral es un solo UPDATE. La caché tiene
+que ser compartida (memcached); con una por proceso cada uno volcaría solo lo
+suyo, así que `comprobar_buffer` no deja arrancar. Si la caché pierde lo
+pendiente, `reconciliar_contadores` lo corrige.
+
+Para marcar una página se pregunta solo por sus ids, con un `IN`, en lugar
+de cargar todos los likes que el turista ha dado. A quien ya dio muchos likes
+se le guarda además un filtro de Bloom en la caché: si ninguna publicación de
+la página pasa el filtro, no hace falta consultar la BD, y si alguna pasa, el
+`IN` se hace solo con esas. El filtro puede dar falsos positivos (los resuelve
+el `IN`) pero nunca falsos negativos: cada like nuevo cambia la versión del
+turista (`invalidar`) y el filtro se reconstruye. Quitar un like no lo
+invalida.
+"""
+import hashlib
+import math
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from cola.registro import encolar
+from . import contadores, notificaciones
+from .models import Like, Publicacion
+
+# A partir de cuántos likes se usa el filtro
+UMBRAL = getattr(settings, 'LIKES_UMBRAL_FILTRO', 500)
+
+# Proporción de falsos positivos del filtro
+ERROR = 0.01
+
+DURACION = 60 * 60 * 24
+
+# Marca en la caché para quien tiene pocos likes: basta el IN
+LIGERO = 'ligero'
+
+BUFFER = getattr(settings, 'LIKES_BUFFER', False)
+INTERVALO = timedelta(seconds=getattr(settings, 'LIKES_BUFFER_SEGUNDOS', 5))
+
+
+class FiltroBloom:
+
+    def __init__(self, elementos, error=ERROR):
+        elementos = list(elementos)
+        n = max(len(elementos), 1)
+        self.bits = max(int(-n * math.log(error) / math.log(2) ** 2), 8)
+        self.funciones = max(round(self.bits / n * math.log(2)), 1)
+        self.mapa = bytearray((self.bits + 7) // 8)
+        for elemento in elementos:
+            for posicion in self._posiciones(elemento):
+                self.mapa[posicion // 8] |= 1 << (posicion % 8)
+
+    def _posiciones(self, elemento):
+        # Doble hash: k posiciones a partir de dos mitades de un solo digest
+        digest = hashlib.blake2b(str(elemento).encode(), digest_size=16).digest()
+        a, b = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(a + i * b) % self.bits for i in range(self.funciones)]
+
+    def __contains__(self, elemento):
+        return all(self.mapa[p // 8] & (1 << (p % 8)) for p in self._posiciones(elemento))
+
+
+def _clave_version(turista_id):
+    return f'likes:version:{turista_id}'
+
+
+def _clave_filtro(turista_id, version):
+    return f'likes:filtro:{turista_id}:{version}'
+
+
+def invalidar(turista_id):
+    cache.delete(_clave_version(turista_id))
+
+
+def _filtro(turista_id):
+    # La versión se lee antes que los likes: si llega uno nuevo mientras se
+    # construye, el filtro queda guardado con una versión que ya nadie usa
+    version = cache.get_or_set(_clave_version(turista_id), time.time_ns, DURACION)
+    clave = _clave_filtro(turista_id, version)
+    filtro = cache.get(clave)
+    if filtro is None:
+        ids = Like.objects.filter(turista_id=turista_id).values_list('publicacion_id', flat=True)
+        if len(ids[:UMBRAL]) < UMBRAL:
+            filtro = LIGERO
+        else:
+            filtro = FiltroBloom(ids)
+        cache.set(clave, filtro, DURACION)
+    return None if filtro == LIGERO else filtro
+
+
+def dados_por(turista_id, publicacion_ids):
+    """
+    Subconjunto de `publicacion_ids` al que `turista_id` ya le dio like.
+    """
+    if turista_id is None:
+        return set()
+    candidatas = set(publicacion_ids)
+    filtro = _filtro(turista_id) if candidatas else None
+    if filtro is not None:
+        candidatas = {pk for pk in candidatas if pk in filtro}
+    if not candidatas:
+        return set()
+    return set(
+        Like.objects.filter(turista_id=turista_id, publicacion_id__in=candidatas)
+        .values_list('publicacion_id', flat=True)
+    )
+
+
+# ---------- Dar y quitar ----------
+
+def _ejecutar(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def _insertar(turista_id, publicacion_id, fecha):
+    # INSERT IGNORE / INSERT OR IGNORE / ON CONFLICT DO NOTHING según la BD
+    ops = connection.ops
+    campos = [Like._meta.get_field(nombre) for nombre in ('publicacion', 'turista', 'fecha')]
+    sql = '{} {} ({}) VALUES (%s, %s, %s){}'.format(
+        ops.insert_statement(on_conflict=OnConflict.IGNORE),
+        ops.quote_name(Like._meta.db_table),
+        ', '.join(ops.quote_name(campo.column) for campo in campos),
+        ops.on_conflict_suffix_sql(campos, OnConflict.IGNORE, None, None),
+    )
+    return _ejecutar(sql, [publicacion_id, turista_id, campos[2].get_db_prep_value(fecha, connection)])
+
+
+def _borrar(turista_id, publicacion_id):
+    ops = connection.ops
+    sql = 'DELETE FROM {} WHERE {} = %s AND {} = %s'.format(
+        ops.quote_name(Like._meta.db_table),
+        ops.quote_name(Like._meta.get_field('publicacion').column),
+        ops.quote_name(Like._meta.get_field('turista').column),
+    )
+    return _ejecutar(sql, [publicacion_id, turista_id])
+
+
+def dar(turista, publicacion):
+    """
+    Like de `turista` a `publicacion` (con turista_id cargado). Regresa 1 si
+    es nuevo y 0 si ya existía.
+    """
+    with transaction.atomic():
+        cambio = _insertar(turista.id, publicacion.id, timezone.now())
+        if cambio:
+            _sumar(publicacion.id, 1)
+    if cambio:
+        invalidar(turista.id)
+        notificaciones.notificar(
+            receptor_id=publicacion.turista_id, emisor_id=turista.id, tipo='like', publicacion_id=publicacion.id,
+        )
+    return cambio
+
+
+def quitar(turista_id, publicacion_id):
+    """
+    Quita el like. Regresa -1 si existía y 0 si no.
+    """
+    with transaction.atomic():
+        cambio = _borrar(turista_id, publicacion_id)
+        if cambio:
+            _sumar(publicacion_id, -1)
+    return -cambio
+
+
+# ---------- Contador con write-behind ----------
+
+def _clave_pendientes(publicacion_id, signo):
+    # Dos contadores que solo crecen: memcached no baja de cero
+    return f'likes:pendientes:{publicacion_id}:{signo}'
+
+
+def _clave_programado(publicacion_id):
+    return f'likes:programado:{publicacion_id}'
+
+
+def comprobar_buffer():
+    """
+    Falla al arrancar si LIKES_BUFFER está activo sin una caché compartida.
+    """
+    if getattr(settings, 'LIKES_BUFFER', False) and isinstance(caches['default'], (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            "LIKES_BUFFER = True necesita una caché 'default' compartida entre procesos "
+            "(MEMCACHED_LOCATION); con una por proceso se perderían likes."
+        )
+
+
+def _sumar(publicacion_id, delta):
+    if not BUFFER:
+        contadores.incrementar(Publicacion, publicacion_id, 'likes_count', delta)
+        return
+    # A la caché solo lo confirmado: si la transacción se revierte no hay nada que volcar
+    transaction.on_commit(lambda: _acumular(publicacion_id, delta))
+
+
+def _acumular(publicacion_id, delta):
+    clave = _clave_pendientes(publicacion_id, '+' if delta > 0 else '-')
+    cache.add(clave, 0, None)
+    cache.incr(clave, abs(delta))
+    # Una sola tarea de volcado por publicación e intervalo
+    if cache.add(_clave_programado(publicacion_id), True, INTERVALO.total_seconds() * 10):
+        encolar('feed.tareas.volcar_likes', espera=INTERVALO, publicacion_id=publicacion_id)
+
+
+def pendientes(publicacion_id):
+    """
+    Likes de `publicacion_id` que aún no llegan a likes_count.
+    """
+    if not BUFFER:
+        return 0
+    claves = [_clave_pendientes(publicacion_id, signo) for signo in '+-']
+    valores = cache.get_many(claves)
+    sumados, restados = (valores.get(clave, 0) for clave in claves)
+    return sumados - restados
+
+
+def volcar(publicacion_id):
+    """
+    Pasa a likes_count lo acumulado. Se resta de la caché solo lo que se leyó,
+    así no se pierden los likes que lleguen mientras tanto.
+    """
+    # Primero se libera la programación: un like desde aquí agenda otro volcado
+    cache.delete(_clave_programado(publicacion_id))
+    claves = [_clave_pendientes(publicacion_id, signo) for signo in '+-']
+    valores = cache.get_many(claves)
+    sumados, restados = (valores.get(clave, 0) for clave in claves)
+    if sumados != restados:
+        contadores.incrementar(Publicacion, publicacion_id, 'likes_count', sumados - restados)
+    for clave, leido in zip(claves, (sumados, restados)):
+        if leido:
+            try:
+                cache.decr(clave, leido)
+            except ValueError:
+                pass
@@ -0,0 +1,221 @@
+import json
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.test.runner import DiscoverRunner
+from django.urls import reverse
+from django.utils import timezone
+
+from feed import datos_sinteticos
+from feed.models import Publicacion
+from red_social.consultas import Medidor
+from usuarios.models import Turista
+
+# Turistas:publicaciones de cada ronda
+TAMANOS = '100:500,500:2500,2000:10000'
+
+# Una regresión es un p50 más lento que esto respecto a la corrida anterior
+TOLERANCIA = 0.2
+
+CARPETA = Path(settings.BASE_DIR) / 'benchmarks'
+
+
+def _commit():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        sucio = subprocess.run(['git', 'diff', '--quiet', 'HEAD'], capture_output=True).returncode
+    except (OSError, subprocess.CalledProcessError):
+        return 'sin-git'
+    return f'{commit}-sucio' if sucio else commit
+
+
+def _percentiles(tiempos):
+    cortes = statistics.quantiles(tiempos, n=100, method='inclusive')
+    return {
+        'p50_ms': round(cortes[49], 2),
+        'p90_ms': round(cortes[89], 2),
+        'p99_ms': round(cortes[98], 2),
+        'max_ms': round(max(tiempos), 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p90/p99) y consultas de las vistas principales con "
+        "datos sintéticos de tamaño creciente, en una base de prueba temporal. "
+        "Guarda el resultado en benchmarks/<commit>.json."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos', default=TAMANOS,
+            help=f"Rondas turistas:publicaciones separadas por comas (por defecto {TAMANOS})."
+        )
+        parser.add_argument('--repeticiones', type=int, default=50, help="Peticiones por vista y ronda.")
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument(
+            '--comparar', metavar='COMMIT',
+            help="Compara contra benchmarks/<COMMIT>.json (por defecto, el más reciente)."
+        )
+        parser.add_argument('--no-guardar', action='store_true', help="Solo muestra los resultados.")
+
+    def handle(self, *args, **options):
+        try:
+            tamanos = [tuple(int(n) for n in par.split(':')) for par in options['tamanos'].split(',')]
+        except ValueError:
+            raise CommandError("--tamanos espera pares turistas:publicaciones, p. ej. 100:500,500:2500")
+        if options['repeticiones'] < 2:
+            raise CommandError("--repeticiones debe ser al menos 2.")
+
+        anterior = self.cargar_anterior(options['comparar'])
+        resultado = {
+            'commit': _commit(),
+            'fecha': timezone.now().isoformat(timespec='seconds'),
+            'base_de_datos': connection.vendor,
+            'repeticiones': options['repeticiones'],
+            'rondas': [],
+        }
+
+        # Base de prueba desechable, caché local y medios temporales: el
+        # benchmark no toca los datos ni la caché de nadie
+        setup_test_environment()
+        corredor = DiscoverRunner(verbosity=0, interactive=False)
+        bases = corredor.setup_databases()
+        try:
+            with tempfile.TemporaryDirectory() as medios, override_settings(
+                MEDIA_ROOT=medios,
+                COLA_SINCRONA=True,
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            ):
+                for turistas, publicaciones in tamanos:
+                    call_command('flush', interactive=False, verbosity=0)
+                    # flush reinicia los ids: lo cacheado de la ronda anterior no aplica
+                    cache.clear()
+                    self.stdout.write(f"== {turistas} turistas, {publicaciones} publicaciones")
+                    datos_sinteticos.generar(turistas, publicaciones, options['semilla'], log=lambda _: None)
+                    vistas = self.medir(random.Random(options['semilla']), options['repeticiones'])
+                    resultado['rondas'].append({
+                        'turistas': turistas, 'publicaciones': publicaciones, 'vistas': vistas,
+                    })
+                    self.mostrar(vistas, anterior, turistas, publicaciones)
+        finally:
+            corredor.teardown_databases(bases)
+            teardown_test_environment()
+
+        if not options['no_guardar']:
+            CARPETA.mkdir(exist_ok=True)
+            destino = CARPETA / f"{resultado['commit']}.json"
+            destino.write_text(json.dumps(resultado, indent=2, ensure_ascii=False) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Resultados en {destino}"))
+
+    def peticiones(self, aleatorio):
+        """
+        Por vista, una función que recibe el id del turista que navega y
+        regresa (método, url). Turistas y publicaciones se eligen con el
+        mismo sesgo que la popularidad.
+        """
+        turistas = list(Turista.objects.order_by('-seguidores_count').values_list('id', 'usuario__username'))
+        publicaciones = list(Publicacion.objects.order_by('-likes_count').values_list('id', 'turista_id'))
+        pesos_turistas = datos_sinteticos._pesos(len(turistas))
+        pesos_publicaciones = datos_sinteticos._pesos(len(publicaciones))
+
+        def turista():
+            return aleatorio.choices(turistas, weights=pesos_turistas)[0]
+
+        def publicacion(ajena_a=None):
+            while True:
+                pk, autor = aleatorio.choices(publicaciones, weights=pesos_publicaciones)[0]
+                if autor != ajena_a:
+                    return pk
+
+        return {
+            'visualizar_feed': lambda _: ('get', reverse('inicio:feed')),
+            'perfil_usuario': lambda _: ('get', reverse('perfil_usuario', args=[turista()[1]])),
+            'detalle_publicacion': lambda _: ('get', reverse('inicio:detalle_publicacion', args=[publicacion()])),
+            # No se puede dar like a lo propio
+            'dar_like': lambda yo: ('post', reverse('inicio:dar_like', args=[publicacion(ajena_a=yo)])),
+            'obtener_notificaciones': lambda _: ('get', reverse('inicio:obtener_notificaciones')),
+        }, turista
+
+    def medir(self, aleatorio, repeticiones):
+        peticiones, turista = self.peticiones(aleatorio)
+
+        # Un cliente con sesión por turista: el login no entra en la medición
+        clientes = {}
+
+        def cliente(turista_id):
+            if turista_id not in clientes:
+                clientes[turista_id] = Client()
+                clientes[turista_id].force_login(Turista.objects.get(pk=turista_id).usuario)
+            return clientes[turista_id]
+
+        vistas = {}
+        for nombre, peticion in peticiones.items():
+            tiempos, consultas = [], []
+            for _ in range(repeticiones):
+                turista_id = turista()[0]
+                metodo, url = peticion(turista_id)
+                usuario = cliente(turista_id)
+                medidor = Medidor()
+                inicio = time.perf_counter()
+                with medidor.medir():
+                    respuesta = getattr(usuario, metodo)(url)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                consultas.append(medidor.total)
+                if respuesta.status_code >= 400:
+                    raise CommandError(f"{nombre}: {url} respondió {respuesta.status_code}")
+            vistas[nombre] = {
+                **_percentiles(tiempos),
+                'consultas_p50': statistics.median(consultas),
+                'consultas_max': max(consultas),
+            }
+        return vistas
+
+    def cargar_anterior(self, commit):
+        if commit:
+            archivo = CARPETA / f'{commit}.json'
+            if not archivo.exists():
+                raise CommandError(f"No existe {archivo}")
+        else:
+            archivos = sorted(CARPETA.glob('*.json'), key=lambda a: a.stat().st_mtime)
+            if not archivos:
+                return None
+            archivo = archivos[-1]
+        self.stdout.write(f"Comparando contra {archivo.name}")
+        return json.loads(archivo.read_text())
+
+    def mostrar(self, vistas, anterior, turistas, publicaciones):
+        previas = {}
+        if anterior:
+            for ronda in anterior['rondas']:
+                if (ronda['turistas'], ronda['publicaciones']) == (turistas, publicaciones):
+                    previas = ronda['vistas']
+
+        for nombre, datos in vistas.items():
+            linea = (
+                f"  {nombre:<24} p50 {datos['p50_ms']:>8.1f} ms  p90 {datos['p90_ms']:>8.1f} ms  "
+                f"p99 {datos['p99_ms']:>8.1f} ms  consultas {datos['consultas_max']:>3}"
+            )
+            previa = previas.get(nombre)
+            if previa is None:
+                self.stdout.write(linea)
+                continue
+            cambio = datos['p50_ms'] / previa['p50_ms'] - 1 if previa['p50_ms'] else 0
+            linea += f"  ({cambio:+.0%} p50, {datos['consultas_max'] - previa['consultas_max']:+d} consultas)"
+            if cambio > TOLERANCIA or datos['consultas_max'] > previa['consultas_max']:
+                self.stdout.write(self.style.WARNING(linea))
+            else:
+                self.stdout.write(linea)
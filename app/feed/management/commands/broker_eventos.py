@@ -0,0 +1,50 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+# Bytes pendientes de enviar a un suscriptor antes de darlo por perdido
+LIMITE_BUFFER = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Broker local para los eventos SSE: reenvía cada línea que publican los "
+        "procesos a todas las conexiones suscritas (ver feed/eventos.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='0.0.0.0')
+        parser.add_argument('--puerto', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        try:
+            asyncio.run(self.servir(options['host'], options['puerto']))
+        except KeyboardInterrupt:
+            pass
+
+    async def servir(self, host, puerto):
+        suscriptores = set()
+
+        async def atender(lector, escritor):
+            try:
+                async for linea in lector:
+                    if linea.strip() == b'SUB':
+                        suscriptores.add(escritor)
+                        continue
+                    for destino in list(suscriptores):
+                        if destino.transport.get_write_buffer_size() > LIMITE_BUFFER:
+                            # No está leyendo: se le desconecta para no acumular memoria
+                            suscriptores.discard(destino)
+                            destino.close()
+                            continue
+                        destino.write(linea)
+            except ConnectionError:
+                pass
+            finally:
+                suscriptores.discard(escritor)
+                escritor.close()
+
+        servidor = await asyncio.start_server(atender, host, puerto)
+        self.stdout.write(f"Broker de eventos escuchando en {host}:{puerto}")
+        async with servidor:
+            await servidor.serve_forever()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from feed import notificaciones
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra las notificaciones leídas con más de "
+        f"{notificaciones.RETENCION_LEIDAS.days} días y cualquiera con más de "
+        f"{notificaciones.RETENCION_MAXIMA.days}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help="Cuántas filas borrar por transacción (por defecto 1000)."
+        )
+
+    def handle(self, *args, **options):
+        borradas = notificaciones.compactar(options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"{borradas} notificaciones borradas."))
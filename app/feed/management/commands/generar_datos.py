@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from feed import datos_sinteticos
+
+
+class Command(BaseCommand):
+    help = (
+        "Llena la base actual con turistas, seguidores, publicaciones, likes y "
+        "comentarios sintéticos (popularidad con ley de potencias). Solo para desarrollo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turistas', type=int, default=200)
+        parser.add_argument('--publicaciones', type=int, default=1000)
+        parser.add_argument('--semilla', type=int, default=0, help="Misma semilla, mismos datos.")
+
+    def handle(self, *args, **options):
+        datos_sinteticos.generar(
+            options['turistas'], options['publicaciones'], options['semilla'], log=self.stdout.write
+        )
+        self.stdout.write(self.style.SUCCESS("Datos sintéticos generados."))
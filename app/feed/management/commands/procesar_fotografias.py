@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from feed import tareas
+from feed.models import Fotografia
+
+
+class Command(BaseCommand):
+    help = "Encola el procesamiento (WebP, sin EXIF) de las fotografías que aún no lo tienen."
+
+    def handle(self, *args, **options):
+        pendientes = (
+            Fotografia.objects
+            .filter(rendiciones={})
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        total = 0
+        for fotografia_id in pendientes.iterator(chunk_size=1000):
+            tareas.procesar_fotografia.encolar(fotografia_id=fotografia_id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{total} fotografías encoladas."))
@@ -0,0 +1,69 @@
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from feed.almacenamiento import CARPETA_BLOBS, es_blob
+from feed.models import Blob, Fotografia
+from usuarios.models import Turista
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las referencias de cada blob a partir de los modelos y borra "
+        "los archivos que ya nadie usa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--gracia', type=int, default=60,
+            help="Minutos que se respetan los archivos sin registro (subidas en curso)."
+        )
+
+    def contar_referencias(self):
+        referencias = Counter()
+        fotos = Fotografia.objects.values_list('fotografia', 'rendiciones')
+        for nombre, rendiciones in fotos.iterator(chunk_size=1000):
+            referencias.update([nombre, *rendiciones.values()])
+        perfiles = Turista.objects.exclude(foto_perfil='').values_list('foto_perfil', flat=True)
+        referencias.update(perfiles.iterator(chunk_size=1000))
+        return Counter({nombre: total for nombre, total in referencias.items() if es_blob(nombre)})
+
+    def handle(self, *args, **options):
+        referencias = self.contar_referencias()
+
+        limite = time.time() - options['gracia'] * 60
+
+        corregidos = borrados = 0
+        antiguos = Blob.objects.filter(creado__lt=timezone.now() - timedelta(minutes=options['gracia']))
+        for blob in antiguos.iterator(chunk_size=1000):
+            total = referencias.get(blob.nombre, 0)
+            # Solo si nadie la tocó desde que se contaron las referencias
+            sin_cambios = Blob.objects.filter(pk=blob.pk, referencias=blob.referencias)
+            if total == 0:
+                if sin_cambios.delete()[0]:
+                    ruta = default_storage.path(blob.nombre)
+                    if os.path.exists(ruta):
+                        os.remove(ruta)
+                    borrados += 1
+            elif total != blob.referencias:
+                corregidos += sin_cambios.update(referencias=total)
+
+        # Archivos sin fila (p. ej. una transacción que se revirtió)
+        registrados = set(Blob.objects.values_list('nombre', flat=True))
+        raiz = default_storage.path(CARPETA_BLOBS)
+        for carpeta, _, archivos in os.walk(raiz):
+            for archivo in archivos:
+                ruta = os.path.join(carpeta, archivo)
+                nombre = os.path.relpath(ruta, default_storage.location).replace(os.sep, '/')
+                if nombre not in registrados and os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+                    borrados += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{corregidos} blobs con referencias corregidas, {borrados} archivos borrados."
+        ))
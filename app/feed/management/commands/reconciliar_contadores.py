@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from feed import contadores
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores desnormalizados y corrige las desviaciones por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help="Cuántas filas revisar por transacción (por defecto 1000)."
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+
+        for modelo in contadores.CONTADORES:
+            ultimo_pk = modelo.objects.aggregate(maximo=Max('pk'))['maximo'] or 0
+            corregidas = 0
+            for desde in range(1, ultimo_pk + 1, lote):
+                with transaction.atomic():
+                    corregidas += contadores.reconciliar(modelo, desde, desde + lote)
+
+            self.stdout.write(
+                self.style.SUCCESS(f"{modelo.__name__}: {corregidas} filas corregidas.")
+            )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from feed import timeline
+from usuarios.models import Seguidor, Turista
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los timelines precalculados a partir de Seguidor y Publicacion."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vaciar', action='store_true',
+            help="Borra las entradas actuales antes de reconstruir."
+        )
+
+    def handle(self, *args, **options):
+        for autor in Turista.objects.iterator(chunk_size=timeline.TAMANO_LOTE):
+            timeline.actualizar_distribucion(autor)
+
+        relaciones = (
+            Seguidor.objects
+            .select_related('turista_seguido')
+            .order_by('id')
+            .iterator(chunk_size=timeline.TAMANO_LOTE)
+        )
+        total = 0
+        for relacion in relaciones:
+            if options['vaciar']:
+                timeline.vaciar_timeline(relacion.turista_seguidor_id, relacion.turista_seguido_id)
+            timeline.rellenar_timeline(relacion.turista_seguidor_id, relacion.turista_seguido)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Timelines reconstruidos para {total} relaciones."))
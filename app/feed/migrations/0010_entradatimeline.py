@@ -0,0 +1,29 @@
+# Generated by Django 5.1 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0009_notificacion_perfil_usuario_alter_notificacion_tipo'),
+        ('usuarios', '0002_turista_distribucion_en_lectura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntradaTimeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_publicacion', models.DateTimeField()),
+                ('autor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='usuarios.turista')),
+                ('publicacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entradas_timeline', to='feed.publicacion')),
+                ('turista', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='usuarios.turista')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['turista', '-fecha_publicacion', '-publicacion'], name='timeline_turista_fecha_idx')],
+                'unique_together': {('turista', 'publicacion')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1 on 2026-10-18 15:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _conteo(modelo, campo_fk):
+    return Coalesce(
+        Subquery(
+            modelo.objects
+            .filter(**{campo_fk: OuterRef('pk')})
+            .order_by()
+            .values(campo_fk)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def calcular_contadores(apps, schema_editor):
+    Publicacion = apps.get_model('feed', 'Publicacion')
+    Like = apps.get_model('feed', 'Like')
+    Comentario = apps.get_model('feed', 'Comentario')
+    Publicacion.objects.update(
+        likes_count=_conteo(Like, 'publicacion'),
+        comentarios_count=_conteo(Comentario, 'publicacion'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0010_entradatimeline'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='publicacion',
+            old_name='reaccion',
+            new_name='likes_count',
+        ),
+        migrations.AlterField(
+            model_name='publicacion',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='publicacion',
+            name='comentarios_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0011_contadores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DetalleLugar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('place_id', models.CharField(max_length=200, unique=True)),
+                ('nombre', models.CharField(max_length=200)),
+                ('ubicacion', models.CharField(blank=True, max_length=250)),
+                ('latitud', models.FloatField(blank=True, null=True)),
+                ('longitud', models.FloatField(blank=True, null=True)),
+                ('tipos', models.JSONField(default=list)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1 on 2026-10-18 16:20
+
+from django.db import migrations
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        "CREATE FULLTEXT INDEX lugar_busqueda_ft "
+        "ON feed_lugarturistico (nombre, ubicacion, categoria)"
+    )
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute("DROP INDEX lugar_busqueda_ft ON feed_lugarturistico")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0012_detallelugar'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
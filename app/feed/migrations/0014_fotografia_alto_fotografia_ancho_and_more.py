@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0013_lugar_busqueda_fulltext'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fotografia',
+            name='alto',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fotografia',
+            name='ancho',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fotografia',
+            name='rendiciones',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-18 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0014_fotografia_alto_fotografia_ancho_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=120, unique=True)),
+                ('tamano', models.PositiveBigIntegerField()),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
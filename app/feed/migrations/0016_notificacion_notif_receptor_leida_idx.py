@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0015_blob'),
+        ('usuarios', '0003_turista_seguidores_count_turista_siguiendo_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['receptor', 'leida', '-fecha'], name='notif_receptor_leida_idx'),
+        ),
+    ]
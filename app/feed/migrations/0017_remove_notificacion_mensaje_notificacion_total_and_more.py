@@ -0,0 +1,27 @@
+# Generated by Django 5.1 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0016_notificacion_notif_receptor_leida_idx'),
+        ('usuarios', '0003_turista_seguidores_count_turista_siguiendo_count'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='notificacion',
+            name='mensaje',
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='total',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['leida', 'fecha'], name='notif_leida_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1 on 2026-10-18 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0017_remove_notificacion_mensaje_notificacion_total_and_more'),
+        ('usuarios', '0004_indices_seguidor'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entradatimeline',
+            index=models.Index(fields=['turista', 'autor'], name='timeline_turista_autor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['turista', 'publicacion'], name='like_turista_publicacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lugarturistico',
+            index=models.Index(fields=['categoria'], name='lugar_categoria_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['turista', '-fecha_publicacion', '-id'], name='pub_turista_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['-fecha_publicacion', '-id'], name='pub_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0018_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publicacion',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
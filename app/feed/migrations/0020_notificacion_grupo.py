@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-18 17:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0019_publicacion_version'),
+        ('usuarios', '0006_sugerencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacion',
+            name='grupo',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='EmisorNotificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('emisor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='usuarios.turista')),
+                ('notificacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emisores', to='feed.notificacion')),
+            ],
+            options={
+                'unique_together': {('notificacion', 'emisor')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1 on 2026-10-18 17:55
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_categorias(apps, schema_editor):
+    Publicacion = apps.get_model('feed', 'Publicacion')
+    Resena = apps.get_model('feed', 'Resena')
+    Publicacion.objects.update(
+        categoria=Subquery(Resena.objects.filter(pk=OuterRef('resena_id')).values('lugar_turistico__categoria')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0020_notificacion_grupo'),
+        ('usuarios', '0006_sugerencia'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='lugarturistico',
+            name='lugar_categoria_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notificacion',
+            name='notif_receptor_leida_idx',
+        ),
+        migrations.AddField(
+            model_name='publicacion',
+            name='categoria',
+            field=models.CharField(blank=True, choices=[('restaurante', 'Restaurante'), ('bar', 'Bar'), ('cafe', 'Café'), ('museo', 'Museo'), ('parque', 'Parque'), ('monumento', 'Monumento'), ('iglesia', 'Iglesia'), ('hotel', 'Hotel'), ('centro_comercial', 'Centro Comercial'), ('tienda', 'Tienda'), ('entretenimiento', 'Entretenimiento'), ('otro', 'Otro')], editable=False, max_length=50),
+        ),
+        migrations.RunPython(copiar_categorias, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['receptor', 'leida', '-fecha', '-id'], name='notif_receptor_leida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['categoria', '-fecha_publicacion', '-id'], name='pub_categoria_fecha_idx'),
+        ),
+    ]
@@ -32,6 +32,21 @@ class LugarTuristico(models.Model):
     class Meta:
         verbose_name_plural = "Lugares Turísticos"
 
+class DetalleLugar(models.Model):
+    """
+    Detalles de Google Places guardados por place_id, para no pedirlos dos veces.
+    """
+    place_id = models.CharField(max_length=200, unique=True)
+    nombre = models.CharField(max_length=200)
+    ubicacion = models.CharField(max_length=250, blank=True)
+    latitud = models.FloatField(null=True, blank=True)
+    longitud = models.FloatField(null=True, blank=True)
+    tipos = models.JSONField(default=list)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.nombre
+
 class Resena(models.Model):
     lugar_turistico = models.ForeignKey(
         LugarTuristico,
@@ -47,7 +62,17 @@ class Resena(models.Model):
 
 class Publicacion(models.Model):
     fecha_publicacion = models.DateTimeField(auto_now_add=True)
-    reaccion = models.IntegerField(default=0)  
+    # Contadores desnormalizados, se mantienen con F() desde feed/contadores.py
+    likes_count = models.PositiveIntegerField(default=0)
+    comentarios_count = models.PositiveIntegerField(default=0)
+    # Cambia con cada comentario, foto o edición de la reseña: es parte de la
+    # clave de la tarjeta cacheada (ver feed/tarjetas.py)
+    version = models.PositiveIntegerField(default=0)
+    # Copia de resena.lugar_turistico.categoria: el filtro por categoría del
+    # feed recorre un índice propio en lugar de ordenar el resultado del JOIN
+    categoria = models.CharField(
+        max_length=50, choices=LugarTuristico.CATEGORIAS, blank=True, editable=False
+    )
     turista = models.ForeignKey(
         Turista,
         on_delete=models.CASCADE,
@@ -59,15 +84,83 @@ class Publicacion(models.Model):
         related_name='publicaciones'
     )
 
+    class Meta:
+        indexes = [
+            # Perfil y relleno de timelines: publicaciones de un autor por fecha
+            models.Index(fields=['turista', '-fecha_publicacion', '-id'], name='pub_turista_fecha_idx'),
+            # Sección "resto" del feed (keyset global por fecha)
+            models.Index(fields=['-fecha_publicacion', '-id'], name='pub_fecha_idx'),
+            # Sección "resto" filtrada por categoría
+            models.Index(fields=['categoria', '-fecha_publicacion', '-id'], name='pub_categoria_fecha_idx'),
+        ]
+
     def __str__(self):
-        return f"Publicación de {self.turista} ({self.resena.lugar_turistico})"
+        # Solo ids: en un log o en un bucle no dispara consultas por fila
+        return f"Publicación {self.pk} de {self.turista_id}"
+
+    def save(self, *args, **kwargs):
+        if not self.categoria:
+            self.categoria = self.resena.lugar_turistico.categoria
+        super().save(*args, **kwargs)
     
     @property
     def total_likes(self):
-        return self.likes.count()
+        return self.likes_count
+
+
+class EntradaTimeline(models.Model):
+    """
+    Copia de una publicación en el timeline de cada seguidor de su autor
+    (fan-out al escribir). Los autores con `distribucion_en_lectura` no se
+    copian: sus publicaciones se mezclan al leer el feed.
+    """
+    turista = models.ForeignKey(
+        Turista,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    publicacion = models.ForeignKey(
+        Publicacion,
+        on_delete=models.CASCADE,
+        related_name='entradas_timeline'
+    )
+    autor = models.ForeignKey(
+        Turista,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    fecha_publicacion = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('turista', 'publicacion')
+        indexes = [
+            models.Index(
+                fields=['turista', '-fecha_publicacion', '-publicacion'],
+                name='timeline_turista_fecha_idx'
+            ),
+            # vaciar_timeline al dejar de seguir
+            models.Index(fields=['turista', 'autor'], name='timeline_turista_autor_idx'),
+        ]
+
+    def __str__(self):
+        return f"Timeline de {self.turista_id}: publicación {self.publicacion_id}"
 
 
 
+class Blob(models.Model):
+    """
+    Archivo de medios guardado una sola vez por contenido (ver
+    feed/almacenamiento.py). `referencias` cuenta los campos que lo usan.
+    """
+    nombre = models.CharField(max_length=120, unique=True)
+    tamano = models.PositiveBigIntegerField()
+    referencias = models.PositiveIntegerField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.nombre
+
+
 class Fotografia(models.Model):
     resena = models.ForeignKey(
         Resena,
@@ -75,9 +168,34 @@ class Fotografia(models.Model):
         related_name='fotografias'
     )
     fotografia = models.ImageField(upload_to='fotos_resenas/')
+    # Se llenan en la tarea procesar_fotografia (ver feed/imagenes.py)
+    ancho = models.PositiveIntegerField(null=True, blank=True)
+    alto = models.PositiveIntegerField(null=True, blank=True)
+    # {"320": "blobs/ab/cd/abcd....webp", ...} (ver feed/almacenamiento.py)
+    rendiciones = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
-        return f"Foto de la reseña {self.resena.id}"
+        return f"Foto de la reseña {self.resena_id}"
+
+    @property
+    def srcset(self):
+        storage = self.fotografia.storage
+        return ", ".join(
+            f"{storage.url(nombre)} {ancho}w"
+            for ancho, nombre in sorted(self.rendiciones.items(), key=lambda r: int(r[0]))
+        )
+
+    @property
+    def url_ligera(self):
+        """
+        URL de la versión WebP más chica que llena la tarjeta (o el original
+        si todavía no se procesa).
+        """
+        if not self.rendiciones:
+            return self.fotografia.url
+        anchos = sorted(int(ancho) for ancho in self.rendiciones)
+        ancho = next((a for a in anchos if a >= 640), anchos[-1])
+        return self.fotografia.storage.url(self.rendiciones[str(ancho)])
     
 
 class Like(models.Model):
@@ -87,9 +205,13 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ('publicacion', 'turista')  # Evita likes duplicados
+        indexes = [
+            # Likes de un turista (corazones del feed y del perfil) sin leer la tabla
+            models.Index(fields=['turista', 'publicacion'], name='like_turista_publicacion_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.turista} dio like a {self.publicacion}"
+        return f"Like de {self.turista_id} a la publicación {self.publicacion_id}"
     
 
 class Comentario(models.Model):
@@ -107,7 +229,7 @@ class Comentario(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Comentario de {self.turista} en {self.publicacion}"
+        return f"Comentario de {self.turista_id} en la publicación {self.publicacion_id}"
     
 class Notificacion(models.Model):
     TIPOS = [
@@ -134,9 +256,13 @@ class Notificacion(models.Model):
         null=True,
         blank=True
     )
-    mensaje = models.TextField()
+    # Cuántas personas distintas se agruparon aquí; `emisor` es la más reciente
+    total = models.PositiveIntegerField(default=1)
     leida = models.BooleanField(default=False)
     fecha = models.DateTimeField(default=timezone.now)
+    # "receptor:tipo:publicación" mientras acepta más eventos; NULL al leerse
+    # o al vencer la ventana. Único: dos eventos a la vez no abren dos grupos
+    grupo = models.CharField(max_length=64, null=True, blank=True, unique=True, editable=False)
 
     # nuevo campo opcional para vincular un perfil
     perfil_usuario = models.ForeignKey(
@@ -149,6 +275,47 @@ class Notificacion(models.Model):
 
     class Meta:
         ordering = ['-fecha']
+        indexes = [
+            # Campana: no leídas de un receptor, más recientes primero
+            models.Index(
+                fields=['receptor', 'leida', '-fecha', '-id'],
+                name='notif_receptor_leida_idx'
+            ),
+            # Limpieza por antigüedad (feed/notificaciones.py: compactar)
+            models.Index(fields=['leida', 'fecha'], name='notif_leida_fecha_idx'),
+        ]
+
+    # (un solo emisor, varios)
+    MENSAJES = {
+        'like': ("{quien} le dio like a tu publicación.", "{quien} le dieron like a tu publicación."),
+        'comentario': ("{quien} comentó en tu publicación.", "{quien} comentaron en tu publicación."),
+        'nueva_publicacion': ("{quien} ha publicado algo nuevo.", "{quien} publicaron algo nuevo."),
+        'nuevo_seguidor': ("{quien} comenzó a seguirte.", "{quien} comenzaron a seguirte."),
+    }
 
     def __str__(self):
-        return f"{self.receptor} - {self.tipo}"
+        return f"{self.receptor_id} - {self.tipo}"
+
+    @property
+    def mensaje(self):
+        """
+        Texto armado al vuelo, p. ej. "ana y 3 personas más le dieron like...".
+        """
+        singular, plural = self.MENSAJES.get(self.tipo, ("{quien}", "{quien}"))
+        otros = self.total - 1
+        if otros == 0:
+            return singular.format(quien=self.emisor)
+        personas = "1 persona más" if otros == 1 else f"{otros} personas más"
+        return plural.format(quien=f"{self.emisor} y {personas}")
+
+
+class EmisorNotificacion(models.Model):
+    """
+    Quién ya contribuyó a una notificación agrupada, para contar personas y
+    no eventos.
+    """
+    notificacion = models.ForeignKey(Notificacion, on_delete=models.CASCADE, related_name='emisores')
+    emisor = models.ForeignKey(Turista, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('notificacion', 'emisor')
@@ -0,0 +1,79 @@
+"""
+Motor del feed: arma el orden "primero las publicaciones de quienes sigo,
+luego las más recientes" y pagina por cursor (keyset) sobre
+(prioridad, fecha_publicacion, id).
+"""
+import base64
+import json
+from datetime import datetime
+
+from . import timeline
+from .models import Publicacion
+
+TAMANO_PAGINA = 10
+
+PRIORIDAD_SEGUIDOS = 0
+PRIORIDAD_RESTO = 1
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se pudo decodificar."""
+
+
+def codificar_cursor(prioridad, fecha, pk):
+    crudo = json.dumps([prioridad, fecha.isoformat(), pk])
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        prioridad, fecha, pk = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return int(prioridad), datetime.fromisoformat(fecha), int(pk)
+    except (ValueError, TypeError) as e:
+        raise CursorInvalido(cursor) from e
+
+
+def obtener_pagina(turista, categoria='', cursor=None, tamano=TAMANO_PAGINA):
+    """
+    Regresa (publicaciones, siguiente_cursor) para una página del feed.
+    `siguiente_cursor` es None cuando ya no hay más publicaciones.
+
+    La sección de seguidos sale del timeline precalculado (ver timeline.py) y
+    el resto de las publicaciones globales, cada una con su propio keyset.
+    """
+    posicion = decodificar_cursor(cursor)
+    autores_lectura = timeline.autores_en_lectura(turista)
+    limite = tamano + 1
+
+    filas = []
+    if posicion is None or posicion[0] == PRIORIDAD_SEGUIDOS:
+        desde = posicion[1:] if posicion else None
+        filas = [
+            (PRIORIDAD_SEGUIDOS, fecha, pk)
+            for fecha, pk in timeline.seccion_seguidos(turista, categoria, desde, limite, autores_lectura)
+        ]
+    if len(filas) < limite:
+        desde = posicion[1:] if posicion and posicion[0] == PRIORIDAD_RESTO else None
+        filas += [
+            (PRIORIDAD_RESTO, fecha, pk)
+            for fecha, pk in timeline.seccion_resto(turista, categoria, desde, limite - len(filas), autores_lectura)
+        ]
+
+    siguiente = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        siguiente = codificar_cursor(*filas[-1])
+
+    # Las relaciones solo se cargan para las tarjetas que no estén en caché
+    publicaciones = Publicacion.objects.in_bulk([pk for _, _, pk in filas])
+    pagina = []
+    for prioridad, _, pk in filas:
+        publicacion = publicaciones.get(pk)
+        if publicacion is not None:
+            publicacion.prioridad = prioridad
+            pagina.append(publicacion)
+
+    return pagina, siguiente
@@ -0,0 +1,242 @@
+"""
+Contador de notificaciones no leídas y versión por turista, en la caché.
+
+El contador evita un COUNT por cada consulta de la campana; la versión cambia
+con cada notificación nueva o leída y sirve de ETag, así una consulta sin
+novedades se responde con 304 tras una sola lectura de la caché. Las señales
+de feed/signals.py los mantienen al día; los bulk_create (que no disparan
+señales) tienen que llamar a `invalidar`.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.timesince import timesince
+
+from cola.registro import encolar
+from . import eventos
+from .models import Notificacion
+
+ICONOS = {
+    'like': 'bi-hand-thumbs-up-fill text-primary',
+    'comentario': 'bi-chat-dots-fill text-success',
+    'nuevo_seguidor': 'bi-person-plus-fill text-warning',
+    'nueva_publicacion': 'bi-bell-fill text-info',
+}
+
+# Eventos del mismo tipo y publicación dentro de esta ventana se agrupan en
+# una sola notificación mientras siga sin leerse
+VENTANA_AGRUPACION = timedelta(hours=getattr(settings, 'NOTIFICACIONES_VENTANA_HORAS', 24))
+
+# Retención: las leídas se borran a los 30 días, cualquiera a los 180
+RETENCION_LEIDAS = timedelta(days=getattr(settings, 'NOTIFICACIONES_RETENCION_LEIDAS', 30))
+RETENCION_MAXIMA = timedelta(days=getattr(settings, 'NOTIFICACIONES_RETENCION_MAXIMA', 180))
+
+# Veces que `agrupar` reintenta si el grupo cambia entre el INSERT y la lectura
+INTENTOS_AGRUPAR = 3
+
+# El contador se recalcula de la BD al expirar, por si alguna escritura se saltó
+DURACION_CONTADOR = 60 * 10
+DURACION_VERSION = 60 * 60 * 24
+
+
+def _clave_no_leidas(turista_id):
+    return f'notificaciones:no_leidas:{turista_id}'
+
+
+def _clave_version(turista_id):
+    return f'notificaciones:version:{turista_id}'
+
+
+def _contar(turista_id):
+    return Notificacion.objects.filter(receptor_id=turista_id, leida=False).count()
+
+
+def no_leidas(turista_id):
+    total = cache.get(_clave_no_leidas(turista_id))
+    if total is None:
+        total = _contar(turista_id)
+        cache.add(_clave_no_leidas(turista_id), total, DURACION_CONTADOR)
+    return total
+
+
+def version(turista_id):
+    # Una versión nueva al perderse la clave invalida los ETag anteriores
+    return cache.get_or_set(_clave_version(turista_id), time.time_ns, DURACION_VERSION)
+
+
+async def ano_leidas(turista_id):
+    total = await cache.aget(_clave_no_leidas(turista_id))
+    if total is None:
+        total = await Notificacion.objects.filter(receptor_id=turista_id, leida=False).acount()
+        await cache.aadd(_clave_no_leidas(turista_id), total, DURACION_CONTADOR)
+    return total
+
+
+async def aversion(turista_id):
+    return await cache.aget_or_set(_clave_version(turista_id), time.time_ns, DURACION_VERSION)
+
+
+def _aplicar(turista_id, delta):
+    if delta:
+        try:
+            cache.incr(_clave_no_leidas(turista_id), delta)
+        except ValueError:
+            # No estaba en caché: se contará en la siguiente consulta
+            pass
+    try:
+        cache.incr(_clave_version(turista_id))
+    except ValueError:
+        pass
+
+
+def cambio(turista_id, delta):
+    """
+    Suma `delta` a las no leídas de `turista_id` (negativo al leer) y cambia
+    su versión, al confirmarse la transacción actual.
+    """
+    transaction.on_commit(lambda: _aplicar(turista_id, delta))
+
+
+def invalidar(turista_ids):
+    """
+    Descarta contador y versión de varios turistas (fan-out con bulk_create).
+    """
+    claves = []
+    for turista_id in turista_ids:
+        claves += [_clave_no_leidas(turista_id), _clave_version(turista_id)]
+    transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+def marcar_leidas(turista_id, hasta=None, ids=None):
+    """
+    Marca como leídas, con un solo UPDATE, las no leídas de `turista_id`:
+    todas, las de id <= `hasta` y/o las de `ids`. Regresa cuántas cambiaron.
+    """
+    qs = Notificacion.objects.filter(receptor_id=turista_id, leida=False)
+    if hasta is not None:
+        qs = qs.filter(id__lte=hasta)
+    if ids is not None:
+        qs = qs.filter(id__in=ids)
+    # Leída ya no acepta más eventos: el siguiente abre otro grupo
+    marcadas = qs.update(leida=True, grupo=None)
+    if marcadas:
+        cambio(turista_id, -marcadas)
+    return marcadas
+
+
+def notificar(receptor_id, emisor_id, tipo, publicacion_id=None, perfil_usuario_id=None):
+    """
+    Encola la notificación al confirmarse la transacción actual; un
+    trabajador la agrupa (`agrupar`). La petición que la origina no espera
+    ni bloquea nada del receptor.
+    """
+    argumentos = dict(
+        receptor_id=receptor_id, emisor_id=emisor_id, tipo=tipo,
+        publicacion_id=publicacion_id, perfil_usuario_id=perfil_usuario_id,
+    )
+    transaction.on_commit(lambda: encolar('feed.tareas.notificar', **argumentos))
+
+
+def agrupar(receptor_id, emisor_id, tipo, publicacion_id=None, perfil_usuario_id=None):
+    """
+    Crea la notificación o, si el receptor tiene una sin leer del mismo tipo y
+    publicación dentro de la ventana, la acumula en ella. `total` cuenta
+    personas distintas: like de A, de B y otra vez de A son dos.
+    """
+    ahora = timezone.now()
+    grupo = f'{receptor_id}:{tipo}:{publicacion_id or ""}'
+    for _ in range(INTENTOS_AGRUPAR):
+        # Primero el INSERT: el índice único de `grupo` decide quién abre el
+        # grupo. Buscarlo antes con bloqueo toma un gap lock en InnoDB si aún
+        # no existe, y dos eventos a la vez se bloqueaban al insertar.
+        try:
+            with transaction.atomic():
+                nueva = Notificacion.objects.create(
+                    receptor_id=receptor_id, emisor_id=emisor_id, tipo=tipo, publicacion_id=publicacion_id,
+                    perfil_usuario_id=perfil_usuario_id, fecha=ahora, grupo=grupo,
+                )
+                nueva.emisores.create(emisor_id=emisor_id)
+            # Contador y SSE corren por la señal post_save
+            return nueva
+        except IntegrityError as e:
+            error = e
+
+        with transaction.atomic():
+            # Lectura con bloqueo: ve la fila de quien ganó el INSERT
+            existente = Notificacion.objects.select_for_update().filter(grupo=grupo).first()
+            if existente is None:
+                # Se leyó entre el INSERT y esta lectura: otra vuelta
+                continue
+            if existente.fecha < ahora - VENTANA_AGRUPACION:
+                # Ventana vencida: se cierra este grupo y se abre otro
+                Notificacion.objects.filter(pk=existente.pk).update(grupo=None)
+                continue
+
+            _, nuevo_emisor = existente.emisores.get_or_create(emisor_id=emisor_id)
+            if nuevo_emisor:
+                existente.total += 1
+            existente.emisor_id = emisor_id
+            existente.perfil_usuario_id = perfil_usuario_id
+            existente.fecha = ahora
+            existente.save(update_fields=['total', 'emisor', 'perfil_usuario', 'fecha'])
+
+            # Sigue siendo una sola no leída, pero cambió: nueva versión y aviso por SSE
+            cambio(receptor_id, 0)
+            emitir([existente])
+        return existente
+
+    raise error
+
+
+def compactar(lote=1000):
+    """
+    Borra por lotes las notificaciones leídas viejas y las que ya nadie va a
+    leer. Regresa cuántas se borraron.
+    """
+    ahora = timezone.now()
+    vencidas = [
+        Notificacion.objects.filter(leida=True, fecha__lt=ahora - RETENCION_LEIDAS),
+        Notificacion.objects.filter(leida=False, fecha__lt=ahora - RETENCION_MAXIMA),
+    ]
+    total = 0
+    for qs in vencidas:
+        while ids := list(qs.order_by('fecha').values_list('id', flat=True)[:lote]):
+            with transaction.atomic():
+                borradas, _ = Notificacion.objects.filter(id__in=ids).delete()
+            total += borradas
+    return total
+
+
+def emitir(filas):
+    """
+    Empuja las notificaciones a las conexiones SSE de sus receptores cuando
+    se confirma la transacción.
+    """
+    pendientes = [(n.receptor_id, a_dict(n)) for n in filas]
+    if pendientes:
+        transaction.on_commit(lambda: [eventos.publicar(receptor_id, evento) for receptor_id, evento in pendientes])
+
+
+def a_dict(n):
+    """
+    Lo que recibe el navegador por cada notificación (consulta o SSE).
+    """
+    # La URL redirige a la vista que marca como leída y abre el destino
+    url = reverse('feed:abrir_notificacion', args=[n.id])
+    texto = n.mensaje
+
+    return {
+        'id': n.id,
+        'mensaje': texto,
+        'texto': texto,  # compatibilidad para feed
+        'fecha': n.fecha.strftime('%d/%m/%Y %H:%M'),
+        'tiempo': timesince(n.fecha).split(',')[0] + " atrás",
+        'leida': n.leida,
+        'url': url,
+        'icono': ICONOS.get(n.tipo, 'bi-bell'),
+    }
@@ -1,42 +1,427 @@
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import httpx
 import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+from .models import DetalleLugar
+
+logger = logging.getLogger(__name__)
+
+PLACES_API_URL = getattr(settings, 'PLACES_API_URL', "https://maps.googleapis.com/maps/api/place")
+
+# Coordenadas del centro de Zacatecas, Zacatecas
+CENTRO_ZACATECAS = (22.7740, -102.5720)
+RADIO_BUSQUEDA = 25000  # 25 km de radio
+
+# 🔹 Tipos de lugares turísticos o de interés
+TIPOS_TURISTICOS = {
+    "tourist_attraction", "natural_feature", "point_of_interest", "museum", "church",
+    "park", "art_gallery", "zoo", "amusement_park",
+    "hindu_temple", "mosque", "synagogue", "place_of_worship",
+    "city_hall", "library", "aquarium", "stadium", "university",
+    "cemetery", "establishment", "rv_park", "campground", "train_station"
+}
 
-def buscar_lugares_zacatecas(query):
+class ErrorPlaces(requests.RequestException):
+    """Google Places respondió con error o no respondió."""
+
+    def __init__(self, *args, reintentable=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reintentable = reintentable
+
+
+class CircuitoAbierto(ErrorPlaces):
+    """Demasiados errores seguidos: no se consulta a Google por un rato."""
+
+
+class ClientePlaces:
     """
-    Busca lugares en Zacatecas usando Google Places API
+    Cliente único de Google Places: sesión con conexiones persistentes,
+    timeouts de conexión/lectura, reintentos con backoff y jitter, circuit
+    breaker y métricas de latencia por llamada.
     """
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-    
-    params = {
-        'query': f"{query} Zacatecas, México",
-        'key': settings.GOOGLE_MAPS_API_KEY,
+    # Estados de Google que vale la pena reintentar
+    ESTADOS_REINTENTABLES = {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'}
+
+    def __init__(self, base_url=PLACES_API_URL, api_key=None, timeout=(3.05, 10),
+                 reintentos=2, espera_base=0.2, umbral_fallos=5, enfriamiento=30):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=20)
+        self.sesion.mount('https://', adaptador)
+        self.sesion.mount('http://', adaptador)
+
+        self._lock = threading.Lock()
+        self._fallos_seguidos = 0
+        self._abierto_hasta = 0.0
+        self._latencias = deque(maxlen=1000)
+        self._llamadas = 0
+        self._errores = 0
+
+    # ---------- Circuit breaker ----------
+    def _verificar_circuito(self):
+        with self._lock:
+            if time.monotonic() < self._abierto_hasta:
+                raise CircuitoAbierto("Google Places no disponible temporalmente.")
+
+    def _registrar_exito(self):
+        with self._lock:
+            self._fallos_seguidos = 0
+
+    def _registrar_fallo(self):
+        with self._lock:
+            self._fallos_seguidos += 1
+            if self._fallos_seguidos >= self.umbral_fallos:
+                self._abierto_hasta = time.monotonic() + self.enfriamiento
+                logger.warning("Circuito de Google Places abierto por %ss", self.enfriamiento)
+
+    # ---------- Métricas ----------
+    def _registrar_latencia(self, segundos, error):
+        with self._lock:
+            self._llamadas += 1
+            self._errores += bool(error)
+            self._latencias.append(segundos)
+
+    def metricas(self):
+        with self._lock:
+            latencias = sorted(self._latencias)
+            llamadas, errores = self._llamadas, self._errores
+
+        def percentil_ms(p):
+            if not latencias:
+                return None
+            return latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000
+
+        return {
+            'llamadas': llamadas,
+            'errores': errores,
+            'p50_ms': percentil_ms(0.50),
+            'p95_ms': percentil_ms(0.95),
+        }
+
+    # ---------- Llamadas ----------
+    def _url(self, endpoint):
+        return f"{self.base_url}/{endpoint}/json"
+
+    def _params(self, params):
+        return {**params, 'key': self.api_key or settings.GOOGLE_MAPS_API_KEY}
+
+    def _validar(self, status_code, leer_json):
+        if status_code == 429 or status_code >= 500:
+            raise ErrorPlaces(f"HTTP {status_code}", reintentable=True)
+        if status_code >= 400:
+            raise ErrorPlaces(f"HTTP {status_code}")
+        try:
+            data = leer_json()
+        except ValueError as e:
+            # Un proxy o una página de error en lugar de JSON
+            raise ErrorPlaces(f"Respuesta no JSON (HTTP {status_code})") from e
+        estado = data.get('status')
+        if estado in self.ESTADOS_REINTENTABLES:
+            raise ErrorPlaces(estado, reintentable=True)
+        if estado not in ('OK', 'ZERO_RESULTS'):
+            # REQUEST_DENIED, INVALID_REQUEST...: reintentar no ayuda
+            raise ErrorPlaces(f"{estado}: {data.get('error_message', '')}")
+        return data
+
+    def _espera(self, intento):
+        return self.espera_base * (2 ** (intento - 1)) * random.uniform(0.5, 1.5)
+
+    def _intento(self, endpoint, params):
+        inicio = time.perf_counter()
+        error = True
+        try:
+            try:
+                response = self.sesion.get(self._url(endpoint), params=self._params(params), timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                raise ErrorPlaces(str(e), reintentable=True) from e
+            data = self._validar(response.status_code, response.json)
+            error = False
+            return data
+        finally:
+            self._registrar_latencia(time.perf_counter() - inicio, error)
+
+    def consultar(self, endpoint, **params):
+        self._verificar_circuito()
+
+        ultimo_error = None
+        for intento in range(self.reintentos + 1):
+            if intento:
+                time.sleep(self._espera(intento))
+            try:
+                data = self._intento(endpoint, params)
+            except ErrorPlaces as e:
+                ultimo_error = e
+                if not e.reintentable:
+                    break
+                continue
+            self._registrar_exito()
+            return data
+
+        self._registrar_fallo()
+        raise ultimo_error
+
+    def textsearch(self, **params):
+        return self.consultar('textsearch', **params)
+
+    # ---------- Llamadas async (vistas ASGI) ----------
+    def _cliente_async(self):
+        # Uno por consulta (con sus reintentos) y cerrado al terminar: un
+        # httpx.AsyncClient queda ligado al event loop donde se creó
+        connect, read = self.timeout
+        return httpx.AsyncClient(timeout=httpx.Timeout(read, connect=connect))
+
+    async def _aintento(self, http, endpoint, params):
+        inicio = time.perf_counter()
+        error = True
+        try:
+            try:
+                response = await http.get(self._url(endpoint), params=self._params(params))
+            except httpx.TransportError as e:
+                raise ErrorPlaces(str(e), reintentable=True) from e
+            data = self._validar(response.status_code, response.json)
+            error = False
+            return data
+        finally:
+            self._registrar_latencia(time.perf_counter() - inicio, error)
+
+    async def aconsultar(self, endpoint, **params):
+        self._verificar_circuito()
+
+        ultimo_error = None
+        async with self._cliente_async() as http:
+            for intento in range(self.reintentos + 1):
+                if intento:
+                    await asyncio.sleep(self._espera(intento))
+                try:
+                    data = await self._aintento(http, endpoint, params)
+                except ErrorPlaces as e:
+                    ultimo_error = e
+                    if not e.reintentable:
+                        break
+                    continue
+                self._registrar_exito()
+                return data
+
+        self._registrar_fallo()
+        raise ultimo_error
+
+    async def atextsearch(self, **params):
+        return await self.aconsultar('textsearch', **params)
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def cliente():
+    """
+    Cliente compartido por todo el proceso (una sola sesión y pool de conexiones).
+    """
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                _cliente = ClientePlaces()
+    return _cliente
+
+
+def _lugar_a_dict(place):
+    ubicacion = place.get("geometry", {}).get("location", {})
+    return {
+        "id": None,
+        "nombre": place.get("name"),
+        "ubicacion": place.get("formatted_address"),
+        "place_id": place.get("place_id"),
+        "latitud": ubicacion.get("lat"),
+        "longitud": ubicacion.get("lng"),
+        "tipos": place.get("types", []),
+    }
+
+
+# Búsquedas idénticas en curso: la primera consulta a Google, las demás esperan su resultado
+_en_curso = {}
+_en_curso_lock = threading.Lock()
+
+
+def normalizar_consulta(query):
+    """
+    "  Museo   Zacatecas " y "museo zacatecas" comparten la misma entrada de caché.
+    """
+    return " ".join(query.casefold().split())
+
+
+def _clave_cache(consulta):
+    return "places:textsearch:" + hashlib.sha1(consulta.encode()).hexdigest()
+
+
+def _params_textsearch(consulta):
+    lat, lng = CENTRO_ZACATECAS
+    return {
+        'query': consulta,
+        'location': f"{lat},{lng}",
+        'radius': RADIO_BUSQUEDA,
         'language': 'es',
-        'region': 'mx'
     }
-    
+
+
+def _lugares_turisticos(data):
+    """
+    Deja solo los lugares turísticos dentro de Zacatecas.
+    """
+    resultados = []
+    for lugar in data.get("results", []):
+        direccion = lugar.get("formatted_address", "").lower()
+        tipos = set(lugar.get("types", []))
+
+        # 🔸 Filtrar por ubicación
+        if "zacatecas" not in direccion or "méxico" not in direccion:
+            continue
+
+        # 🔸 Filtrar por relevancia turística
+        if not tipos.intersection(TIPOS_TURISTICOS):
+            continue
+
+        resultados.append(_lugar_a_dict(lugar))
+    return resultados
+
+
+def _consultar_textsearch(consulta):
+    return _lugares_turisticos(cliente().textsearch(**_params_textsearch(consulta)))
+
+
+def guardar_detalles(lugares):
+    """
+    Persiste los detalles de cada place_id para no volver a pedirlos.
+    """
+    # MySQL resuelve el conflicto con ON DUPLICATE KEY, sin indicar la columna
+    conflicto = (
+        {'unique_fields': ['place_id']}
+        if connection.features.supports_update_conflicts_with_target else {}
+    )
+    DetalleLugar.objects.bulk_create(
+        [
+            DetalleLugar(
+                place_id=lugar["place_id"],
+                nombre=lugar["nombre"],
+                ubicacion=lugar["ubicacion"] or "",
+                latitud=lugar["latitud"],
+                longitud=lugar["longitud"],
+                tipos=lugar["tipos"],
+            )
+            for lugar in lugares if lugar["place_id"]
+        ],
+        update_conflicts=True,
+        update_fields=['nombre', 'ubicacion', 'latitud', 'longitud', 'tipos', 'actualizado'],
+        **conflicto,
+    )
+
+
+def detalle_lugar(place_id):
+    """
+    Detalles guardados de un place_id, o None si nunca se ha visto.
+    """
+    return DetalleLugar.objects.filter(place_id=place_id).first()
+
+
+def buscar_lugares_cercanos(query):
+    """
+    Busca lugares turísticos alrededor de Zacatecas con caché por consulta
+    normalizada. Consultas idénticas simultáneas comparten una sola llamada.
+    """
+    consulta = normalizar_consulta(query)
+    if not consulta:
+        return []
+
+    cache = caches['places']
+    clave = _clave_cache(consulta)
+    resultados = cache.get(clave)
+    if resultados is not None:
+        return resultados
+
+    with _en_curso_lock:
+        futuro = _en_curso.get(clave)
+        propio = futuro is None
+        if propio:
+            futuro = _en_curso[clave] = Future()
+
+    if not propio:
+        return futuro.result()
+
     try:
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if data.get('status') == 'OK':
-            resultados = []
-            for place in data.get('results', [])[:10]:
-                resultados.append({
-                    'place_id': place.get('place_id'),
-                    'nombre': place.get('name'),
-                    'ubicacion': place.get('formatted_address'),
-                    'latitud': place.get('geometry', {}).get('location', {}).get('lat'),
-                    'longitud': place.get('geometry', {}).get('location', {}).get('lng'),
-                    'tipos': place.get('types', [])
-                })
-            return resultados
-        else:
-            print(f"Error en API: {data.get('status')}")
-            return []
+        resultados = _consultar_textsearch(consulta)
+        cache.set(clave, resultados)
+        guardar_detalles(resultados)
+        futuro.set_result(resultados)
     except Exception as e:
-        print(f"Error al buscar lugares: {e}")
+        futuro.set_exception(e)
+        raise
+    finally:
+        with _en_curso_lock:
+            del _en_curso[clave]
+
+    return resultados
+
+
+# Versión async: mismas claves de caché, coalescencia con futures de asyncio
+_en_curso_async = {}
+
+
+async def abuscar_lugares_cercanos(query):
+    """
+    Igual que buscar_lugares_cercanos, pero sin bloquear el event loop.
+    """
+    consulta = normalizar_consulta(query)
+    if not consulta:
         return []
 
+    cache = caches['places']
+    clave = _clave_cache(consulta)
+    resultados = await cache.aget(clave)
+    if resultados is not None:
+        return resultados
+
+    futuro = _en_curso_async.get(clave)
+    if futuro is not None and futuro.get_loop() is asyncio.get_running_loop():
+        return await asyncio.shield(futuro)
+
+    futuro = _en_curso_async[clave] = asyncio.get_running_loop().create_future()
+    try:
+        data = await cliente().atextsearch(**_params_textsearch(consulta))
+        resultados = _lugares_turisticos(data)
+        await cache.aset(clave, resultados)
+        await sync_to_async(guardar_detalles)(resultados)
+        futuro.set_result(resultados)
+    except Exception as e:
+        futuro.set_exception(e)
+        # Nadie más esperaba: evita el aviso de excepción no recuperada
+        futuro.exception()
+        raise
+    finally:
+        if _en_curso_async.get(clave) is futuro:
+            del _en_curso_async[clave]
+
+    return resultados
+
 
 def categorizar_lugar(tipos):
     """
@@ -1,54 +1,207 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from .models import Like, Comentario, Publicacion, Notificacion
-from usuarios.models import Seguidor
+from django.contrib.auth.models import User
+from .models import Like, Comentario, Publicacion, Notificacion, Fotografia, Resena, LugarTuristico
+from usuarios import grafo, sugerencias
+from usuarios.models import Seguidor, Sugerencia
+from . import contadores, likes, notificaciones, tarjetas, tareas, timeline
+from .almacenamiento import liberar
+from usuarios.models import Turista
+
+# Contadores desnormalizados
+@receiver(post_save, sender=Like)
+def sumar_like(sender, instance, created, **kwargs):
+    if created:
+        contadores.incrementar(Publicacion, instance.publicacion_id, 'likes_count')
+        # El filtro de likes del turista ya no incluye este (ver feed/likes.py)
+        likes.invalidar(instance.turista_id)
+
+@receiver(post_delete, sender=Like)
+def restar_like(sender, instance, **kwargs):
+    contadores.incrementar(Publicacion, instance.publicacion_id, 'likes_count', -1)
+
+@receiver(post_save, sender=Comentario)
+def sumar_comentario(sender, instance, created, **kwargs):
+    if created:
+        contadores.incrementar(Publicacion, instance.publicacion_id, 'comentarios_count')
+
+@receiver(post_delete, sender=Comentario)
+def restar_comentario(sender, instance, **kwargs):
+    contadores.incrementar(Publicacion, instance.publicacion_id, 'comentarios_count', -1)
+
+@receiver(post_save, sender=Seguidor)
+def sumar_seguidor(sender, instance, created, **kwargs):
+    if created:
+        contadores.incrementar(Turista, instance.turista_seguido_id, 'seguidores_count')
+        contadores.incrementar(Turista, instance.turista_seguidor_id, 'siguiendo_count')
+
+@receiver(post_delete, sender=Seguidor)
+def restar_seguidor(sender, instance, **kwargs):
+    contadores.incrementar(Turista, instance.turista_seguido_id, 'seguidores_count', -1)
+    contadores.incrementar(Turista, instance.turista_seguidor_id, 'siguiendo_count', -1)
+
+# Ids de seguidos/seguidores en la caché (usuarios/grafo.py)
+@receiver(post_save, sender=Seguidor)
+@receiver(post_delete, sender=Seguidor)
+def invalidar_grafo(sender, instance, **kwargs):
+    grafo.invalidar(instance.turista_seguidor_id, instance.turista_seguido_id)
 
 # Notificación por like
 @receiver(post_save, sender=Like)
 def crear_notificacion_like(sender, instance, created, **kwargs):
-    if created and instance.publicacion.turista != instance.turista:
-        Notificacion.objects.create(
-            receptor=instance.publicacion.turista,
-            emisor=instance.turista,
+    if created and instance.publicacion.turista_id != instance.turista_id:
+        notificaciones.notificar(
+            receptor_id=instance.publicacion.turista_id,
+            emisor_id=instance.turista_id,
             tipo='like',
-            publicacion=instance.publicacion,
-            mensaje=f"{instance.turista} le dio like a tu publicación."
+            publicacion_id=instance.publicacion_id,
         )
 
 # Notificación por comentario
 @receiver(post_save, sender=Comentario)
 def crear_notificacion_comentario(sender, instance, created, **kwargs):
-    if created and instance.publicacion.turista != instance.turista:
-        Notificacion.objects.create(
-            receptor=instance.publicacion.turista,
-            emisor=instance.turista,
+    if created and instance.publicacion.turista_id != instance.turista_id:
+        notificaciones.notificar(
+            receptor_id=instance.publicacion.turista_id,
+            emisor_id=instance.turista_id,
             tipo='comentario',
-            publicacion=instance.publicacion,
-            mensaje=f"{instance.turista} comentó en tu publicación."
+            publicacion_id=instance.publicacion_id,
         )
 
-# Notificación por nueva publicación
+# Notificación por nueva publicación (fan-out por bloques en los trabajadores de la cola)
 @receiver(post_save, sender=Publicacion)
 def crear_notificacion_publicacion(sender, instance, created, **kwargs):
     if created:
-        seguidores = instance.turista.seguidores.all()
-        for seguidor in seguidores:
-            Notificacion.objects.create(
-                receptor=seguidor.turista_seguidor,
-                emisor=instance.turista,
-                tipo='nueva_publicacion',
-                publicacion=instance,
-                mensaje=f"{instance.turista} ha publicado algo nuevo."
-            )
+        tareas.distribuir_publicacion.encolar(publicacion_id=instance.pk)
+
+# Sugerencias: a quien se empieza a seguir deja de sugerirse, y las del
+# turista se recalculan más tarde (también al publicar: lugares nuevos)
+@receiver(post_save, sender=Seguidor)
+def actualizar_sugerencias_seguidor(sender, instance, created, **kwargs):
+    if created:
+        Sugerencia.objects.filter(
+            turista_id=instance.turista_seguidor_id, sugerido_id=instance.turista_seguido_id
+        ).delete()
+        sugerencias.programar(instance.turista_seguidor_id)
+
+@receiver(post_save, sender=Publicacion)
+def actualizar_sugerencias_publicacion(sender, instance, created, **kwargs):
+    if created:
+        sugerencias.programar(instance.turista_id)
+
+# Limpieza y versiones WebP de cada foto nueva, fuera de la petición
+@receiver(post_save, sender=Fotografia)
+def procesar_fotografia(sender, instance, created, **kwargs):
+    if created:
+        tareas.procesar_fotografia.encolar(fotografia_id=instance.pk)
+
+# Contador de no leídas, versión (ETag) y aviso por SSE al receptor
+@receiver(post_save, sender=Notificacion)
+def contar_notificacion(sender, instance, created, **kwargs):
+    if created and not instance.leida:
+        notificaciones.cambio(instance.receptor_id, 1)
+        notificaciones.emitir([instance])
+
+@receiver(post_delete, sender=Notificacion)
+def descontar_notificacion(sender, instance, **kwargs):
+    # Las leídas (p. ej. al compactar) no cambian lo que muestra la campana
+    if not instance.leida:
+        notificaciones.cambio(instance.receptor_id, -1)
+
+# Los archivos se sueltan al borrar la foto (también en cascada desde la reseña)
+@receiver(post_delete, sender=Fotografia)
+def liberar_fotografia(sender, instance, **kwargs):
+    liberar(instance.fotografia.storage, instance.fotografia.name, *instance.rendiciones.values())
+
+# Tarjetas cacheadas: cualquier cambio en lo que muestran sube la versión de
+# la publicación. Los likes no, se renderizan fuera de la caché
+@receiver(post_save, sender=Comentario)
+def invalidar_tarjeta_comentario_guardado(sender, instance, **kwargs):
+    tarjetas.invalidar(pk=instance.publicacion_id)
+
+@receiver(post_delete, sender=Comentario)
+def invalidar_tarjeta_comentario_borrado(sender, instance, **kwargs):
+    tarjetas.invalidar(pk=instance.publicacion_id)
+
+@receiver(post_save, sender=Fotografia)
+@receiver(post_delete, sender=Fotografia)
+def invalidar_tarjeta_fotografia(sender, instance, **kwargs):
+    tarjetas.invalidar(resena_id=instance.resena_id)
+
+@receiver(post_save, sender=Resena)
+def invalidar_tarjeta_resena(sender, instance, created, **kwargs):
+    if not created:
+        tarjetas.invalidar(resena_id=instance.pk)
+
+@receiver(post_save, sender=LugarTuristico)
+def invalidar_tarjetas_lugar(sender, instance, created, **kwargs):
+    # Nombre, categoría y ubicación del lugar van en la tarjeta y en el detalle
+    if not created:
+        tarjetas.invalidar(resena__lugar_turistico_id=instance.pk)
+
+@receiver(post_save, sender=Turista)
+def invalidar_tarjetas_turista(sender, instance, created, **kwargs):
+    # Del turista la tarjeta solo muestra la foto (el nombre sale de User)
+    if getattr(instance, '_foto_perfil_cambiada', False):
+        tarjetas.invalidar(turista_id=instance.pk)
+
+@receiver(post_save, sender=User)
+def invalidar_tarjetas_usuario(sender, instance, created, update_fields=None, **kwargs):
+    # Cada login guarda last_login; eso no cambia ninguna tarjeta
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    tarjetas.invalidar(turista__usuario_id=instance.pk)
 
 # Notificación por nuevo seguidor
 @receiver(post_save, sender=Seguidor)
 def crear_notificacion_seguidor(sender, instance, created, **kwargs):
     if created:
-        Notificacion.objects.create(
-            receptor=instance.turista_seguido,
-            emisor=instance.turista_seguidor,
+        notificaciones.notificar(
+            receptor_id=instance.turista_seguido_id,
+            emisor_id=instance.turista_seguidor_id,
             tipo='nuevo_seguidor',
-            mensaje=f"{instance.turista_seguidor} comenzó a seguirte.",
-            perfil_usuario=instance.turista_seguidor
+            perfil_usuario_id=instance.turista_seguidor_id
         )
+
+# Timeline al seguir / dejar de seguir
+@receiver(post_save, sender=Seguidor)
+def rellenar_timeline_seguidor(sender, instance, created, **kwargs):
+    if created:
+        timeline.actualizar_distribucion(instance.turista_seguido)
+        tareas.rellenar_timeline.encolar(
+            turista_id=instance.turista_seguidor_id,
+            autor_id=instance.turista_seguido_id
+        )
+
+@receiver(post_delete, sender=Seguidor)
+def vaciar_timeline_seguidor(sender, instance, **kwargs):
+    timeline.vaciar_timeline(instance.turista_seguidor_id, instance.turista_seguido_id)
+    timeline.actualizar_distribucion(instance.turista_seguido)
+
+
+# Publicacion.categoria es una copia de la del lugar (filtro del feed)
+@receiver(post_save, sender=LugarTuristico)
+def copiar_categoria_lugar(sender, instance, created, **kwargs):
+    if not created:
+        Publicacion.objects.filter(resena__lugar_turistico=instance).exclude(
+            categoria=instance.categoria
+        ).update(categoria=instance.categoria)
+
+
+# Foto de perfil reemplazada o cuenta eliminada: se suelta el archivo anterior
+@receiver(pre_save, sender=Turista)
+def liberar_foto_perfil_anterior(sender, instance, update_fields=None, **kwargs):
+    instance._foto_perfil_cambiada = False
+    if instance._state.adding or (update_fields is not None and 'foto_perfil' not in update_fields):
+        return
+    anterior = Turista.objects.filter(pk=instance.pk).values_list('foto_perfil', flat=True).first()
+    if (anterior or '') != (instance.foto_perfil.name or ''):
+        # invalidar_tarjetas_turista lo revisa después de guardar
+        instance._foto_perfil_cambiada = True
+        if anterior:
+            liberar(instance.foto_perfil.storage, anterior)
+
+
+@receiver(post_delete, sender=Turista)
+def liberar_foto_perfil(sender, instance, **kwargs):
+    liberar(instance.foto_perfil.storage, instance.foto_perfil.name)
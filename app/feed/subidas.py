@@ -0,0 +1,118 @@
+"""
+Manejador de subida para las fotos de las reseñas.
+
+Revisa cada foto mientras llegan los bloques del multipart: cuántas van, cuánto
+pesan y qué son según sus primeros bytes (no según el content_type que manda
+el navegador). Al primer problema deja de leer y descarta lo recibido, así una
+subida inválida no termina en memoria ni en disco. Las fotos válidas se
+escriben directo a un temporal.
+
+Si el Content-Length ya rebasa el máximo, el cuerpo no se lee en absoluto y
+la vista responde 413.
+"""
+from django.conf import settings
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+
+MAXIMO_FOTOS = 3
+
+# Bytes por foto
+TAMANO_MAXIMO = getattr(settings, 'FOTOS_TAMANO_MAXIMO', 10 * 1024 * 1024)
+
+# Margen para los campos de texto del formulario
+MARGEN_FORMULARIO = 64 * 1024
+
+FIRMAS = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+)
+
+
+def detectar_tipo(cabecera):
+    """
+    Tipo de imagen según los primeros bytes, o None si no es JPG, PNG ni WEBP.
+    """
+    for firma, tipo in FIRMAS:
+        if cabecera.startswith(firma):
+            return tipo
+    if cabecera[:4] == b'RIFF' and cabecera[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+class ManejadorFotosResena(FileUploadHandler):
+    """
+    Solo atiende el campo `campo`; los demás archivos pasan a los manejadores
+    por defecto. Los motivos de rechazo quedan en `errores`.
+    """
+
+    def __init__(self, request=None, campo='fotografias'):
+        super().__init__(request)
+        self.campo = campo
+        self.errores = []
+        self.fotos = 0
+        self.activo = False
+        self.excedido = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > MAXIMO_FOTOS * TAMANO_MAXIMO + MARGEN_FORMULARIO:
+            self.excedido = True
+            self.errores.append("Las fotografías superan el tamaño permitido.")
+            # Formulario vacío: el parser no toca el cuerpo
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def _rechazar(self, error):
+        self.errores.append(error)
+        # Se deja de procesar el cuerpo: ni memoria ni disco para lo que falta.
+        # Lo que resta se descarta sin guardarlo; su tamaño ya se revisó en
+        # handle_raw_input
+        raise StopUpload(connection_reset=False)
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.activo = field_name == self.campo
+        if not self.activo:
+            return
+
+        self.fotos += 1
+        if self.fotos > MAXIMO_FOTOS:
+            self._rechazar(f"Solo puedes subir un máximo de {MAXIMO_FOTOS} fotografías.")
+
+        self.tamano = 0
+        self.tipo = None
+        self.file = TemporaryUploadedFile(self.file_name, content_type, 0, self.charset, self.content_type_extra)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.activo:
+            return raw_data
+
+        if start == 0:
+            self.tipo = detectar_tipo(raw_data[:16])
+            if self.tipo is None:
+                self._rechazar(f"El archivo '{self.file_name}' no es válido. Solo se permiten JPG, PNG o WEBP.")
+
+        self.tamano += len(raw_data)
+        if self.tamano > TAMANO_MAXIMO:
+            self._rechazar(
+                f"El archivo '{self.file_name}' pesa más de {TAMANO_MAXIMO // (1024 * 1024)} MB."
+            )
+
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.activo:
+            return None
+        self.activo = False
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.content_type = self.tipo
+        self.file.tipo_detectado = self.tipo
+        return self.file
+
+    def upload_interrupted(self):
+        if self.activo and hasattr(self, 'file'):
+            self.file.close()
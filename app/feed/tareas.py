@@ -0,0 +1,50 @@
+"""
+Tareas de la app feed que se ejecutan en los trabajadores de la cola
+(`manage.py run_workers`).
+"""
+from cola.registro import tarea
+from usuarios.models import Seguidor, Turista
+from . import distribucion, imagenes, likes, notificaciones, timeline
+from .models import Fotografia, Publicacion
+
+
+@tarea
+def distribuir_publicacion(publicacion_id):
+    distribucion.distribuir_publicacion(publicacion_id)
+
+
+@tarea
+def rellenar_timeline(turista_id, autor_id):
+    relacion = (
+        Seguidor.objects
+        .select_related('turista_seguido')
+        .filter(turista_seguidor_id=turista_id, turista_seguido_id=autor_id)
+        .first()
+    )
+    # Si ya lo dejó de seguir no hay nada que copiar
+    if relacion is not None:
+        timeline.rellenar_timeline(turista_id, relacion.turista_seguido)
+
+
+@tarea
+def procesar_fotografia(fotografia_id):
+    fotografia = Fotografia.objects.filter(pk=fotografia_id).first()
+    # Ya procesada o eliminada antes de que llegara el trabajador
+    if fotografia is not None and not fotografia.rendiciones:
+        imagenes.procesar_fotografia(fotografia)
+
+
+@tarea
+def volcar_likes(publicacion_id):
+    # Write-behind del contador de likes (LIKES_BUFFER)
+    likes.volcar(publicacion_id)
+
+
+@tarea
+def notificar(receptor_id, emisor_id, tipo, publicacion_id=None, perfil_usuario_id=None):
+    # Emisor o publicación borrados antes de que llegara el trabajador
+    if not Turista.objects.filter(pk=emisor_id).exists():
+        return
+    if publicacion_id is not None and not Publicacion.objects.filter(pk=publicacion_id).exists():
+        return
+    notificaciones.agrupar(receptor_id, emisor_id, tipo, publicacion_id, perfil_usuario_id)
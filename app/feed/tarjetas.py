@@ -0,0 +1,66 @@
+"""
+Tarjetas de publicación cacheadas (publicacion_card.html), compartidas por el
+feed y el perfil.
+
+Cada tarjeta se guarda ya renderizada con la clave (id, version); la versión
+de la publicación sube con cada comentario, foto o cambio de la reseña, del
+lugar o de la foto del autor, así que una tarjeta vieja nunca se vuelve a servir y no hay que borrar
+nada. Lo que depende de quien mira (si ya dio like) y el contador de likes,
+que cambia a cada rato, se renderizan aparte en cada petición
+(publicacion_likes.html) y van donde la tarjeta tiene la MARCA.
+"""
+from django.core.cache import cache
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Publicacion
+
+MARCA = '<!--likes-->'
+
+DURACION = 60 * 60 * 24
+
+# Lo que usa la tarjeta; solo se carga para las que no estaban en caché
+CON_JOIN = ('turista__usuario', 'resena__lugar_turistico')
+PREFETCH = ('resena__fotografias', 'comentarios__turista__usuario')
+
+
+def _clave(publicacion):
+    return f'tarjeta:{publicacion.id}:{publicacion.version}'
+
+
+def preparar(publicaciones):
+    """
+    Deja en `pub.tarjeta` las dos mitades de la tarjeta de cada publicación
+    (antes y después de los likes), con una sola lectura de la caché.
+    """
+    publicaciones = list(publicaciones)
+    claves = {publicacion.id: _clave(publicacion) for publicacion in publicaciones}
+    guardadas = cache.get_many(list(claves.values()))
+
+    faltantes = [pk for pk, clave in claves.items() if clave not in guardadas]
+    nuevas = {}
+    for publicacion in (
+        Publicacion.objects.filter(id__in=faltantes).select_related(*CON_JOIN).prefetch_related(*PREFETCH)
+        if faltantes else ()
+    ):
+        # Con la clave de la página: la versión pudo subir entre las dos consultas
+        html = render_to_string('publicacion_card.html', {'pub': publicacion})
+        nuevas[claves[publicacion.id]] = tuple(html.split(MARCA, 1))
+    if nuevas:
+        cache.set_many(nuevas, DURACION)
+
+    guardadas.update(nuevas)
+    # Las que se borraron entre las dos consultas se omiten
+    publicaciones = [publicacion for publicacion in publicaciones if claves[publicacion.id] in guardadas]
+    for publicacion in publicaciones:
+        publicacion.tarjeta = [mark_safe(parte) for parte in guardadas[claves[publicacion.id]]]
+    return publicaciones
+
+
+def invalidar(**filtros):
+    """
+    Sube la versión de las publicaciones que cumplan `filtros`
+    (p. ej. pk=..., resena_id=..., turista_id=...).
+    """
+    Publicacion.objects.filter(**filtros).update(version=F('version') + 1)
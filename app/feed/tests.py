@@ -1,3 +1,1161 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from red_social.consultas import presupuesto_consultas
+from usuarios import grafo
+from usuarios.models import Seguidor, Turista
+from . import (
+    busqueda_lugares, contadores, datos_sinteticos, distribucion, eventos, imagenes, likes, motor_feed,
+    notificaciones, places_api, subidas, tarjetas, timeline, views,
+)
+from .models import (
+    Blob, Comentario, DetalleLugar, EntradaTimeline, Fotografia, Like, LugarTuristico, Notificacion,
+    Publicacion, Resena,
+)
+
+
+class ServidorPlacesFalso:
+    """
+    Servidor HTTP local que imita Google Places. `respuestas` es una lista de
+    (status_http, cuerpo) que se consumen en orden; la última se repite.
+    """
+
+    def __init__(self, respuestas):
+        self.respuestas = list(respuestas)
+        self.peticiones = []
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                servidor.peticiones.append((url.path, parse_qs(url.query)))
+                status, cuerpo = (
+                    servidor.respuestas.pop(0) if len(servidor.respuestas) > 1
+                    else servidor.respuestas[0]
+                )
+                # Un str se manda tal cual (respuestas que no son JSON)
+                datos = cuerpo.encode() if isinstance(cuerpo, str) else json.dumps(cuerpo).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self.conexiones = set()
+        self.httpd.process_request_thread = self._contar_conexion(self.httpd.process_request_thread)
+
+    def _contar_conexion(self, original):
+        def procesar(request, client_address):
+            self.conexiones.add(client_address)
+            return original(request, client_address)
+        return procesar
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def lugar_zacatecas(place_id='p1', nombre='Museo Goitia'):
+    return {
+        'name': nombre,
+        'formatted_address': 'Zacatecas, Zac., México',
+        'place_id': place_id,
+        'geometry': {'location': {'lat': 22.77, 'lng': -102.57}},
+        'types': ['museum', 'point_of_interest'],
+    }
+
+
+OK = (200, {'status': 'OK', 'results': [lugar_zacatecas()]})
+
+
+class ClientePlacesTests(TestCase):
+
+    def cliente(self, servidor, **kwargs):
+        kwargs.setdefault('espera_base', 0)
+        return places_api.ClientePlaces(base_url=servidor.url, api_key='prueba', **kwargs)
+
+    def test_reutiliza_la_conexion(self):
+        with ServidorPlacesFalso([OK]) as servidor:
+            cliente = self.cliente(servidor)
+            for _ in range(3):
+                cliente.textsearch(query='museo')
+
+        self.assertEqual(len(servidor.peticiones), 3)
+        self.assertEqual(len(servidor.conexiones), 1)
+        self.assertEqual(servidor.peticiones[0][1]['key'], ['prueba'])
+
+    def test_reintenta_errores_del_servidor(self):
+        with ServidorPlacesFalso([(503, {}), (200, {'status': 'UNKNOWN_ERROR'}), OK]) as servidor:
+            data = self.cliente(servidor).textsearch(query='museo')
+
+        self.assertEqual(data['status'], 'OK')
+        self.assertEqual(len(servidor.peticiones), 3)
+
+    def test_no_reintenta_peticiones_invalidas(self):
+        with ServidorPlacesFalso([(200, {'status': 'REQUEST_DENIED'})]) as servidor:
+            with self.assertRaises(places_api.ErrorPlaces):
+                self.cliente(servidor).textsearch(query='museo')
+
+        self.assertEqual(len(servidor.peticiones), 1)
+
+    def test_circuito_se_abre_tras_fallos_seguidos(self):
+        with ServidorPlacesFalso([(500, {})]) as servidor:
+            cliente = self.cliente(servidor, reintentos=0, umbral_fallos=2)
+            for _ in range(2):
+                with self.assertRaises(places_api.ErrorPlaces):
+                    cliente.textsearch(query='museo')
+            with self.assertRaises(places_api.CircuitoAbierto):
+                cliente.textsearch(query='museo')
+
+        self.assertEqual(len(servidor.peticiones), 2)
+        self.assertEqual(cliente.metricas()['errores'], 2)
+
+    async def test_respuesta_que_no_es_json(self):
+        with ServidorPlacesFalso([(200, '<html>Bad gateway</html>')]) as servidor:
+            cliente = self.cliente(servidor)
+            with self.assertRaises(places_api.ErrorPlaces):
+                await sync_to_async(cliente.textsearch)(query='museo')
+            with self.assertRaises(places_api.ErrorPlaces):
+                await cliente.atextsearch(query='museo')
+
+        self.assertEqual(len(servidor.peticiones), 2)
+
+    async def test_cliente_async_por_consulta_y_cerrado(self):
+        with ServidorPlacesFalso([(503, {}), OK]) as servidor:
+            cliente = self.cliente(servidor)
+            http = cliente._cliente_async()
+            with mock.patch.object(cliente, '_cliente_async', return_value=http):
+                data = await cliente.atextsearch(query='museo')
+
+        self.assertEqual(data['status'], 'OK')
+        # Los reintentos van por la misma conexión y el cliente se cierra al final
+        self.assertEqual(len(servidor.peticiones), 2)
+        self.assertEqual(len(servidor.conexiones), 1)
+        self.assertTrue(http.is_closed)
+
+
+class BuscarLugaresCercanosTests(TestCase):
+
+    def setUp(self):
+        caches['places'].clear()
+
+    def test_consultas_normalizadas_usan_la_cache(self):
+        with ServidorPlacesFalso([OK]) as servidor:
+            cliente = places_api.ClientePlaces(base_url=servidor.url, api_key='prueba')
+            with mock.patch.object(places_api, '_cliente', cliente):
+                primera = places_api.buscar_lugares_cercanos('Museo')
+                segunda = places_api.buscar_lugares_cercanos('  museo ')
+
+        self.assertEqual(primera, segunda)
+        self.assertEqual(len(servidor.peticiones), 1)
+        self.assertTrue(DetalleLugar.objects.filter(place_id='p1').exists())
+
+    def test_consultas_simultaneas_comparten_una_llamada(self):
+        arranque = threading.Barrier(5)
+        original = places_api._consultar_textsearch
+
+        def lenta(consulta):
+            time.sleep(0.2)  # las demás llegan mientras responde
+            return original(consulta)
+
+        def buscar(_):
+            arranque.wait()
+            return places_api.buscar_lugares_cercanos('Museo')
+
+        with ServidorPlacesFalso([OK]) as servidor:
+            cliente = places_api.ClientePlaces(base_url=servidor.url, api_key='prueba')
+            # Solo el hilo que consulta guarda detalles; aquí no se toca la BD desde otros hilos
+            with mock.patch.object(places_api, '_cliente', cliente), \
+                    mock.patch.object(places_api, '_consultar_textsearch', lenta), \
+                    mock.patch.object(places_api, 'guardar_detalles') as guardar, \
+                    ThreadPoolExecutor(5) as hilos:
+                resultados = list(hilos.map(buscar, range(5)))
+
+        self.assertEqual(len(servidor.peticiones), 1)
+        self.assertEqual(guardar.call_count, 1)
+        self.assertTrue(all(r == resultados[0] for r in resultados))
+
+    async def test_version_async_agrupa_consultas_simultaneas(self):
+        with ServidorPlacesFalso([OK]) as servidor:
+            cliente = places_api.ClientePlaces(base_url=servidor.url, api_key='prueba')
+            with mock.patch.object(places_api, '_cliente', cliente):
+                resultados = await asyncio.gather(*[
+                    places_api.abuscar_lugares_cercanos('Museo') for _ in range(5)
+                ])
+
+        self.assertEqual(len(servidor.peticiones), 1)
+        self.assertTrue(all(r == resultados[0] for r in resultados))
+        self.assertTrue(await DetalleLugar.objects.filter(place_id='p1').aexists())
+
+    async def test_autocompletar_async(self):
+        fabrica = AsyncRequestFactory()
+        with ServidorPlacesFalso([OK]) as servidor:
+            cliente = places_api.ClientePlaces(base_url=servidor.url, api_key='prueba')
+            with mock.patch.object(places_api, '_cliente', cliente):
+                respuesta = await views.autocompletar_lugares_async(fabrica.get('/', {'q': 'Museo'}))
+                # Google caído: quedan los locales, sin error 500
+                with mock.patch.object(cliente, 'atextsearch', side_effect=places_api.ErrorPlaces('caído')):
+                    caido = await views.autocompletar_lugares_async(fabrica.get('/', {'q': 'Catedral'}))
+
+        self.assertEqual([l['place_id'] for l in json.loads(respuesta.content)['lugares']], ['p1'])
+        self.assertEqual((caido.status_code, json.loads(caido.content)), (200, {'lugares': []}))
+
+
+class AutocompletarLugaresTests(TestCase):
+
+    def setUp(self):
+        caches['places'].clear()
+        self.url = reverse('inicio:autocompletar_lugares')
+        LugarTuristico.objects.create(
+            nombre='Museo Goitia', ubicacion='Zacatecas', categoria='museo', place_id='p1'
+        )
+        LugarTuristico.objects.create(nombre='Catedral de Zacatecas', ubicacion='Centro', categoria='iglesia')
+
+    def lugares(self, query, respuestas):
+        with ServidorPlacesFalso(respuestas) as servidor:
+            cliente = places_api.ClientePlaces(base_url=servidor.url, api_key='prueba')
+            with mock.patch.object(places_api, '_cliente', cliente):
+                lugares = self.client.get(self.url, {'q': query}).json()['lugares']
+        return lugares, servidor.peticiones
+
+    def test_busqueda_local_por_prefijos(self):
+        nombres = lambda q: [l['nombre'] for l in busqueda_lugares.buscar_locales(q)]
+        self.assertEqual(nombres('museo goi'), ['Museo Goitia'])
+        self.assertEqual(nombres('zacatecas'), ['Catedral de Zacatecas', 'Museo Goitia'])
+        self.assertEqual(nombres('iglesia'), ['Catedral de Zacatecas'])
+        self.assertEqual(nombres('?!'), [])
+
+    def test_con_pocos_locales_completa_con_google_sin_repetir(self):
+        remotos = [lugar_zacatecas('p1', 'Museo Goitia'), lugar_zacatecas('p2', 'Museo Zacatecano')]
+        lugares, peticiones = self.lugares('museo', [(200, {'status': 'OK', 'results': remotos})])
+
+        self.assertEqual(len(peticiones), 1)
+        # p1 ya está registrado: se queda la versión local (con id)
+        self.assertEqual([(l['place_id'], l['id'] is not None) for l in lugares], [('p1', True), ('p2', False)])
+
+    def test_con_suficientes_locales_no_consulta_google(self):
+        for i in range(3):
+            LugarTuristico.objects.create(nombre=f'Jardín {i}', ubicacion='Zacatecas')
+        lugares, peticiones = self.lugares('jard', [OK])
+
+        self.assertEqual(len(lugares), 3)
+        self.assertEqual(peticiones, [])
+
+    def test_consulta_corta(self):
+        lugares, peticiones = self.lugares('mu', [OK])
+        self.assertEqual((lugares, peticiones), ([], []))
+
+
+class ProcesarFotografiaTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        lugar = LugarTuristico.objects.create(nombre='Catedral', ubicacion='Centro')
+        self.resena = Resena.objects.create(
+            lugar_turistico=lugar, descripcion='Bonita', fecha_visita=timezone.now(), calificacion=9
+        )
+
+    def foto_con_exif(self, ancho, alto):
+        exif = Image.Exif()
+        exif[0x0110] = 'Camara de prueba'  # Model
+        buffer = BytesIO()
+        Image.new('RGB', (ancho, alto), 'red').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('foto.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_quita_exif_reduce_y_genera_webp(self):
+        foto = Fotografia.objects.create(resena=self.resena, fotografia=self.foto_con_exif(3000, 1500))
+
+        imagenes.procesar_fotografia(foto)
+        foto.refresh_from_db()
+
+        self.assertEqual((foto.ancho, foto.alto), (2048, 1024))
+        with Image.open(foto.fotografia.path) as original:
+            self.assertEqual(len(original.getexif()), 0)
+        self.assertEqual(list(foto.rendiciones), ['320', '640', '1024'])
+        with Image.open(foto.fotografia.storage.path(foto.rendiciones['320'])) as version:
+            self.assertEqual((version.format, version.size), ('WEBP', (320, 160)))
+        self.assertIn('.webp 640w', foto.srcset)
+
+    def test_no_agranda_fotos_chicas(self):
+        foto = Fotografia.objects.create(resena=self.resena, fotografia=self.foto_con_exif(500, 400))
+
+        imagenes.procesar_fotografia(foto)
+
+        self.assertEqual(list(foto.rendiciones), ['320', '500'])
+        self.assertEqual(foto.url_ligera, foto.fotografia.storage.url(foto.rendiciones['500']))
+
+
+class AlmacenamientoPorContenidoTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        lugar = LugarTuristico.objects.create(nombre='Catedral', ubicacion='Centro')
+        self.resena = Resena.objects.create(
+            lugar_turistico=lugar, descripcion='Bonita', fecha_visita=timezone.now(), calificacion=9
+        )
+
+    def subir(self, contenido=b'misma foto', nombre='foto.JPEG'):
+        return Fotografia.objects.create(
+            resena=self.resena, fotografia=SimpleUploadedFile(nombre, contenido)
+        )
+
+    def test_mismo_contenido_se_guarda_una_vez(self):
+        primera = self.subir()
+        segunda = self.subir(nombre='otra.jpg')
+
+        self.assertEqual(primera.fotografia.name, segunda.fotografia.name)
+        self.assertRegex(primera.fotografia.name, r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(Blob.objects.get().referencias, 2)
+
+    def test_el_archivo_se_borra_con_la_ultima_referencia(self):
+        primera = self.subir()
+        segunda = self.subir()
+        ruta = primera.fotografia.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primera.delete()
+        self.assertTrue(os.path.exists(ruta))
+        self.assertEqual(Blob.objects.get().referencias, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.resena.delete()
+        self.assertFalse(os.path.exists(ruta))
+        self.assertFalse(Blob.objects.exists())
+
+
+class SubidaFotosTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        usuario = User.objects.create_user('viajero', password='clave-segura')
+        Turista.objects.create(usuario=usuario, fecha_nac='1990-01-01')
+        self.lugar = LugarTuristico.objects.create(nombre='Catedral', ubicacion='Centro')
+        self.client.force_login(usuario)
+
+    def jpeg(self, nombre='foto.jpg'):
+        buffer = BytesIO()
+        Image.new('RGB', (40, 30), 'blue').save(buffer, 'JPEG')
+        return SimpleUploadedFile(nombre, buffer.getvalue(), content_type='image/jpeg')
+
+    def publicar(self, fotos):
+        return self.client.post(reverse('inicio:publicar'), {
+            'lugar_turistico': self.lugar.id,
+            'descripcion': 'Muy bonita',
+            'calificacion': 9,
+            'actualmente_en_lugar': 'si',
+            'fotografias': fotos,
+        })
+
+    def test_fotos_validas_se_publican(self):
+        respuesta = self.publicar([self.jpeg(), self.jpeg('otra.jpg')])
+
+        self.assertRedirects(respuesta, reverse('inicio:inicio'), fetch_redirect_response=False)
+        self.assertEqual(Fotografia.objects.count(), 2)
+
+    def test_el_tipo_se_detecta_por_contenido(self):
+        falsa = SimpleUploadedFile('foto.jpg', b'MZ\x90\x00 no es una imagen', content_type='image/jpeg')
+
+        respuesta = self.publicar([falsa])
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, "no es válido")
+        self.assertFalse(Resena.objects.exists())
+
+    def test_se_rechaza_la_cuarta_foto(self):
+        respuesta = self.publicar([self.jpeg(f'{i}.jpg') for i in range(4)])
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(Fotografia.objects.exists())
+
+    def test_foto_demasiado_grande(self):
+        with mock.patch.object(subidas, 'TAMANO_MAXIMO', 100):
+            respuesta = self.publicar([self.jpeg()])
+
+        self.assertContains(respuesta, "pesa más de")
+        self.assertFalse(Resena.objects.exists())
+
+    def test_cuerpo_demasiado_grande_no_se_lee(self):
+        class Entrada(BytesIO):
+            leidos = 0
+
+            def read(self, *args):
+                datos = super().read(*args)
+                Entrada.leidos += len(datos)
+                return datos
+
+        cuerpo = encode_multipart(BOUNDARY, {'descripcion': 'Muy bonita', 'fotografias': [self.jpeg()]})
+        limite = subidas.MAXIMO_FOTOS * subidas.TAMANO_MAXIMO + subidas.MARGEN_FORMULARIO
+
+        respuesta = self.client.generic(
+            'POST', reverse('inicio:publicar'), cuerpo, content_type=MULTIPART_CONTENT,
+            CONTENT_LENGTH=str(limite + 1), **{'wsgi.input': Entrada(cuerpo)},
+        )
+
+        self.assertContains(respuesta, "superan el tamaño permitido", status_code=413)
+        self.assertEqual(Entrada.leidos, 0)
+        self.assertFalse(Resena.objects.exists())
+
+
+class NotificacionesTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        usuario = User.objects.create_user('receptor', password='clave-segura')
+        self.receptor = Turista.objects.create(usuario=usuario, fecha_nac='1990-01-01')
+        self.emisor = Turista.objects.create(
+            usuario=User.objects.create_user('emisor', password='clave-segura'), fecha_nac='1990-01-01'
+        )
+        self.client.force_login(usuario)
+        self.url = reverse('inicio:obtener_notificaciones')
+
+    def notificar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notificacion.objects.create(
+                receptor=self.receptor, emisor=self.emisor, tipo='nuevo_seguidor'
+            )
+
+    def test_sin_novedades_responde_304(self):
+        self.notificar()
+        primera = self.client.get(self.url)
+
+        with self.assertNumQueries(2):  # sesión y usuario
+            segunda = self.client.get(self.url, HTTP_IF_NONE_MATCH=primera['ETag'])
+
+        self.assertEqual(segunda.status_code, 304)
+
+        self.notificar()
+        tercera = self.client.get(self.url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(tercera.status_code, 200)
+        self.assertNotEqual(tercera['ETag'], primera['ETag'])
+
+    def test_el_etag_depende_de_since_id(self):
+        vieja = self.notificar()
+        self.notificar()
+        completa = self.client.get(self.url)
+
+        desde = self.client.get(self.url, {'since_id': vieja.id}, HTTP_IF_NONE_MATCH=completa['ETag'])
+
+        self.assertEqual(desde.status_code, 200)
+        self.assertEqual(len(desde.json()['notificaciones']), 1)
+        self.assertNotEqual(desde['ETag'], completa['ETag'])
+
+    def test_since_id_y_total_de_no_leidas(self):
+        vieja = self.notificar()
+        nueva = self.notificar()
+
+        data = self.client.get(self.url, {'since_id': vieja.id}).json()
+
+        self.assertEqual([n['id'] for n in data['notificaciones']], [nueva.id])
+        self.assertEqual(data['nuevas'], 2)
+        self.assertEqual(data['ultimo_id'], nueva.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('inicio:abrir_notificacion', args=[nueva.id]))
+        self.assertEqual(self.client.get(self.url).json()['nuevas'], 1)
+
+    def test_marcar_leidas_en_bloque(self):
+        primera, segunda, tercera = self.notificar(), self.notificar(), self.notificar()
+        url = reverse('inicio:marcar_notificaciones_leidas')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            data = self.client.post(url, {'hasta': segunda.id}).json()
+        self.assertEqual(data, {'marcadas': 2, 'nuevas': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            data = self.client.post(url, {'ids': [primera.id, tercera.id]}).json()
+        self.assertEqual(data, {'marcadas': 1, 'nuevas': 0})
+        self.assertFalse(Notificacion.objects.filter(leida=False).exists())
+
+    def publicacion_y_otro(self):
+        lugar = LugarTuristico.objects.create(nombre='Cenote', ubicacion='Valladolid')
+        resena = Resena.objects.create(
+            lugar_turistico=lugar, descripcion='Bonito', fecha_visita=timezone.now(), calificacion=9
+        )
+        publicacion = Publicacion.objects.create(turista=self.receptor, resena=resena)
+        otro = Turista.objects.create(
+            usuario=User.objects.create_user('otro', password='clave-segura'), fecha_nac='1990-01-01'
+        )
+        return publicacion, otro
+
+    def test_agrupa_eventos_de_la_misma_publicacion(self):
+        publicacion, otro = self.publicacion_y_otro()
+        with self.captureOnCommitCallbacks(execute=True):
+            primera = notificaciones.agrupar(self.receptor.id, self.emisor.id, 'like', publicacion.id)
+            notificaciones.agrupar(self.receptor.id, self.emisor.id, 'like', publicacion.id)
+            ultima = notificaciones.agrupar(self.receptor.id, otro.id, 'like', publicacion.id)
+
+        self.assertEqual(ultima.pk, primera.pk)
+        self.assertEqual(Notificacion.objects.count(), 1)
+        ultima.refresh_from_db()
+        self.assertEqual(ultima.total, 2)
+        self.assertEqual(ultima.mensaje, "otro y 1 persona más le dieron like a tu publicación.")
+        self.assertEqual(self.client.get(self.url).json()['nuevas'], 1)
+
+        # Ya leída, el siguiente like empieza una notificación nueva
+        notificaciones.marcar_leidas(self.receptor.id)
+        nueva = notificaciones.agrupar(self.receptor.id, self.emisor.id, 'like', publicacion.id)
+        self.assertNotEqual(nueva.pk, primera.pk)
+
+    def test_total_cuenta_personas_y_no_eventos(self):
+        publicacion, otro = self.publicacion_y_otro()
+        for emisor in (self.emisor, otro, self.emisor):
+            notificacion = notificaciones.agrupar(self.receptor.id, emisor.id, 'like', publicacion.id)
+
+        notificacion.refresh_from_db()
+        self.assertEqual((notificacion.total, notificacion.emisor_id), (2, self.emisor.id))
+        self.assertEqual(notificacion.mensaje, "emisor y 1 persona más le dieron like a tu publicación.")
+
+    def test_ventana_vencida_abre_otro_grupo(self):
+        publicacion, _ = self.publicacion_y_otro()
+        vieja = notificaciones.agrupar(self.receptor.id, self.emisor.id, 'like', publicacion.id)
+        Notificacion.objects.filter(pk=vieja.pk).update(
+            fecha=timezone.now() - notificaciones.VENTANA_AGRUPACION - timedelta(minutes=1)
+        )
+
+        nueva = notificaciones.agrupar(self.receptor.id, self.emisor.id, 'like', publicacion.id)
+
+        self.assertNotEqual(nueva.pk, vieja.pk)
+        vieja.refresh_from_db()
+        self.assertEqual((vieja.grupo, vieja.leida), (None, False))
+
+    @override_settings(COLA_SINCRONA=True)
+    def test_se_agrupa_en_la_cola_al_confirmar(self):
+        publicacion, otro = self.publicacion_y_otro()
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(turista=self.emisor, publicacion=publicacion)
+            Like.objects.create(turista=otro, publicacion=publicacion)
+            # Nada se escribe ni se bloquea dentro de la transacción del like
+            self.assertFalse(Notificacion.objects.exists())
+
+        self.assertEqual(Notificacion.objects.get().total, 2)
+
+    def test_compactar_respeta_la_retencion(self):
+        vieja = timezone.now() - timedelta(days=60)
+        leida = Notificacion.objects.create(receptor=self.receptor, emisor=self.emisor, tipo='like', leida=True)
+        pendiente = Notificacion.objects.create(receptor=self.receptor, emisor=self.emisor, tipo='comentario')
+        reciente = Notificacion.objects.create(receptor=self.receptor, emisor=self.emisor, tipo='nuevo_seguidor', leida=True)
+        Notificacion.objects.filter(pk__in=[leida.pk, pendiente.pk]).update(fecha=vieja)
+
+        self.assertEqual(notificaciones.compactar(lote=1), 1)
+        self.assertQuerySetEqual(
+            Notificacion.objects.order_by('pk'), [pendiente, reciente]
+        )
+
+
+class EventosTests(TestCase):
+
+    async def test_publicar_desde_otro_hilo_llega_al_suscriptor(self):
+        cola = eventos.suscribir(42)
+        try:
+            hilo = threading.Thread(target=eventos.publicar, args=(42, {'id': 1}))
+            hilo.start()
+            hilo.join()
+            self.assertEqual(await asyncio.wait_for(cola.get(), 1), {'id': 1})
+        finally:
+            eventos.desuscribir(42, cola)
+        self.assertNotIn(42, eventos._suscriptores)
+
+    def test_sin_asgi_el_sse_responde_204(self):
+        usuario = User.objects.create_user('viajero', password='clave-segura')
+        Turista.objects.create(usuario=usuario, fecha_nac='1990-01-01')
+        self.client.force_login(usuario)
+
+        respuesta = self.client.get(reverse('inicio:eventos_notificaciones'))
+
+        self.assertEqual(respuesta.status_code, 204)
+
+
+class ConDatosDeFeed(TestCase):
+    """
+    Base con varios turistas, publicaciones, likes, comentarios, seguidores y
+    notificaciones, para probar las páginas con datos parecidos a los reales.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        turistas = [
+            Turista.objects.create(
+                usuario=User.objects.create_user(f'turista{i}', password='clave-segura'), fecha_nac='1990-01-01'
+            )
+            for i in range(5)
+        ]
+        cls.turista = turistas[0]
+        lugares = LugarTuristico.objects.bulk_create(
+            LugarTuristico(nombre=f'Lugar {i}', ubicacion='Centro', categoria=categoria)
+            for i, (categoria, _) in enumerate(LugarTuristico.CATEGORIAS)
+        )
+        resenas = Resena.objects.bulk_create(
+            Resena(lugar_turistico=lugares[i % len(lugares)], descripcion='Bonito',
+                   fecha_visita=timezone.now(), calificacion=8)
+            for i in range(50)
+        )
+        publicaciones = Publicacion.objects.bulk_create(
+            Publicacion(turista=turistas[i % len(turistas)], resena=resena,
+                        categoria=resena.lugar_turistico.categoria)
+            for i, resena in enumerate(resenas)
+        )
+        Seguidor.objects.bulk_create(
+            Seguidor(turista_seguidor=cls.turista, turista_seguido=otro) for otro in turistas[1:]
+        )
+        Seguidor.objects.bulk_create(
+            Seguidor(turista_seguidor=otro, turista_seguido=cls.turista) for otro in turistas[1:]
+        )
+        EntradaTimeline.objects.bulk_create(
+            EntradaTimeline(turista=cls.turista, publicacion=p, autor_id=p.turista_id,
+                            fecha_publicacion=p.fecha_publicacion)
+            for p in publicaciones if p.turista_id != cls.turista.id
+        )
+        Like.objects.bulk_create(Like(turista=cls.turista, publicacion=p) for p in publicaciones[::3])
+        Comentario.objects.bulk_create(
+            Comentario(turista=turistas[1], publicacion=p, texto='Qué bonito') for p in publicaciones[::2]
+        )
+        Notificacion.objects.bulk_create(
+            Notificacion(receptor=cls.turista, emisor=turistas[1], tipo='like', publicacion=p)
+            for p in publicaciones[:20]
+        )
+
+    def setUp(self):
+        # Sin tarjetas en caché: se mide el peor caso
+        caches['default'].clear()
+        self.client.force_login(self.turista.usuario)
+
+
+class ConsultasIndexadasTests(ConDatosDeFeed):
+    """
+    Corre EXPLAIN sobre cada SELECT de las páginas más visitadas y falla si
+    alguno recorre una tabla completa en lugar de usar un índice.
+    """
+    # Cómo se ve un recorrido completo en el plan de cada motor
+    EXPLAIN = {
+        # SQLite: cualquier SCAN sin condición sobre el índice (tabla o índice
+        # completo) y los ordenamientos en un B-tree temporal
+        'sqlite': ('EXPLAIN QUERY PLAN ', re.compile(
+            r'\bSCAN\b(?!.*\bUSING (COVERING )?INDEX \S+ \(.*[=<>]).*$|\bUSE TEMP B-TREE\b.*$', re.M,
+        )),
+        'mysql': ('EXPLAIN FORMAT=JSON ', re.compile(r'"access_type":\s*"ALL"')),
+        'postgresql': ('EXPLAIN ', re.compile(r'Seq Scan')),
+    }
+
+    def assertSinRecorridosCompletos(self, url, **params):
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+
+        prefijo, recorrido = self.EXPLAIN[connection.vendor]
+        selects = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            with self.subTest(sql=sql), connection.cursor() as cursor:
+                cursor.execute(prefijo + sql)
+                plan = '\n'.join(' '.join(str(c) for c in fila) for fila in cursor.fetchall())
+                self.assertIsNone(recorrido.search(plan), f"Recorrido completo:\n{plan}")
+
+    def test_feed(self):
+        self.assertSinRecorridosCompletos(reverse('inicio:feed'))
+        self.assertSinRecorridosCompletos(reverse('inicio:feed'), categoria='bar')
+
+    def test_perfil_y_seguidores(self):
+        self.assertSinRecorridosCompletos(reverse('perfil_usuario', args=['turista1']))
+        self.assertSinRecorridosCompletos(reverse('seguidores'))
+
+    def test_notificaciones(self):
+        self.assertSinRecorridosCompletos(reverse('inicio:obtener_notificaciones'))
+
+
+class MotorFeedTests(ConDatosDeFeed):
+
+    def recorrer(self, tamano, categoria=''):
+        paginas, cursor = [], None
+        while True:
+            pagina, cursor = motor_feed.obtener_pagina(self.turista, categoria, cursor, tamano=tamano)
+            paginas.append(pagina)
+            if cursor is None:
+                return paginas
+
+    def test_primero_los_seguidos_sin_huecos_ni_repetidas(self):
+        paginas = self.recorrer(tamano=7)
+        publicaciones = [p for pagina in paginas for p in pagina]
+
+        ids = [p.id for p in publicaciones]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), set(Publicacion.objects.values_list('id', flat=True)))
+
+        seguidos = set(grafo.siguiendo(self.turista.id))
+        prioridades = [p.prioridad for p in publicaciones]
+        self.assertEqual(prioridades, sorted(prioridades))
+        for publicacion in publicaciones:
+            esperada = motor_feed.PRIORIDAD_SEGUIDOS if publicacion.turista_id in seguidos else motor_feed.PRIORIDAD_RESTO
+            self.assertEqual(publicacion.prioridad, esperada)
+
+        # Dentro de cada sección, más recientes primero
+        for prioridad in (motor_feed.PRIORIDAD_SEGUIDOS, motor_feed.PRIORIDAD_RESTO):
+            orden = [(p.fecha_publicacion, p.id) for p in publicaciones if p.prioridad == prioridad]
+            self.assertEqual(orden, sorted(orden, reverse=True))
+
+    def test_el_cursor_cruza_de_seguidos_al_resto(self):
+        paginas = self.recorrer(tamano=7)
+        # 40 de seguidos: la sexta página tiene 5 de seguidos y 2 del resto
+        self.assertEqual({p.prioridad for p in paginas[5]}, {motor_feed.PRIORIDAD_SEGUIDOS, motor_feed.PRIORIDAD_RESTO})
+
+        completa, siguiente = motor_feed.obtener_pagina(self.turista, tamano=100)
+        self.assertIsNone(siguiente)
+        self.assertEqual([p.id for pagina in paginas for p in pagina], [p.id for p in completa])
+
+    def test_cursor_invalido(self):
+        respuesta = self.client.get(reverse('inicio:pagina_feed'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json(), {'error': 'Cursor inválido.'})
+        with self.assertRaises(motor_feed.CursorInvalido):
+            motor_feed.decodificar_cursor('W10')  # "[]"
+
+    def test_filtro_por_categoria(self):
+        categoria = LugarTuristico.objects.first().categoria
+        publicaciones = [p for pagina in self.recorrer(tamano=3, categoria=categoria) for p in pagina]
+
+        esperadas = Publicacion.objects.filter(resena__lugar_turistico__categoria=categoria)
+        self.assertEqual({p.id for p in publicaciones}, set(esperadas.values_list('id', flat=True)))
+
+        respuesta = self.client.get(reverse('inicio:pagina_feed'), {'categoria': categoria})
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_cambiar_la_categoria_del_lugar_la_copia_a_las_publicaciones(self):
+        lugar = LugarTuristico.objects.exclude(categoria='otro').first()
+        lugar.categoria = 'otro'
+        lugar.save()
+
+        publicaciones = [p for pagina in self.recorrer(tamano=10, categoria='otro') for p in pagina]
+        self.assertTrue(
+            set(Publicacion.objects.filter(resena__lugar_turistico=lugar).values_list('id', flat=True))
+            <= {p.id for p in publicaciones}
+        )
+
+
+@override_settings(COLA_SINCRONA=True)
+class TimelineTests(ConDatosDeFeed):
+
+    def setUp(self):
+        super().setUp()
+        # seguidores_count decide la distribución; los datos de prueba no pasan por señales
+        contadores.reconciliar(Turista, 0, 10 ** 9)
+        self.autor, self.lector = Turista.objects.exclude(id=self.turista.id).order_by('id')[:2]
+
+    def publicar(self, autor):
+        resena = Resena.objects.create(
+            lugar_turistico=LugarTuristico.objects.first(), descripcion='Nueva',
+            fecha_visita=timezone.now(), calificacion=9,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            return Publicacion.objects.create(turista=autor, resena=resena)
+
+    def seguir(self, seguidor, seguido):
+        with self.captureOnCommitCallbacks(execute=True):
+            Seguidor.objects.create(turista_seguidor=seguidor, turista_seguido=seguido)
+
+    def dejar_de_seguir(self, seguidor, seguido):
+        with self.captureOnCommitCallbacks(execute=True):
+            Seguidor.objects.get(turista_seguidor=seguidor, turista_seguido=seguido).delete()
+
+    def timeline_de(self, turista, autor):
+        return set(EntradaTimeline.objects.filter(turista=turista, autor=autor).values_list('publicacion_id', flat=True))
+
+    def test_publicar_copia_a_los_seguidores(self):
+        publicacion = self.publicar(self.autor)
+        self.assertIn(publicacion.id, self.timeline_de(self.turista, self.autor))
+        self.assertFalse(EntradaTimeline.objects.filter(publicacion=publicacion).exclude(turista=self.turista).exists())
+
+    def test_seguir_rellena_y_dejar_de_seguir_vacia(self):
+        del_autor = set(Publicacion.objects.filter(turista=self.autor).values_list('id', flat=True))
+        self.assertEqual(self.timeline_de(self.lector, self.autor), set())
+
+        self.seguir(self.lector, self.autor)
+        self.assertEqual(self.timeline_de(self.lector, self.autor), del_autor)
+
+        self.dejar_de_seguir(self.lector, self.autor)
+        self.assertEqual(self.timeline_de(self.lector, self.autor), set())
+
+    def test_lo_anterior_al_relleno_queda_en_el_resto(self):
+        del_autor = list(
+            Publicacion.objects.filter(turista=self.autor).order_by('-fecha_publicacion', '-id').values_list('id', flat=True)
+        )
+        with mock.patch.object(timeline, 'PUBLICACIONES_RELLENO', 3):
+            self.seguir(self.lector, self.autor)
+        self.assertEqual(self.timeline_de(self.lector, self.autor), set(del_autor[:3]))
+
+        pagina, _ = motor_feed.obtener_pagina(self.lector, tamano=100)
+        prioridades = {p.id: p.prioridad for p in pagina if p.turista_id == self.autor.id}
+        self.assertEqual(set(prioridades), set(del_autor))
+        for pk in del_autor[:3]:
+            self.assertEqual(prioridades[pk], motor_feed.PRIORIDAD_SEGUIDOS)
+        for pk in del_autor[3:]:
+            self.assertEqual(prioridades[pk], motor_feed.PRIORIDAD_RESTO)
+
+    def test_cuentas_muy_seguidas_se_leen_al_armar_el_feed(self):
+        # El autor ya tiene un seguidor (turista0); con el lector rebasa el umbral
+        with mock.patch.object(timeline, 'UMBRAL_DISTRIBUCION', 1):
+            self.seguir(self.lector, self.autor)
+            self.autor.refresh_from_db()
+            self.assertTrue(self.autor.distribucion_en_lectura)
+            # Ni relleno ni copia de lo nuevo
+            self.assertEqual(self.timeline_de(self.lector, self.autor), set())
+            nueva = self.publicar(self.autor)
+            self.assertFalse(EntradaTimeline.objects.filter(publicacion=nueva).exists())
+
+            # Aun así, en el feed van en la sección de seguidos
+            self.assertEqual(timeline.autores_en_lectura(self.lector), [self.autor.id])
+            pagina, _ = motor_feed.obtener_pagina(self.lector, tamano=100)
+            seguidos = {p.id for p in pagina if p.prioridad == motor_feed.PRIORIDAD_SEGUIDOS}
+            self.assertEqual(seguidos, set(Publicacion.objects.filter(turista=self.autor).values_list('id', flat=True)))
+            self.assertEqual(len(pagina), len({p.id for p in pagina}))
+
+            self.dejar_de_seguir(self.lector, self.autor)
+            self.autor.refresh_from_db()
+            self.assertFalse(self.autor.distribucion_en_lectura)
+            self.assertEqual(timeline.autores_en_lectura(self.lector), [])
+
+
+class ContadoresTests(ConDatosDeFeed):
+
+    def setUp(self):
+        super().setUp()
+        # Los datos de prueba se crean con bulk_create, sin señales
+        for modelo in contadores.CONTADORES:
+            contadores.reconciliar(modelo, 0, 10 ** 9)
+
+    def test_las_senales_mantienen_los_contadores(self):
+        publicacion = Publicacion.objects.exclude(likes__turista=self.turista).first()
+        otro = Turista.objects.exclude(id=self.turista.id).first()
+
+        like = Like.objects.create(turista=self.turista, publicacion=publicacion)
+        comentario = Comentario.objects.create(turista=self.turista, publicacion=publicacion, texto='Hola')
+        Seguidor.objects.filter(turista_seguidor=self.turista, turista_seguido=otro).delete()
+        publicacion.refresh_from_db(), otro.refresh_from_db()
+        self.assertEqual(publicacion.likes_count, publicacion.likes.count())
+        self.assertEqual(publicacion.comentarios_count, publicacion.comentarios.count())
+        self.assertEqual(otro.seguidores_count, Seguidor.objects.filter(turista_seguido=otro).count())
+
+        like.delete(), comentario.delete()
+        publicacion.refresh_from_db()
+        self.assertEqual(publicacion.likes_count, publicacion.likes.count())
+        self.assertEqual(publicacion.comentarios_count, publicacion.comentarios.count())
+
+    def test_restar_no_baja_de_cero(self):
+        publicacion = Publicacion.objects.first()
+        Publicacion.objects.filter(pk=publicacion.pk).update(likes_count=1)
+        contadores.incrementar(Publicacion, publicacion.pk, 'likes_count', -3)
+        publicacion.refresh_from_db()
+        self.assertEqual(publicacion.likes_count, 0)
+
+        contadores.incrementar(Publicacion, publicacion.pk, 'likes_count', -1)
+        publicacion.refresh_from_db()
+        self.assertEqual(publicacion.likes_count, 0)
+
+    def test_reconciliar_corrige_las_desviaciones(self):
+        publicacion = Publicacion.objects.first()
+        Publicacion.objects.filter(pk=publicacion.pk).update(likes_count=99, comentarios_count=0)
+        Turista.objects.filter(pk=self.turista.pk).update(seguidores_count=0)
+
+        salida = StringIO()
+        call_command('reconciliar_contadores', lote=7, stdout=salida)
+        self.assertIn('Publicacion: 1 filas corregidas.', salida.getvalue())
+        self.assertIn('Turista: 1 filas corregidas.', salida.getvalue())
+
+        publicacion.refresh_from_db(), self.turista.refresh_from_db()
+        self.assertEqual(publicacion.likes_count, publicacion.likes.count())
+        self.assertEqual(publicacion.comentarios_count, publicacion.comentarios.count())
+        self.assertEqual(self.turista.seguidores_count, Seguidor.objects.filter(turista_seguido=self.turista).count())
+        for modelo in contadores.CONTADORES:
+            self.assertEqual(contadores.reconciliar(modelo, 0, 10 ** 9), 0)
+
+
+class DistribucionTests(ConDatosDeFeed):
+
+    def test_repetir_la_tarea_no_duplica(self):
+        resena = Resena.objects.create(
+            lugar_turistico=LugarTuristico.objects.first(), descripcion='Nueva',
+            fecha_visita=timezone.now(), calificacion=9,
+        )
+        # bulk_create: sin la señal, la tarea se corre a mano
+        publicacion, = Publicacion.objects.bulk_create(
+            [Publicacion(turista=self.turista, resena=resena, categoria=resena.lugar_turistico.categoria)]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            distribucion.distribuir_publicacion(publicacion.id)
+            distribucion.distribuir_publicacion(publicacion.id)
+
+        seguidores = set(grafo.seguidores(self.turista.id))
+        notificadas = Notificacion.objects.filter(publicacion=publicacion, tipo='nueva_publicacion')
+        self.assertEqual(sorted(notificadas.values_list('receptor_id', flat=True)), sorted(seguidores))
+        self.assertEqual(EntradaTimeline.objects.filter(publicacion=publicacion).count(), len(seguidores))
+
+
+class TarjetasCacheadasTests(ConDatosDeFeed):
+
+    def test_segunda_carga_sale_de_la_cache(self):
+        url = reverse('perfil_usuario', args=['turista1'])
+        with CaptureQueriesContext(connection) as fria:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as caliente:
+            respuesta = self.client.get(url)
+        self.assertLess(len(caliente), len(fria))
+        self.assertContains(respuesta, 'like-count')
+
+    def test_comentario_nuevo_cambia_la_tarjeta(self):
+        publicacion = Publicacion.objects.filter(turista__usuario__username='turista1').latest('fecha_publicacion')
+        self.client.get(reverse('perfil_usuario', args=['turista1']))
+
+        Comentario.objects.create(publicacion=publicacion, turista=self.turista, texto='Recién salido')
+        publicacion.refresh_from_db()
+        self.assertContains(self.client.get(reverse('perfil_usuario', args=['turista1'])), 'Recién salido')
+
+        tarjetas.preparar([publicacion])
+        self.assertIn('Recién salido', publicacion.tarjeta[1])
+        self.assertNotIn('like-count', publicacion.tarjeta[0] + publicacion.tarjeta[1])
+
+    def test_borrar_un_comentario_cambia_la_version(self):
+        publicacion = Publicacion.objects.first()
+        comentario = Comentario.objects.create(publicacion=publicacion, turista=self.turista, texto='Pronto se va')
+        antes = Publicacion.objects.get(pk=publicacion.pk).version
+
+        comentario.delete()
+        self.assertEqual(Publicacion.objects.get(pk=publicacion.pk).version, antes + 1)
+
+    def test_cambios_del_lugar_y_de_la_foto_del_autor(self):
+        publicacion = Publicacion.objects.select_related('resena__lugar_turistico', 'turista').first()
+        tarjetas.preparar([publicacion])
+
+        lugar = publicacion.resena.lugar_turistico
+        lugar.nombre = 'Cerro de la Bufa'
+        lugar.save()
+        publicacion.refresh_from_db()
+        tarjetas.preparar([publicacion])
+        self.assertIn('Cerro de la Bufa', publicacion.tarjeta[0])
+
+        autor = publicacion.turista
+        antes = publicacion.version
+        autor.biografia = 'Viajero'
+        autor.save()
+        publicacion.refresh_from_db()
+        self.assertEqual(publicacion.version, antes)
+
+        autor.foto_perfil = 'fotos_perfil/nueva.jpg'
+        autor.save()
+        publicacion.refresh_from_db()
+        self.assertEqual(publicacion.version, antes + 1)
+
+    def test_cambio_o_borrado_entre_consultas(self):
+        editada, borrada, intacta = Publicacion.objects.order_by('id')[:3]
+        # La página se leyó antes de que subiera la versión y antes del borrado
+        tarjetas.invalidar(pk=editada.pk)
+        Publicacion.objects.filter(pk=borrada.pk).delete()
+
+        resultado = tarjetas.preparar([editada, borrada, intacta])
+        self.assertEqual([p.id for p in resultado], [editada.id, intacta.id])
+        self.assertTrue(all(len(p.tarjeta) == 2 for p in resultado))
+
+
+class LikesDadosTests(ConDatosDeFeed):
+
+    def test_filtro_bloom_sin_falsos_negativos(self):
+        filtro = likes.FiltroBloom(range(0, 2000, 2))
+        self.assertTrue(all(n in filtro for n in range(0, 2000, 2)))
+        falsos = sum(n in filtro for n in range(1, 2000, 2))
+        self.assertLess(falsos, 50)
+
+    def test_solo_consulta_la_pagina(self):
+        ids = list(Publicacion.objects.values_list('id', flat=True)[:10])
+        esperados = set(Like.objects.filter(turista=self.turista, publicacion_id__in=ids).values_list('publicacion_id', flat=True))
+        with self.assertNumQueries(2):
+            # Construir el filtro (pocos likes: no se usa) y el IN
+            self.assertEqual(likes.dados_por(self.turista.id, ids), esperados)
+        with self.assertNumQueries(1):
+            self.assertEqual(likes.dados_por(self.turista.id, ids), esperados)
+
+    def test_con_muchos_likes_usa_el_filtro(self):
+        ids = list(Publicacion.objects.values_list('id', flat=True))
+        with mock.patch.object(likes, 'UMBRAL', 5):
+            dados = likes.dados_por(self.turista.id, ids)
+            self.assertEqual(dados, set(Like.objects.filter(turista=self.turista).values_list('publicacion_id', flat=True)))
+
+            # Publicaciones inexistentes no pasan el filtro: ni se consulta
+            with self.assertNumQueries(0):
+                self.assertEqual(likes.dados_por(self.turista.id, [10**6, 10**6 + 1]), set())
+
+            # Un like nuevo invalida el filtro
+            nueva = Publicacion.objects.exclude(turista=self.turista).exclude(id__in=dados).first()
+            Like.objects.create(turista=self.turista, publicacion=nueva)
+            self.assertIn(nueva.id, likes.dados_por(self.turista.id, [nueva.id]))
+
+
+class DarLikeTests(ConDatosDeFeed):
+
+    def setUp(self):
+        super().setUp()
+        self.publicacion = (
+            Publicacion.objects.exclude(turista=self.turista).exclude(likes__turista=self.turista).first()
+        )
+        self.url = reverse('inicio:dar_like', args=[self.publicacion.id])
+        self.antes = self.publicacion.likes_count
+
+    @override_settings(COLA_SINCRONA=True)
+    def test_put_y_delete_son_idempotentes(self):
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                respuesta = self.client.put(self.url)
+            self.assertEqual(respuesta.json(), {'liked': True, 'total_likes': self.antes + 1})
+        self.assertEqual(Like.objects.filter(publicacion=self.publicacion, turista=self.turista).count(), 1)
+        self.assertEqual(
+            Notificacion.objects.filter(publicacion=self.publicacion, tipo='like', emisor=self.turista).count(), 1
+        )
+        self.assertIn(self.publicacion.id, likes.dados_por(self.turista.id, [self.publicacion.id]))
+
+        for _ in range(2):
+            respuesta = self.client.delete(self.url)
+            self.assertEqual(respuesta.json(), {'liked': False, 'total_likes': self.antes})
+        self.publicacion.refresh_from_db()
+        self.assertEqual(self.publicacion.likes_count, self.antes)
+
+    def test_post_alterna(self):
+        self.assertTrue(self.client.post(self.url).json()['liked'])
+        self.assertFalse(self.client.post(self.url).json()['liked'])
+
+    def test_no_se_puede_dar_like_a_lo_propio(self):
+        propia = Publicacion.objects.filter(turista=self.turista).first()
+        self.assertEqual(self.client.put(reverse('inicio:dar_like', args=[propia.id])).status_code, 400)
+
+    def test_buffer_agrupa_el_contador(self):
+        with mock.patch.object(likes, 'BUFFER', True):
+            # Fuera de pruebas la transacción del like ya se confirmó al armar la respuesta
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(self.client.put(self.url).json()['liked'])
+            self.assertEqual(likes.pendientes(self.publicacion.id), 1)
+            otro = Turista.objects.exclude(id__in=[self.turista.id, self.publicacion.turista_id]).first()
+            with self.captureOnCommitCallbacks(execute=True):
+                likes.dar(otro, self.publicacion)
+                # A la caché solo al confirmar
+                self.assertEqual(likes.pendientes(self.publicacion.id), 1)
+            self.assertEqual(likes.pendientes(self.publicacion.id), 2)
+
+            # Hasta el volcado, la BD no cambia
+            self.publicacion.refresh_from_db()
+            self.assertEqual(self.publicacion.likes_count, self.antes)
+            likes.volcar(self.publicacion.id)
+
+        self.publicacion.refresh_from_db()
+        self.assertEqual(self.publicacion.likes_count, self.antes + 2)
+        self.assertEqual(likes.pendientes(self.publicacion.id), 0)
+
+    @override_settings(LIKES_BUFFER=True)
+    def test_buffer_exige_una_cache_compartida(self):
+        with self.assertRaises(ImproperlyConfigured):
+            likes.comprobar_buffer()
+
+
+class PresupuestoConsultasTests(ConDatosDeFeed):
+    """
+    Consultas por vista con la caché vacía, fijas sin importar cuántas
+    publicaciones, comentarios o seguidores haya en la página: si una sube,
+    hay un N+1 nuevo.
+    """
+
+    def test_paginas(self):
+        paginas = [
+            (reverse('inicio:feed'), 15),
+            (reverse('inicio:pagina_feed'), 12),
+            (reverse('inicio:detalle_publicacion', args=[Publicacion.objects.first().id]), 9),
+            (reverse('inicio:obtener_notificaciones'), 8),
+            (reverse('perfil_usuario', args=['turista1']), 13),
+            (reverse('seguidores'), 6),
+        ]
+        for url, maximo in paginas:
+            with self.subTest(url=url), presupuesto_consultas(maximo):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_dar_like(self):
+        publicacion = Publicacion.objects.exclude(turista=self.turista).exclude(likes__turista=self.turista).first()
+        # Incluye los SAVEPOINT de atomic() y la notificación al autor (con su bloqueo)
+        with presupuesto_consultas(13):
+            self.client.put(reverse('inicio:dar_like', args=[publicacion.id]))
+
+    def test_el_presupuesto_muestra_las_consultas_repetidas(self):
+        with self.assertRaisesMessage(AssertionError, 'Repetidas:\n  3x SELECT'):
+            with presupuesto_consultas(2):
+                for publicacion in Publicacion.objects.all()[:3]:
+                    publicacion.turista.id
+
+    def test_server_timing_y_aviso_de_n_mas_1(self):
+        respuesta = self.client.get(reverse('seguidores'))
+        self.assertRegex(respuesta['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ consultas", total;dur=[\d.]+$')
+
+        with mock.patch('red_social.consultas.PRESUPUESTO', 5), self.assertLogs('red_social.consultas', 'WARNING') as log:
+            self.client.get(reverse('perfil_usuario', args=['turista1']))
+        self.assertIn('GET /perfil/turista1/', log.output[0])
+
+
+class DatosSinteticosTests(TestCase):
+
+    def test_generar_deja_contadores_y_timelines_consistentes(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        with override_settings(MEDIA_ROOT=media):
+            datos_sinteticos.generar(30, 120, semilla=1, log=lambda _: None)
+
+        self.assertEqual(Publicacion.objects.count(), 120)
+        for modelo in contadores.CONTADORES:
+            self.assertEqual(contadores.reconciliar(modelo, 0, 10 ** 9), 0)
+        self.assertTrue(EntradaTimeline.objects.exists())
+
+        # Ley de potencias: la cuenta más seguida concentra mucho más que la mediana
+        seguidores = sorted(Turista.objects.values_list('seguidores_count', flat=True))
+        self.assertGreater(seguidores[-1], 3 * max(seguidores[len(seguidores) // 2], 1))
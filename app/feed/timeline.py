@@ -0,0 +1,166 @@
+"""
+Timeline precalculado por turista (fan-out al escribir).
+
+Cada publicación se copia a `EntradaTimeline` de los seguidores de su autor,
+así la sección "de quienes sigo" del feed es un rango sobre el índice
+(turista, fecha_publicacion, publicacion). Los autores con demasiados
+seguidores pasan a `distribucion_en_lectura` y sus publicaciones se leen
+directamente al armar el feed (fan-out al leer).
+
+Límite conocido: la sección de seguidos solo tiene lo que está en el
+timeline. Al empezar a seguir a alguien se copian sus últimas
+PUBLICACIONES_RELLENO; las más viejas, y las que la cola todavía no
+distribuye, aparecen en la sección del resto.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
+
+from usuarios import grafo
+from usuarios.models import Turista
+from .models import EntradaTimeline, Publicacion
+
+# A partir de cuántos seguidores un autor deja de copiarse a cada timeline
+UMBRAL_DISTRIBUCION = getattr(settings, 'TIMELINE_UMBRAL_DISTRIBUCION', 5000)
+
+# Cuántas publicaciones recientes se copian al empezar a seguir a alguien;
+# las anteriores se ven en la sección del resto
+PUBLICACIONES_RELLENO = getattr(settings, 'TIMELINE_PUBLICACIONES_RELLENO', 100)
+
+TAMANO_LOTE = 1000
+
+CLAVE_EN_LECTURA = 'timeline:en_lectura'
+
+
+def distribuir_publicacion(publicacion, seguidor_ids):
+    """
+    Copia `publicacion` al timeline de cada id en `seguidor_ids`.
+    """
+    entradas = [
+        EntradaTimeline(
+            turista_id=seguidor_id,
+            publicacion_id=publicacion.id,
+            autor_id=publicacion.turista_id,
+            fecha_publicacion=publicacion.fecha_publicacion,
+        )
+        for seguidor_id in seguidor_ids
+    ]
+    EntradaTimeline.objects.bulk_create(entradas, batch_size=TAMANO_LOTE, ignore_conflicts=True)
+
+
+def rellenar_timeline(turista_id, autor):
+    """
+    Copia las publicaciones recientes de `autor` al timeline de `turista_id`.
+    """
+    if autor.distribucion_en_lectura:
+        return
+
+    publicaciones = (
+        Publicacion.objects
+        .filter(turista=autor)
+        .order_by('-fecha_publicacion', '-id')
+        .values_list('id', 'fecha_publicacion')[:PUBLICACIONES_RELLENO]
+    )
+    EntradaTimeline.objects.bulk_create(
+        [
+            EntradaTimeline(
+                turista_id=turista_id,
+                publicacion_id=pk,
+                autor_id=autor.id,
+                fecha_publicacion=fecha,
+            )
+            for pk, fecha in publicaciones
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def vaciar_timeline(turista_id, autor_id):
+    """
+    Quita del timeline de `turista_id` todo lo publicado por `autor_id`.
+    """
+    EntradaTimeline.objects.filter(turista_id=turista_id, autor_id=autor_id).delete()
+
+
+def actualizar_distribucion(autor):
+    """
+    Cambia al autor a fan-out al leer cuando rebasa el umbral de seguidores.
+    """
+    autor.refresh_from_db(fields=['seguidores_count'])
+    debe_leerse = autor.seguidores_count > UMBRAL_DISTRIBUCION
+    if debe_leerse != autor.distribucion_en_lectura:
+        autor.distribucion_en_lectura = debe_leerse
+        Turista.objects.filter(pk=autor.pk).update(distribucion_en_lectura=debe_leerse)
+        cache.delete(CLAVE_EN_LECTURA)
+
+
+def autores_en_lectura(turista):
+    """
+    Ids de las cuentas que sigue `turista` y que se leen al armar el feed.
+    """
+    # Son pocas cuentas (las más seguidas): la lista completa vive en la caché
+    # y se cruza con el grafo de seguidores, sin consultar la BD
+    en_lectura = cache.get_or_set(
+        CLAVE_EN_LECTURA,
+        # __in y no =True: con un booleano suelto en el WHERE SQLite no usa el índice
+        lambda: list(Turista.objects.filter(distribucion_en_lectura__in=[True]).values_list('id', flat=True)),
+        60 * 60,
+    )
+    return sorted(grafo.sigue_a(turista.id, en_lectura))
+
+
+def _despues_de(posicion, campo_fecha, campo_id):
+    fecha, pk = posicion
+    return Q(**{f'{campo_fecha}__lt': fecha}) | Q(**{campo_fecha: fecha, f'{campo_id}__lt': pk})
+
+
+def seccion_seguidos(turista, categoria, posicion, limite, autores_lectura):
+    """
+    (fecha, id) de las publicaciones de quienes sigue `turista`, más
+    recientes primero, a partir de `posicion` (exclusiva).
+    """
+    entradas = EntradaTimeline.objects.filter(turista=turista)
+    if categoria:
+        entradas = entradas.filter(publicacion__categoria=categoria)
+    if posicion:
+        entradas = entradas.filter(_despues_de(posicion, 'fecha_publicacion', 'publicacion_id'))
+    filas = set(
+        entradas
+        .order_by('-fecha_publicacion', '-publicacion_id')
+        .values_list('fecha_publicacion', 'publicacion_id')[:limite]
+    )
+
+    if autores_lectura:
+        publicaciones = Publicacion.objects.filter(turista_id__in=autores_lectura)
+        if categoria:
+            publicaciones = publicaciones.filter(categoria=categoria)
+        if posicion:
+            publicaciones = publicaciones.filter(_despues_de(posicion, 'fecha_publicacion', 'id'))
+        filas.update(
+            publicaciones
+            .order_by('-fecha_publicacion', '-id')
+            .values_list('fecha_publicacion', 'id')[:limite]
+        )
+
+    return sorted(filas, reverse=True)[:limite]
+
+
+def seccion_resto(turista, categoria, posicion, limite, autores_lectura):
+    """
+    (fecha, id) del resto de publicaciones: las que no están en el timeline
+    de `turista` ni son de autores que se leen al armar el feed. Incluye las
+    de seguidos que quedaron fuera del relleno o aún no se distribuyen.
+    """
+    en_timeline = EntradaTimeline.objects.filter(turista=turista, publicacion=OuterRef('pk'))
+    publicaciones = Publicacion.objects.exclude(Exists(en_timeline))
+    if autores_lectura:
+        publicaciones = publicaciones.exclude(turista_id__in=autores_lectura)
+    if categoria:
+        publicaciones = publicaciones.filter(categoria=categoria)
+    if posicion:
+        publicaciones = publicaciones.filter(_despues_de(posicion, 'fecha_publicacion', 'id'))
+    return list(
+        publicaciones
+        .order_by('-fecha_publicacion', '-id')
+        .values_list('fecha_publicacion', 'id')[:limite]
+    )
@@ -1,19 +1,36 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'feed'
 
+# Bajo ASGI las vistas que esperan a Google o a la BD tienen versión async
+if settings.VISTAS_ASYNC:
+    buscar_lugares = views.buscar_lugares_async
+    autocompletar_lugares = views.autocompletar_lugares_async
+    obtener_notificaciones = views.obtener_notificaciones_async
+    eventos_notificaciones = views.eventos_notificaciones
+else:
+    buscar_lugares = views.buscar_lugares
+    autocompletar_lugares = views.autocompletar_lugares
+    obtener_notificaciones = views.obtener_notificaciones
+    eventos_notificaciones = views.eventos_no_disponibles
+
 urlpatterns = [
     path('', views.visualizar_feed, name='inicio'),
-    path('buscar-lugares/', views.buscar_lugares, name='buscar_lugares'),
+    path('buscar-lugares/', buscar_lugares, name='buscar_lugares'),
+    path('autocompletar-lugares/', autocompletar_lugares, name='autocompletar_lugares'),
     path('publicar/', views.publicar_resena, name='publicar'), 
     path('feed/', views.visualizar_feed, name='feed'),
+    path('feed/pagina/', views.pagina_feed, name='pagina_feed'),
     path('like/<int:publicacion_id>/', views.dar_like, name='dar_like'),
     path('eliminar/<int:publicacion_id>/', views.eliminar_publicacion, name='eliminar_publicacion'),
     path('comentario/<int:publicacion_id>/', views.escribir_comentario, name='escribir_comentario'),
     path('comentario/eliminar/<int:comentario_id>/', views.eliminar_comentario, name='eliminar_comentario'),
     path('publicacion/<int:publicacion_id>/', views.detalle_publicacion, name='detalle_publicacion'),
-    path('notificaciones/', views.obtener_notificaciones, name='obtener_notificaciones'),
+    path('notificaciones/', obtener_notificaciones, name='obtener_notificaciones'),
+    path('eventos/', eventos_notificaciones, name='eventos_notificaciones'),
+    path('notificaciones/leidas/', views.marcar_notificaciones_leidas, name='marcar_notificaciones_leidas'),
     path('publicacion/<int:pk>/', views.detalle_publicacion, name='detalle_publicacion'),
     path('notificacion/<int:notificacion_id>/', views.abrir_notificacion, name='abrir_notificacion'),
 ]
\ No newline at end of file
@@ -4,16 +4,25 @@ from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.utils.timesince import timesince
 from django.urls import reverse
+from django.template.loader import render_to_string
 from datetime import datetime
 from .forms import FormResena
 from .models import Fotografia, Publicacion, Like, Comentario, LugarTuristico, Notificacion
+from usuarios import sugerencias
 from usuarios.models import Seguidor
-from django.views.decorators.http import require_POST, require_http_methods
-from django.http import JsonResponse
-from .places_api import buscar_lugares_zacatecas, categorizar_lugar
+from django.views.decorators.http import require_GET, require_POST, require_http_methods
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from . import busqueda_lugares, eventos, likes, notificaciones, places_api, subidas, tarjetas
+from .places_api import categorizar_lugar
+from .motor_feed import obtener_pagina, CursorInvalido
 import requests
 from django.conf import settings
+from django.db import transaction
+import asyncio
 import json
+import traceback
+from asgiref.sync import sync_to_async
 
 
 def buscar_lugares(request):
@@ -21,70 +30,117 @@ def buscar_lugares(request):
     if not query:
         return JsonResponse({"lugares": []})
 
-    api_key = settings.GOOGLE_MAPS_API_KEY
+    # Resultados en caché por consulta normalizada (ver places_api.py)
+    try:
+        resultados_api = places_api.buscar_lugares_cercanos(query)
+    except requests.RequestException:
+        return JsonResponse({"lugares": []}, status=502)
 
-    # Coordenadas del centro de Zacatecas, Zacatecas
-    lat = 22.7740
-    lng = -102.5720
-    radio = 25000  # 25 km de radio
-
-    url = (
-        f"https://maps.googleapis.com/maps/api/place/textsearch/json"
-        f"?query={query}"
-        f"&location={lat},{lng}"
-        f"&radius={radio}"
-        f"&language=es"
-        f"&key={api_key}"
-    )
+    return JsonResponse({"lugares": resultados_api})
 
-    response = requests.get(url)
-    data = response.json()
 
-    # 🔹 Tipos de lugares turísticos o de interés
-    tipos_turisticos = {
-        "tourist_attraction", "natural_feature", "point_of_interest", "museum", "church",
-        "park", "natural_feature", "art_gallery", "zoo", "amusement_park",
-        "hindu_temple", "mosque", "synagogue", "place_of_worship",
-        "city_hall", "library", "aquarium", "stadium", "university",
-        "cemetery", "establishment", "rv_park", "campground", "train_station"
-    }
+async def buscar_lugares_async(request):
+    """
+    Igual que buscar_lugares, pero libera el worker mientras responde Google
+    (se usa al servir con ASGI, ver VISTAS_ASYNC).
+    """
+    query = request.GET.get("q", "")
+    if not query:
+        return JsonResponse({"lugares": []})
 
-    resultados_api = []
-    for lugar in data.get("results", []):
-        direccion = lugar.get("formatted_address", "").lower()
-        tipos = set(lugar.get("types", []))
-
-        # 🔸 Filtrar por ubicación
-        if "zacatecas" not in direccion or "méxico" not in direccion:
-            continue
-
-        # 🔸 Filtrar por relevancia turística
-        if not tipos.intersection(tipos_turisticos):
-            continue
-
-        resultados_api.append({
-            "id": None,
-            "nombre": lugar.get("name"),
-            "ubicacion": lugar.get("formatted_address"),
-            "place_id": lugar.get("place_id"),
-            "latitud": lugar["geometry"]["location"]["lat"],
-            "longitud": lugar["geometry"]["location"]["lng"],
-            "tipos": lugar.get("types", []),
-        })
+    try:
+        resultados_api = await places_api.abuscar_lugares_cercanos(query)
+    except requests.RequestException:
+        return JsonResponse({"lugares": []}, status=502)
 
     return JsonResponse({"lugares": resultados_api})
 
 
+# Con menos resultados locales que esto también se consulta Google
+MINIMO_RESULTADOS_LOCALES = 3
+
+def _completar_con_remotos(lugares, remotos):
+    # Los que Google regresa y ya están registrados se quedan con el local
+    registrados = {lugar["place_id"] for lugar in lugares if lugar["place_id"]}
+    return lugares + [lugar for lugar in remotos if lugar["place_id"] not in registrados]
+
+
+@require_GET
+def autocompletar_lugares(request):
+    """
+    Autocompletado de lugares: primero los ya registrados (índice local) y,
+    si no alcanzan, se completan con la búsqueda de Google Places.
+    """
+    query = request.GET.get("q", "").strip()
+    if len(query) < 3:
+        return JsonResponse({"lugares": []})
+
+    lugares = busqueda_lugares.buscar_locales(query)
+
+    if len(lugares) < MINIMO_RESULTADOS_LOCALES:
+        try:
+            remotos = places_api.buscar_lugares_cercanos(query)
+        except requests.RequestException:
+            remotos = []
+        lugares = _completar_con_remotos(lugares, remotos)
+
+    return JsonResponse({"lugares": lugares})
+
+
+@require_GET
+async def autocompletar_lugares_async(request):
+    """
+    Igual que autocompletar_lugares, pero sin ocupar un worker por cada tecla
+    mientras responde Google (ASGI, ver VISTAS_ASYNC).
+    """
+    query = request.GET.get("q", "").strip()
+    if len(query) < 3:
+        return JsonResponse({"lugares": []})
+
+    lugares = await sync_to_async(busqueda_lugares.buscar_locales)(query)
+
+    if len(lugares) < MINIMO_RESULTADOS_LOCALES:
+        try:
+            remotos = await places_api.abuscar_lugares_cercanos(query)
+        except requests.RequestException:
+            remotos = []
+        lugares = _completar_con_remotos(lugares, remotos)
+
+    return JsonResponse({"lugares": lugares})
+
 
 @login_required
+@csrf_exempt
 def publicar_resena(request):
+    # El manejador de subida se instala antes de que algo lea request.POST
+    # (incluido el middleware CSRF); la verificación CSRF se hace enseguida
+    manejador = None
+    if request.method == 'POST':
+        manejador = subidas.ManejadorFotosResena(request)
+        request.upload_handlers.insert(0, manejador)
+        # Un cuerpo demasiado grande ni se lee: 413 antes de la verificación
+        # CSRF, que sin el formulario fallaría con 403
+        request.POST
+        if manejador.excedido:
+            for error in manejador.errores:
+                messages.error(request, error)
+            return render(request, 'publicacion_form.html', {
+                'form_resena': FormResena(),
+                'username': request.user.username
+            }, status=413)
+    return _publicar_resena(request, manejador)
+
+
+@csrf_protect
+def _publicar_resena(request, manejador):
     if request.method == 'POST':
         form_resena = FormResena(request.POST, request.FILES)
         fotos = request.FILES.getlist('fotografias')
 
-        # === Validar cantidad de fotos ===
-        if len(fotos) > 3:
-            messages.error(request, "Solo puedes subir un máximo de 3 fotografías.")
+        # === Validar cantidad, tamaño y tipo de fotos (revisados al recibirlas) ===
+        if manejador.errores:
+            for error in manejador.errores:
+                messages.error(request, error)
             return render(request, 'publicacion_form.html', {
                 'form_resena': form_resena,
                 'username': request.user.username
@@ -108,6 +164,15 @@ def publicar_resena(request):
                 nuevo_tipos = request.POST.get('nuevo_lugar_tipos', '[]')
 
                 if nuevo_nombre and nuevo_ubicacion:
+                    # Si el lugar ya pasó por la búsqueda, sus datos guardados mandan sobre el formulario
+                    detalle = places_api.detalle_lugar(nuevo_place_id) if nuevo_place_id else None
+                    if detalle:
+                        nuevo_nombre = detalle.nombre
+                        nuevo_ubicacion = detalle.ubicacion or nuevo_ubicacion
+                        nuevo_lat = detalle.latitud
+                        nuevo_lng = detalle.longitud
+                        nuevo_tipos = json.dumps(detalle.tipos)
+
                     if nuevo_place_id:
                         lugar_turistico, created = LugarTuristico.objects.get_or_create(
                             place_id=nuevo_place_id,
@@ -161,17 +226,20 @@ def publicar_resena(request):
                 else:
                     resena.fecha_visita = timezone.now()
 
-            resena.save()
+            # Reseña, fotos y publicación en una sola transacción: la tarea de
+            # fan-out que encolan las señales solo es visible si todo se guarda
+            with transaction.atomic():
+                resena.save()
 
-            # === GUARDAR FOTOS ===
-            for foto in fotos:
-                Fotografia.objects.create(resena=resena, fotografia=foto)
+                # === GUARDAR FOTOS ===
+                for foto in fotos:
+                    Fotografia.objects.create(resena=resena, fotografia=foto)
 
-            # === CREAR PUBLICACIÓN ===
-            Publicacion.objects.create(
-                turista=request.user.datos,
-                resena=resena
-            )
+                # === CREAR PUBLICACIÓN ===
+                Publicacion.objects.create(
+                    turista=request.user.datos,
+                    resena=resena
+                )
 
             messages.success(request, "¡Reseña publicada con éxito!")
             return redirect('inicio:inicio')
@@ -198,7 +266,12 @@ def eliminar_publicacion(request, publicacion_id):
         return redirect('perfil_usuario',request.user.username)
 
     if request.method == 'POST':
-        publicacion.delete()
+        with transaction.atomic():
+            resena = publicacion.resena
+            publicacion.delete()
+            # La reseña (y sus fotos) solo existía para esta publicación
+            if not resena.publicaciones.exists():
+                resena.delete()
         messages.success(request, "Publicación eliminada con éxito.")
         return redirect('perfil_usuario',request.user.username) 
 
@@ -207,80 +280,87 @@ def eliminar_publicacion(request, publicacion_id):
 @login_required
 def visualizar_feed(request):
     categoria = request.GET.get('categoria', '')
+    turista = request.user.datos
 
-    # Publicaciones ordenadas por fecha descendente
-    publicaciones = (
-        Publicacion.objects
-        .select_related('turista', 'resena__lugar_turistico')
-        .prefetch_related('resena__fotografias', 'comentarios')
-    )
-
-    username = request.user.username
-
-    # Obtener los IDs de los usuarios que el actual sigue
-    siguiendo_ids = Seguidor.objects.filter(
-        turista_seguidor=request.user.datos
-    ).values_list('turista_seguido_id', flat=True)
-
-    # --- FILTRO POR CATEGORÍA ---
-    if categoria:
-        publicaciones = publicaciones.filter(resena__lugar_turistico__categoria=categoria)
-
-    # --- ORDEN PERSONALIZADO ---
-    # Primero las publicaciones de seguidos, luego las demás
-    publicaciones = sorted(
-        publicaciones,
-        key=lambda pub: (
-            0 if pub.turista_id in siguiendo_ids else 1,  # Prioridad: seguidos primero
-            -pub.fecha_publicacion.timestamp()             # Dentro del grupo, más recientes primero
-        )
-    )
+    # Primera página: seguidos primero y, dentro de cada grupo, más recientes
+    publicaciones, siguiente_cursor = obtener_pagina(turista, categoria)
+    publicaciones = tarjetas.preparar(publicaciones)
 
-    # Categorías únicas para el filtro
-    categorias = LugarTuristico.objects.values_list('categoria', flat=True).distinct()
+    # Categorías para el filtro (las del modelo: sin recorrer los lugares)
+    categorias = [clave for clave, _ in LugarTuristico.CATEGORIAS]
 
-    # Likes del usuario actual
-    likes_usuario = set()
-    if request.user.is_authenticated and hasattr(request.user, 'datos'):
-        likes_usuario = set(
-            Like.objects.filter(turista=request.user.datos)
-            .values_list('publicacion_id', flat=True)
-        )
+    # Likes del usuario actual, solo de las publicaciones de esta página
+    likes_usuario = likes.dados_por(turista.id, [pub.id for pub in publicaciones])
 
     context = {
         'publicaciones': publicaciones,
+        'siguiente_cursor': siguiente_cursor,
         'likes_usuario': likes_usuario,
         'categorias': categorias,
         'categoria_actual': categoria,
-        'username': username,
+        'sugerencias': sugerencias.para(turista.id),
+        'username': request.user.username,
     }
 
     return render(request, 'feed.html', context)
 
 @login_required
-@require_POST
+@require_GET
+def pagina_feed(request):
+    """
+    Siguiente página del feed a partir del cursor. Regresa las tarjetas ya
+    renderizadas y el cursor de la página que sigue.
+    """
+    categoria = request.GET.get('categoria', '')
+    turista = request.user.datos
+
+    try:
+        publicaciones, siguiente_cursor = obtener_pagina(
+            turista, categoria, request.GET.get('cursor')
+        )
+    except CursorInvalido:
+        return JsonResponse({'error': 'Cursor inválido.'}, status=400)
+    publicaciones = tarjetas.preparar(publicaciones)
+
+    likes_usuario = likes.dados_por(turista.id, [pub.id for pub in publicaciones])
+
+    html = render_to_string('publicaciones_feed.html', {
+        'publicaciones': publicaciones,
+        'likes_usuario': likes_usuario,
+    }, request=request)
+
+    return JsonResponse({'html': html, 'siguiente': siguiente_cursor})
+
+@login_required
+@require_http_methods(['PUT', 'DELETE', 'POST'])
 def dar_like(request, publicacion_id):
-    publicacion = get_object_or_404(Publicacion, id=publicacion_id)
+    """
+    PUT da like y DELETE lo quita; repetirlos no cambia nada (doble clic,
+    reintentos). POST alterna, para clientes anteriores.
+    """
+    publicacion = get_object_or_404(
+        Publicacion.objects.only('id', 'turista_id', 'likes_count'), id=publicacion_id
+    )
     turista = request.user.datos
-    
-    if publicacion.turista == turista:
+
+    if publicacion.turista_id == turista.id:
         return JsonResponse({'error': 'No puedes dar like a tu propia publicación.'}, status=400)
 
-    like, creado = Like.objects.get_or_create(publicacion=publicacion, turista=turista)
+    if request.method == 'POST':
+        dar = not Like.objects.filter(publicacion_id=publicacion.id, turista_id=turista.id).exists()
+    else:
+        dar = request.method == 'PUT'
 
-    if not creado:
-        like.delete()
-        liked = False
+    # Un INSERT que ignora el duplicado (o un DELETE) y el contador con F()
+    if dar:
+        cambio = likes.dar(turista, publicacion)
     else:
-        liked = True
+        cambio = likes.quitar(turista.id, publicacion.id)
 
-    publicacion.reaccion = publicacion.likes.count()
-    publicacion.save(update_fields=['reaccion'])
+    # Con LIKES_BUFFER el cambio ya va en lo pendiente (se suma al confirmar)
+    total = publicacion.likes_count + (likes.pendientes(publicacion.id) if likes.BUFFER else cambio)
 
-    return JsonResponse({
-        'liked': liked,
-        'total_likes': publicacion.reaccion
-    })
+    return JsonResponse({'liked': dar, 'total_likes': total})
 
 
 
@@ -298,11 +378,12 @@ def escribir_comentario(request, publicacion_id=None):
     if len(texto) > 150:
         return redirect('inicio:detalle_publicacion', publicacion_id=publicacion.id)
 
-    Comentario.objects.create(
-        publicacion=publicacion,
-        turista=request.user.datos,
-        texto=texto
-    )
+    with transaction.atomic():
+        Comentario.objects.create(
+            publicacion=publicacion,
+            turista=request.user.datos,
+            texto=texto
+        )
     return redirect('inicio:detalle_publicacion', publicacion_id=publicacion.id)
 
 
@@ -319,7 +400,8 @@ def eliminar_comentario(request, comentario_id=None):
 
     if request.method == 'POST':
         publicacion_id = comentario.publicacion.id  # Guardamos ID antes de borrar
-        comentario.delete()
+        with transaction.atomic():
+            comentario.delete()
         return redirect('inicio:detalle_publicacion', publicacion_id=publicacion_id)
 
     # Opcional: si deseas mostrar una confirmación antes de eliminar
@@ -330,15 +412,15 @@ def eliminar_comentario(request, comentario_id=None):
 def detalle_publicacion(request, publicacion_id):
     publicacion = get_object_or_404(
         Publicacion.objects
-        .select_related('turista', 'resena__lugar_turistico')
-        .prefetch_related('resena__fotografias', 'comentarios__turista__usuario'),
+        .select_related('turista__usuario', 'resena__lugar_turistico')
+        # Las fotos solo se consultan si la cabecera no está en caché
+        .prefetch_related('comentarios__turista__usuario'),
         id=publicacion_id
     )
 
     likes_usuario = set()
     if hasattr(request.user, 'datos'):
-        likes_usuario = set(Like.objects.filter(turista=request.user.datos)
-                            .values_list('publicacion_id', flat=True))
+        likes_usuario = likes.dados_por(request.user.datos.id, [publicacion.id])
 
     context = {
         'publicacion': publicacion,
@@ -348,50 +430,155 @@ def detalle_publicacion(request, publicacion_id):
     }
     return render(request, 'detalle_publicacion.html', context)
 
+# Cuántas notificaciones regresa cada consulta de la campana
+NOTIFICACIONES_POR_CONSULTA = 10
+
+
+def _turista_id(request):
+    # Se guarda en la sesión para no consultar Turista en cada sondeo
+    turista_id = request.session.get('turista_id')
+    if turista_id is None:
+        turista_id = request.session['turista_id'] = request.user.datos.id
+    return turista_id
+
+
+def _since_id(request):
+    try:
+        return max(int(request.GET.get('since_id', 0)), 0)
+    except ValueError:
+        return 0
+
+
+def _etag_notificaciones(turista_id, version, since_id):
+    # El cuerpo depende del cursor: dos since_id distintos no comparten ETag
+    return f'W/"{turista_id}-{version}-{since_id}"'
+
+
+def _sin_cambios(request, etag):
+    if request.headers.get('If-None-Match') == etag:
+        respuesta = HttpResponseNotModified()
+        respuesta['ETag'] = etag
+        return respuesta
+    return None
+
+
+def _consulta_notificaciones(turista_id, since_id):
+    # leida__in y no leida=False: SQLite no usa el índice con "NOT leida"
+    qs = Notificacion.objects.select_related('emisor__usuario').filter(receptor_id=turista_id, leida__in=[False])
+    if since_id:
+        qs = qs.filter(id__gt=since_id)
+    return qs.order_by('-fecha', '-id')[:NOTIFICACIONES_POR_CONSULTA]
+
+
+def _respuesta_notificaciones(filas, since_id, nuevas, etag):
+    data = [notificaciones.a_dict(n) for n in filas]
+    respuesta = JsonResponse({
+        'notificaciones': data,
+        'nuevas': max(nuevas, 0),
+        # Cursor para la siguiente consulta (?since_id=)
+        'ultimo_id': max([n.id for n in filas], default=since_id),
+    })
+    respuesta['ETag'] = etag
+    # El navegador revalida con If-None-Match en cada consulta
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
 @login_required
 def obtener_notificaciones(request):
     """
-    Obtiene únicamente las notificaciones NO LEÍDAS del usuario.
-    Cada una contiene su ícono, mensaje, tiempo y URL.
+    Notificaciones NO LEÍDAS del usuario, a partir de `since_id` si se indica.
+    Si no hay nada nuevo desde el último ETag responde 304 sin tocar la BD.
     """
-    qs = Notificacion.objects.filter(
-        receptor=request.user.datos,
-        leida=False  # 🔹 Solo las no leídas
-    ).order_by('-fecha')[:10]
-
-    data = []
-    for n in qs:
-        # La URL redirige a la vista que marca como leída y abre el destino
-        url = reverse('feed:abrir_notificacion', args=[n.id])
-
-        # Ícono según tipo
-        if n.tipo == 'like':
-            icono = 'bi-hand-thumbs-up-fill text-primary'
-        elif n.tipo == 'comentario':
-            icono = 'bi-chat-dots-fill text-success'
-        elif n.tipo == 'nuevo_seguidor':
-            icono = 'bi-person-plus-fill text-warning'
-        elif n.tipo == 'nueva_publicacion':
-            icono = 'bi-bell-fill text-info'
-        else:
-            icono = 'bi-bell'
-
-        texto = n.mensaje or "Tienes una nueva notificación"
-
-        data.append({
-            'id': n.id,
-            'mensaje': texto,
-            'texto': texto,  # compatibilidad para feed
-            'fecha': n.fecha.strftime('%d/%m/%Y %H:%M'),
-            'tiempo': timesince(n.fecha).split(',')[0] + " atrás",
-            'leida': n.leida,
-            'url': url,
-            'icono': icono,
-        })
-
-    nuevas = qs.count()  # 🔹 Solo cuenta las no leídas
-
-    return JsonResponse({'notificaciones': data, 'nuevas': nuevas})
+    turista_id = _turista_id(request)
+    since_id = _since_id(request)
+    etag = _etag_notificaciones(turista_id, notificaciones.version(turista_id), since_id)
+    sin_cambios = _sin_cambios(request, etag)
+    if sin_cambios:
+        return sin_cambios
+
+    qs = list(_consulta_notificaciones(turista_id, since_id))
+    nuevas = notificaciones.no_leidas(turista_id)  # 🔹 Total de no leídas, desde la caché
+
+    return _respuesta_notificaciones(qs, since_id, nuevas, etag)
+
+
+@login_required
+async def obtener_notificaciones_async(request):
+    """
+    Versión async de obtener_notificaciones para ASGI (ORM async de Django).
+    """
+    turista_id = await sync_to_async(_turista_id)(request)
+    since_id = _since_id(request)
+    etag = _etag_notificaciones(turista_id, await notificaciones.aversion(turista_id), since_id)
+    sin_cambios = _sin_cambios(request, etag)
+    if sin_cambios:
+        return sin_cambios
+
+    qs = [n async for n in _consulta_notificaciones(turista_id, since_id)]
+    nuevas = await notificaciones.ano_leidas(turista_id)
+
+    return _respuesta_notificaciones(qs, since_id, nuevas, etag)
+
+
+# Segundos entre latidos del SSE, para que los proxies no cierren la conexión
+LATIDO_EVENTOS = 20
+
+
+def _evento_sse(evento):
+    return f"id: {evento['id']}\nevent: notificacion\ndata: {json.dumps(evento)}\n\n"
+
+
+async def _flujo_eventos(turista_id, ultimo_id):
+    cola = eventos.suscribir(turista_id)
+    try:
+        yield "retry: 3000\n\n"
+
+        # Lo que se perdió mientras el navegador estaba desconectado
+        if ultimo_id:
+            perdidas = Notificacion.objects.select_related('emisor__usuario').filter(
+                receptor_id=turista_id, leida=False, id__gt=ultimo_id
+            ).order_by('id')[:NOTIFICACIONES_POR_CONSULTA]
+            async for n in perdidas:
+                yield _evento_sse(notificaciones.a_dict(n))
+
+        while True:
+            try:
+                evento = await asyncio.wait_for(cola.get(), LATIDO_EVENTOS)
+            except asyncio.TimeoutError:
+                yield ": latido\n\n"
+                continue
+            # Una notificación agrupada vuelve a llegar con el mismo id
+            yield _evento_sse(evento)
+    finally:
+        eventos.desuscribir(turista_id, cola)
+
+
+@login_required
+async def eventos_notificaciones(request):
+    """
+    Server-Sent Events con las notificaciones nuevas del usuario (solo ASGI).
+    Al reconectar, el navegador manda Last-Event-ID y se reenvía lo perdido.
+    """
+    turista_id = await sync_to_async(_turista_id)(request)
+    try:
+        ultimo_id = int(request.headers.get('Last-Event-ID') or 0)
+    except ValueError:
+        ultimo_id = 0
+
+    return StreamingHttpResponse(
+        _flujo_eventos(turista_id, ultimo_id),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+def eventos_no_disponibles(request):
+    """
+    Sin ASGI no hay SSE: con 204 el EventSource no reintenta y el navegador
+    sigue consultando obtener_notificaciones.
+    """
+    return HttpResponse(status=204)
 
 
 @login_required
@@ -399,17 +586,42 @@ def abrir_notificacion(request, notificacion_id):
     """
     Marca una notificación como leída y redirige a su destino.
     """
-    notificacion = get_object_or_404(Notificacion, id=notificacion_id, receptor=request.user.datos)
+    turista_id = _turista_id(request)
+    notificacion = get_object_or_404(
+        Notificacion.objects.select_related('perfil_usuario__usuario'),
+        id=notificacion_id, receptor_id=turista_id,
+    )
 
-    # 🔹 Marcar como leída
+    # 🔹 Marcar como leída (UPDATE solo de `leida`, y solo si no lo estaba)
     if notificacion.leida is False:
-        notificacion.leida = True
-        notificacion.save()
+        notificaciones.marcar_leidas(turista_id, ids=[notificacion.id])
 
     # 🔹 Redirigir según el tipo
-    if notificacion.tipo in ['like', 'comentario', 'nueva_publicacion'] and notificacion.publicacion:
-        return redirect('feed:detalle_publicacion', notificacion.publicacion.id)
+    if notificacion.tipo in ['like', 'comentario', 'nueva_publicacion'] and notificacion.publicacion_id:
+        return redirect('feed:detalle_publicacion', notificacion.publicacion_id)
     elif notificacion.tipo == 'nuevo_seguidor' and notificacion.perfil_usuario:
         return redirect('perfil_usuario', notificacion.perfil_usuario.usuario.username)
     else:
-        return redirect('feed:inicio')
\ No newline at end of file
+        return redirect('feed:inicio')
+
+
+@login_required
+@require_POST
+def marcar_notificaciones_leidas(request):
+    """
+    Marca como leídas varias notificaciones en una sola petición: las de id
+    <= `hasta`, las de `ids` (se puede repetir) o, sin parámetros, todas.
+    """
+    try:
+        hasta = int(request.POST['hasta']) if request.POST.get('hasta') else None
+        ids = [int(i) for i in request.POST.getlist('ids')] or None
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos.'}, status=400)
+
+    turista_id = _turista_id(request)
+    marcadas = notificaciones.marcar_leidas(turista_id, hasta=hasta, ids=ids)
+
+    return JsonResponse({
+        'marcadas': marcadas,
+        'nuevas': max(notificaciones.no_leidas(turista_id), 0),
+    })
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'red_social.settings')
+# Con ASGI se enrutan las vistas async (ver feed/urls.py)
+os.environ.setdefault('VISTAS_ASYNC', 'True')
 
 application = get_asgi_application()
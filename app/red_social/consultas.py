@@ -0,0 +1,125 @@
+"""
+Medición de consultas por petición: cuántas, cuánto tardó la BD y qué SQL se
+repite (el síntoma de un N+1, p. ej. un `{{ pub.turista }}` sin
+select_related dentro de un for).
+
+`MedicionConsultasMiddleware` agrega `Server-Timing` a cada respuesta (lo
+muestran las herramientas de desarrollo del navegador) y deja en el log las
+peticiones que se pasan del presupuesto o repiten una consulta. En las pruebas,
+`presupuesto_consultas` falla con la lista de SQL repetidas si una vista hace
+más consultas de las permitidas.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Consultas por petición a partir de las cuales se avisa en el log
+PRESUPUESTO = getattr(settings, 'CONSULTAS_PRESUPUESTO', 30)
+
+# Veces que puede repetirse la misma SQL (sin parámetros) antes de avisar
+REPETICIONES = getattr(settings, 'CONSULTAS_REPETICIONES', 5)
+
+
+class Medidor:
+    """
+    execute_wrapper que cuenta y cronometra todas las consultas del bloque
+    `medir()`, en todas las conexiones.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.duracion = 0.0
+        self.sqls = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duracion += time.perf_counter() - inicio
+            self.total += 1
+            self.sqls[sql] += 1
+
+    @contextmanager
+    def medir(self):
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(self))
+            yield self
+
+    def repetidas(self, minimo=REPETICIONES):
+        return [(sql, veces) for sql, veces in self.sqls.most_common() if veces >= minimo]
+
+    def server_timing(self, total):
+        return f'db;dur={self.duracion * 1000:.1f};desc="{self.total} consultas", total;dur={total * 1000:.1f}'
+
+
+class MedicionConsultasMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medidor = Medidor()
+        inicio = time.perf_counter()
+        with medidor.medir():
+            response = self.get_response(request)
+        return self.reportar(request, response, medidor, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medidor = Medidor()
+        inicio = time.perf_counter()
+        # Las conexiones son por hilo: el ORM async consulta desde el hilo de
+        # sync_to_async, así que el wrapper se instala (y se quita) ahí
+        pila = ExitStack()
+        await sync_to_async(pila.enter_context)(medidor.medir())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(pila.close)()
+        return self.reportar(request, response, medidor, time.perf_counter() - inicio)
+
+    def reportar(self, request, response, medidor, duracion):
+        response['Server-Timing'] = medidor.server_timing(duracion)
+
+        repetidas = medidor.repetidas()
+        if medidor.total > PRESUPUESTO or repetidas:
+            logger.warning(
+                "%s %s: %d consultas, %.1f ms en BD%s",
+                request.method, request.path, medidor.total, medidor.duracion * 1000,
+                ''.join(f"\n  {veces}x {sql}" for sql, veces in repetidas),
+            )
+        return response
+
+
+@contextmanager
+def presupuesto_consultas(maximo):
+    """
+    Para pruebas: falla si el bloque hace más de `maximo` consultas, mostrando
+    las que se repitieron.
+
+        with presupuesto_consultas(8):
+            self.client.get(reverse('inicio:feed'))
+    """
+    medidor = Medidor()
+    with medidor.medir():
+        yield medidor
+    if medidor.total > maximo:
+        detalle = ''.join(f"\n  {veces}x {sql}" for sql, veces in medidor.repetidas(minimo=2))
+        raise AssertionError(
+            f"{medidor.total} consultas, el presupuesto es {maximo}."
+            + (f" Repetidas:{detalle}" if detalle else '')
+        )
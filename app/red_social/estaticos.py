@@ -0,0 +1,48 @@
+"""
+Archivos estáticos para producción: nombres con hash (manifest) y copias
+precomprimidas .gz/.br junto a cada CSS/JS, para que Apache las sirva tal cual
+sin comprimir en cada petición. Brotli es opcional: sin el paquete solo se
+generan los .gz.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.svg', '.json', '.txt', '.map')
+
+# Por debajo de esto la compresión no compensa
+TAMANO_MINIMO = 256
+
+
+class ManifestComprimido(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for nombre in self.hashed_files.values():
+            if not nombre.endswith(EXTENSIONES_COMPRIMIBLES):
+                continue
+            with self.open(nombre) as archivo:
+                contenido = archivo.read()
+            if len(contenido) < TAMANO_MINIMO:
+                continue
+            for extension, comprimido in self._comprimir(contenido):
+                destino = nombre + extension
+                if self.exists(destino):
+                    self.delete(destino)
+                self._save(destino, ContentFile(comprimido))
+                yield nombre, destino, True
+
+    def _comprimir(self, contenido):
+        # mtime=0: el mismo archivo siempre produce los mismos bytes
+        yield '.gz', gzip.compress(contenido, compresslevel=9, mtime=0)
+        if brotli is not None:
+            yield '.br', brotli.compress(contenido, quality=11)
@@ -26,7 +26,7 @@ SECRET_KEY = 'django-insecure-eg8(aipu8s^1)7e(+pgjw^yf*)9!f$u8+hx@@psm7f3y44_pu$
 GOOGLE_MAPS_API_KEY = 
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = []
 
@@ -43,9 +43,12 @@ INSTALLED_APPS = [
     'usuarios',
     'feed',
     'mapa',   
+    'cola',
 ]
 
 MIDDLEWARE = [
+    # Cuenta las consultas de cada petición (Server-Timing y avisos de N+1)
+    'red_social.consultas.MedicionConsultasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,6 +95,31 @@ DATABASES = {
 
 
 
+# Cache
+# 'places' guarda las búsquedas a Google Places (LRU acotado por MAX_ENTRIES)
+
+# Con varios procesos (Apache, uvicorn, run_workers) la caché por defecto tiene
+# que ser compartida para que los contadores de notificaciones coincidan
+MEMCACHED_LOCATION = os.environ.get('MEMCACHED_LOCATION')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': MEMCACHED_LOCATION,
+    } if MEMCACHED_LOCATION else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'places': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'places',
+        'TIMEOUT': 60 * 60 * 6,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -128,11 +156,44 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# collectstatic deja aquí los archivos con hash y sus .gz/.br; Apache los sirve (ver apache/)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Cola de tareas local (manage.py run_workers)
+# Con COLA_SINCRONA las tareas se ejecutan en el mismo proceso al confirmar la transacción
+COLA_SINCRONA = os.environ.get('COLA_SINCRONA', 'False') == 'True'
+COLA_VISIBILIDAD = 300
+
+# Vistas async para búsqueda de lugares y notificaciones (asgi.py lo activa)
+VISTAS_ASYNC = os.environ.get('VISTAS_ASYNC', 'False') == 'True'
+
+# Broker de eventos SSE ('host:puerto', manage.py broker_eventos); sin él los
+# eventos solo llegan a las conexiones del mismo proceso
+EVENTOS_BROKER = os.environ.get('EVENTOS_BROKER')
+
+# Presupuesto de consultas por petición (red_social/consultas.py): más que
+# esto, o la misma SQL repetida CONSULTAS_REPETICIONES veces, se avisa en el log
+CONSULTAS_PRESUPUESTO = 30
+CONSULTAS_REPETICIONES = 5
 
 #Media
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Fotos y avatares se guardan una vez por contenido en media/blobs/ (ver feed/almacenamiento.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'feed.almacenamiento.AlmacenamientoPorContenido',
+    },
+    # En desarrollo se sirven directo de static/; en producción, con hash y precomprimidos
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'red_social.estaticos.ManifestComprimido'
+        ),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -0,0 +1,138 @@
+// Feed: botón "Cargar más", likes y campana de notificaciones
+
+document.addEventListener('DOMContentLoaded', () => {
+    const loadMoreBtn = document.getElementById('load-more');
+    const feedContainer = document.getElementById('feed-container');
+    if (!loadMoreBtn || !feedContainer) return;
+
+    loadMoreBtn.addEventListener('click', async () => {
+        const params = new URLSearchParams({
+            cursor: loadMoreBtn.dataset.cursor,
+            categoria: loadMoreBtn.dataset.categoria,
+        });
+        loadMoreBtn.disabled = true;
+        try {
+            const response = await fetch(`${loadMoreBtn.dataset.url}?${params}`);
+            if (!response.ok) throw new Error("Error al cargar publicaciones");
+            const data = await response.json();
+            feedContainer.insertAdjacentHTML('beforeend', data.html);
+            if (data.siguiente) {
+                loadMoreBtn.dataset.cursor = data.siguiente;
+            } else {
+                loadMoreBtn.style.display = 'none';
+            }
+        } catch (err) {
+            console.error('Error al cargar más publicaciones:', err);
+        } finally {
+            loadMoreBtn.disabled = false;
+        }
+    });
+});
+
+// Likes: delegado en el documento porque las tarjetas de "Cargar más" llegan después.
+// PUT da like y DELETE lo quita; son idempotentes, un doble clic no descuadra nada.
+document.addEventListener('click', async (e) => {
+    const button = e.target.closest('.btn-like');
+    if (!button || !button.dataset.url) return;
+    const csrf = document.cookie.split('; ').find(c => c.startsWith('csrftoken='));
+    try {
+        const response = await fetch(button.dataset.url, {
+            method: button.classList.contains('liked') ? 'DELETE' : 'PUT',
+            headers: {'X-CSRFToken': csrf ? csrf.split('=')[1] : ''},
+        });
+        if (!response.ok) return;
+        const data = await response.json();
+        button.classList.toggle('liked', data.liked);
+        button.closest('.like-section').querySelector('.like-count').textContent = `${data.total_likes} Likes`;
+    } catch (err) {
+        console.error('Error al dar like:', err);
+    }
+});
+
+document.addEventListener('DOMContentLoaded', () => {
+    const btnCampana = document.getElementById('btn-notificaciones');
+    const listaNotificaciones = document.getElementById('lista-notificaciones');
+    const contador = document.getElementById('contador-notificaciones');
+    if (!btnCampana || !listaNotificaciones) return;
+    let visible = false;
+    // Ids ya contados: una notificación agrupada vuelve a llegar con el mismo id
+    const vistas = new Set();
+
+    btnCampana.addEventListener('click', async () => {
+        visible = !visible;
+        listaNotificaciones.style.display = visible ? 'block' : 'none';
+        if (visible) await cargarNotificaciones();
+    });
+
+    async function cargarNotificaciones() {
+        try {
+            const response = await fetch(btnCampana.dataset.url);
+            if (!response.ok) throw new Error("Error al obtener notificaciones");
+            const data = await response.json();
+            listaNotificaciones.innerHTML = '';
+            if (data.notificaciones.length === 0) {
+                listaNotificaciones.innerHTML = '<div class="p-3 text-center text-muted">No tienes notificaciones</div>';
+                contador.textContent = '';
+                return;
+            }
+            listaNotificaciones.appendChild(botonMarcarLeidas(data.ultimo_id));
+            data.notificaciones.forEach(n => {
+                vistas.add(n.id);
+                const item = document.createElement('a');
+                item.href = n.url;
+                item.className = 'dropdown-item py-2 px-3 border-bottom';
+                item.innerHTML = `
+                    <div class="d-flex align-items-center">
+                        <i class="bi bi-${n.icono} me-2 text-primary"></i>
+                        <div>
+                            <div class="small fw-semibold">${n.texto}</div>
+                            <div class="small text-muted">${n.tiempo}</div>
+                        </div>
+                    </div>`;
+                listaNotificaciones.appendChild(item);
+            });
+            contador.textContent = data.nuevas > 0 ? data.nuevas : '';
+        } catch (err) {
+            console.error('Error al cargar notificaciones:', err);
+        }
+    }
+
+    // Una sola petición marca como leídas todas las que se están viendo
+    function botonMarcarLeidas(hasta) {
+        const boton = document.createElement('button');
+        boton.type = 'button';
+        boton.className = 'dropdown-item small text-end text-primary py-2 px-3 border-bottom';
+        boton.textContent = 'Marcar todas como leídas';
+        boton.addEventListener('click', async () => {
+            const csrf = document.cookie.split('; ').find(c => c.startsWith('csrftoken='));
+            try {
+                const response = await fetch(btnCampana.dataset.leidas, {
+                    method: 'POST',
+                    headers: {'X-CSRFToken': csrf ? csrf.split('=')[1] : ''},
+                    body: new URLSearchParams({hasta}),
+                });
+                if (!response.ok) throw new Error("Error al marcar notificaciones");
+                await cargarNotificaciones();
+            } catch (err) {
+                console.error('Error al marcar notificaciones:', err);
+            }
+        });
+        return boton;
+    }
+
+    cargarNotificaciones();
+
+    // Notificaciones en vivo por SSE; sin ASGI el servidor responde 204 y no se reintenta
+    if (window.EventSource && btnCampana.dataset.eventos) {
+        const fuente = new EventSource(btnCampana.dataset.eventos);
+        fuente.addEventListener('notificacion', (e) => {
+            const n = JSON.parse(e.data);
+            if (visible) {
+                cargarNotificaciones();
+            } else if (!vistas.has(n.id)) {
+                vistas.add(n.id);
+                contador.textContent = (parseInt(contador.textContent, 10) || 0) + 1;
+            }
+        });
+    }
+});
@@ -0,0 +1,183 @@
+// Perfil: paginación local, likes, eliminar publicación y notificaciones
+
+document.addEventListener('DOMContentLoaded', () => {
+    // ===== CARGAR MÁS =====
+    const items = document.querySelectorAll('.feed-item');
+    const loadMoreBtn = document.getElementById('load-more');
+    const itemsPerPage = 10;
+    let currentVisible = 10;
+
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', () => {
+            const next = currentVisible + itemsPerPage;
+            for (let i = currentVisible; i < next && i < items.length; i++) {
+                items[i].style.display = 'block';
+            }
+            currentVisible = next;
+            if (currentVisible >= items.length) loadMoreBtn.style.display = 'none';
+        });
+    }
+
+    // ===== LIKES =====
+    function getCookie(name) {
+        let cookieValue = null;
+        if (document.cookie && document.cookie !== '') {
+            document.cookie.split(';').forEach(cookie => {
+                const [k, v] = cookie.trim().split('=');
+                if (k === name) cookieValue = decodeURIComponent(v);
+            });
+        }
+        return cookieValue;
+    }
+
+    const csrftoken = getCookie('csrftoken');
+
+    document.querySelectorAll('.btn-like').forEach(button => {
+        button.addEventListener('click', async () => {
+            if (!button.dataset.url) return;
+
+            try {
+                // PUT da like y DELETE lo quita (idempotentes)
+                const response = await fetch(button.dataset.url, {
+                    method: button.classList.contains('liked') ? 'DELETE' : 'PUT',
+                    headers: {
+                        'X-CSRFToken': csrftoken,
+                        'X-Requested-With': 'XMLHttpRequest'
+                    }
+                });
+
+                if (response.ok) {
+                    const data = await response.json();
+                    const countElement = button.closest('.like-section').querySelector('.like-count');
+
+                    if (data.liked) {
+                        button.classList.add('liked');
+                    } else {
+                        button.classList.remove('liked');
+                    }
+
+                    countElement.textContent = `${data.total_likes} Likes`;
+                }
+            } catch (err) {
+                console.error('Error al dar like:', err);
+            }
+        });
+    });
+
+    // ===== ELIMINAR PUBLICACIÓN (SweetAlert2) =====
+    document.querySelectorAll('.btn-confirmar-eliminar').forEach(btn => {
+        btn.addEventListener('click', async e => {
+            e.preventDefault();
+            const form = btn.closest('form');
+
+            const result = await Swal.fire({
+                title: '¿Eliminar publicación?',
+                text: 'Esta acción no se puede deshacer.',
+                icon: 'warning',
+                showCancelButton: true,
+                confirmButtonColor: '#d33',
+                cancelButtonColor: '#6c757d',
+                confirmButtonText: 'Sí, eliminar',
+                cancelButtonText: 'Cancelar',
+                reverseButtons: true
+            });
+
+            if (result.isConfirmed) form.submit();
+        });
+    });
+
+    // ===== NOTIFICACIONES =====
+    const btn = document.getElementById('btn-notificaciones');
+    const lista = document.getElementById('lista-notificaciones');
+    const contador = document.getElementById('contador-notificaciones');
+
+    if (btn && lista && contador) {
+        btn.addEventListener('click', async () => {
+            if (lista.style.display === 'block') {
+                lista.style.display = 'none';
+                return;
+            }
+
+            try {
+                const res = await fetch(btn.dataset.url);
+                const data = await res.json();
+
+                lista.innerHTML = '';
+                if (data.notificaciones.length > 0) {
+                    // Una sola petición marca como leídas todas las que se están viendo
+                    const marcar = document.createElement('button');
+                    marcar.type = 'button';
+                    marcar.textContent = 'Marcar todas como leídas';
+                    marcar.style.cssText = 'display:block; width:100%; padding:8px 10px; border:0; border-bottom:1px solid #eee; background:none; color:#0d6efd; text-align:right;';
+                    marcar.addEventListener('click', async () => {
+                        await fetch(btn.dataset.leidas, {
+                            method: 'POST',
+                            headers: {'X-CSRFToken': csrftoken},
+                            body: new URLSearchParams({hasta: data.ultimo_id}),
+                        });
+                        lista.style.display = 'none';
+                        actualizarContador();
+                    });
+                    lista.appendChild(marcar);
+                }
+                data.notificaciones.forEach(n => {
+                    const item = document.createElement('a');
+                    item.href = n.url;
+                    item.style.display = 'block';
+                    item.style.textDecoration = 'none';
+                    item.style.color = 'black';
+                    item.innerHTML = `
+                        <div style="padding:10px; border-bottom:1px solid #eee;">
+                            <p style="margin:0;">${n.mensaje}</p>
+                            <small style="color:gray;">${n.fecha}</small>
+                        </div>
+                    `;
+                    lista.appendChild(item);
+                });
+
+                if (data.notificaciones.length === 0) {
+                    lista.innerHTML = '<p style="padding:10px; text-align:center;">No tienes notificaciones</p>';
+                }
+
+                lista.style.display = 'block';
+                contador.textContent = '';
+            } catch (err) {
+                console.error('Error cargando notificaciones:', err);
+            }
+        });
+
+        // Solo se piden las posteriores a la última vista; sin novedades el
+        // servidor responde 304 y el navegador reutiliza la respuesta anterior
+        let ultimoId = 0;
+
+        async function actualizarContador() {
+            try {
+                const res = await fetch(`${btn.dataset.url}?since_id=${ultimoId}`);
+                const data = await res.json();
+                ultimoId = data.ultimo_id;
+                contador.textContent = data.nuevas > 0 ? data.nuevas : '';
+            } catch (err) {
+                console.error('Error actualizando contador:', err);
+            }
+        }
+
+        actualizarContador();
+
+        // Con SSE el contador se actualiza al llegar cada notificación; si el
+        // servidor no lo ofrece (o se cierra) se vuelve a consultar cada 30 s
+        let sondeo = null;
+        const consultarCadaRato = () => {
+            if (!sondeo) sondeo = setInterval(actualizarContador, 30000);
+        };
+
+        if (window.EventSource && btn.dataset.eventos) {
+            const fuente = new EventSource(btn.dataset.eventos);
+            fuente.addEventListener('notificacion', actualizarContador);
+            fuente.addEventListener('error', () => {
+                if (fuente.readyState === EventSource.CLOSED) consultarCadaRato();
+            });
+        } else {
+            consultarCadaRato();
+        }
+    }
+});
@@ -0,0 +1,127 @@
+"""
+Grafo de seguidores en la caché.
+
+Por turista se guardan los ids de a quién sigue y de quién lo sigue como
+arreglos ordenados de enteros (array('L'), 4 u 8 bytes por id), así "¿A sigue
+a B?" o "¿a cuáles de estos sigue A?" se responden con búsqueda binaria sin
+tocar la BD. Las señales de Seguidor (feed/signals.py) borran los arreglos de
+los dos turistas al confirmar la transacción.
+
+Las listas de seguidores se paginan por keyset sobre el id de Seguidor (más
+recientes primero), así una cuenta con muchísimos seguidores cuesta lo mismo
+en la página 1 que en la 1000.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Seguidor
+
+DURACION = 60 * 60 * 24
+
+# Arreglos más grandes no se cachean (memcached guarda hasta 1 MB por clave)
+MAXIMO = 100_000
+
+# Marca para los arreglos que se pasan de MAXIMO
+GRANDE = 'grande'
+
+POR_PAGINA = 50
+
+# Dirección: (campo del turista, campo de los ids que se guardan)
+SIGUIENDO = ('turista_seguidor_id', 'turista_seguido_id')
+SEGUIDORES = ('turista_seguido_id', 'turista_seguidor_id')
+
+
+def _clave(direccion, turista_id):
+    return f'grafo:{direccion[0]}:{turista_id}'
+
+
+def _ids(direccion, turista_id):
+    """
+    Arreglo ordenado de ids, o None si es demasiado grande para la caché.
+    """
+    clave = _clave(direccion, turista_id)
+    guardado = cache.get(clave)
+    if guardado is None:
+        campo, otro = direccion
+        ids = array('L', sorted(
+            Seguidor.objects.filter(**{campo: turista_id}).values_list(otro, flat=True)[:MAXIMO + 1]
+        ))
+        guardado = GRANDE if len(ids) > MAXIMO else ids.tobytes()
+        cache.set(clave, guardado, DURACION)
+    if guardado == GRANDE:
+        return None
+    ids = array('L')
+    ids.frombytes(guardado)
+    return ids
+
+
+def _contiene(ids, pk):
+    i = bisect_left(ids, pk)
+    return i < len(ids) and ids[i] == pk
+
+
+def _lista(direccion, turista_id):
+    ids = _ids(direccion, turista_id)
+    if ids is None:
+        campo, otro = direccion
+        return list(Seguidor.objects.filter(**{campo: turista_id}).order_by(otro).values_list(otro, flat=True))
+    return ids
+
+
+def siguiendo(turista_id):
+    """
+    Ids a los que sigue `turista_id`, ordenados.
+    """
+    return _lista(SIGUIENDO, turista_id)
+
+
+def seguidores(turista_id):
+    """
+    Ids de quienes siguen a `turista_id`, ordenados.
+    """
+    return _lista(SEGUIDORES, turista_id)
+
+
+def sigue_a(turista_id, candidatos):
+    """
+    Subconjunto de `candidatos` a los que sigue `turista_id`.
+    """
+    candidatos = set(candidatos)
+    if not candidatos:
+        return set()
+    ids = _ids(SIGUIENDO, turista_id)
+    if ids is None:
+        return set(
+            Seguidor.objects.filter(turista_seguidor_id=turista_id, turista_seguido_id__in=candidatos)
+            .values_list('turista_seguido_id', flat=True)
+        )
+    return {pk for pk in candidatos if _contiene(ids, pk)}
+
+
+def sigue(turista_id, otro_id):
+    return otro_id in sigue_a(turista_id, [otro_id])
+
+
+def invalidar(seguidor_id, seguido_id):
+    # Al confirmar: antes, otra petición podría volver a cachear lo anterior
+    transaction.on_commit(lambda: cache.delete_many([
+        _clave(SIGUIENDO, seguidor_id), _clave(SEGUIDORES, seguido_id),
+    ]))
+
+
+def pagina(turista_id, direccion, cursor=None, por_pagina=POR_PAGINA):
+    """
+    Una página de relaciones de `turista_id` (SIGUIENDO o SEGUIDORES), con el
+    otro turista y su usuario cargados, y el cursor de la siguiente (o None).
+    """
+    campo, otro = direccion
+    relacion = otro.removesuffix('_id')
+    filas = Seguidor.objects.filter(**{campo: turista_id}).select_related(f'{relacion}__usuario')
+    if cursor:
+        filas = filas.filter(id__lt=cursor)
+    filas = list(filas.order_by('-id')[:por_pagina + 1])
+    siguiente = filas[por_pagina - 1].id if len(filas) > por_pagina else None
+    return filas[:por_pagina], siguiente
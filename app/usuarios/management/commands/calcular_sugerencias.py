@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from usuarios import sugerencias
+
+
+class Command(BaseCommand):
+    help = "Recalcula las sugerencias de \"Personas que quizá conozcas\" de todos los turistas, por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=sugerencias.TAMANO_LOTE,
+            help=f"Turistas por lote (por defecto {sugerencias.TAMANO_LOTE})."
+        )
+
+    def handle(self, *args, **options):
+        total = sugerencias.calcular_todos(options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"{total} sugerencias guardadas."))
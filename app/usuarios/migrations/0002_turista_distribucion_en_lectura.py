@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turista',
+            name='distribucion_en_lectura',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1 on 2026-10-18 15:41
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _conteo(modelo, campo_fk):
+    return Coalesce(
+        Subquery(
+            modelo.objects
+            .filter(**{campo_fk: OuterRef('pk')})
+            .order_by()
+            .values(campo_fk)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def calcular_contadores(apps, schema_editor):
+    Turista = apps.get_model('usuarios', 'Turista')
+    Seguidor = apps.get_model('usuarios', 'Seguidor')
+    Turista.objects.update(
+        seguidores_count=_conteo(Seguidor, 'turista_seguido'),
+        siguiendo_count=_conteo(Seguidor, 'turista_seguidor'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_turista_distribucion_en_lectura'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turista',
+            name='seguidores_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='turista',
+            name='siguiendo_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
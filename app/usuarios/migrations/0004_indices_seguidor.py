@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-18 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_turista_seguidores_count_turista_siguiendo_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='seguidor',
+            index=models.Index(fields=['turista_seguido', 'turista_seguidor'], name='seguidor_seguido_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1 on 2026-10-18 16:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0004_indices_seguidor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='seguidor',
+            index=models.Index(fields=['turista_seguido', '-id'], name='seguidores_recientes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seguidor',
+            index=models.Index(fields=['turista_seguidor', '-id'], name='siguiendo_recientes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turista',
+            index=models.Index(fields=['distribucion_en_lectura'], name='turista_en_lectura_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1 on 2026-10-18 16:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0005_grafo_seguidores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sugerencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntaje', models.FloatField()),
+                ('seguidos_en_comun', models.PositiveIntegerField(default=0)),
+                ('lugares_en_comun', models.PositiveIntegerField(default=0)),
+                ('fecha_calculo', models.DateTimeField(auto_now=True)),
+                ('sugerido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='usuarios.turista')),
+                ('turista', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sugerencias', to='usuarios.turista')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['turista', '-puntaje'], name='sugerencia_turista_puntaje_idx')],
+                'unique_together': {('turista', 'sugerido')},
+            },
+        ),
+    ]
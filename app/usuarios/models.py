@@ -6,6 +6,19 @@ class Turista(models.Model):
     foto_perfil = models.ImageField(upload_to='fotos_perfil/', blank=True,null=True)
     biografia = models.TextField(blank=True)
     fecha_nac = models.DateField()
+    # Cuentas con muchísimos seguidores: sus publicaciones no se copian a cada
+    # timeline, se mezclan al leer el feed (ver feed/timeline.py)
+    distribucion_en_lectura = models.BooleanField(default=False)
+    # Contadores desnormalizados, se mantienen con F() desde feed/contadores.py
+    seguidores_count = models.PositiveIntegerField(default=0)
+    siguiendo_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Lista de cuentas en lectura (pocas) que se cruza con el grafo al armar el feed
+            models.Index(fields=['distribucion_en_lectura'], name='turista_en_lectura_idx'),
+        ]
+
     def __str__(self):
         return self.usuario.username
     
@@ -26,6 +39,34 @@ class Seguidor(models.Model):
 
     class Meta:
         unique_together = ('turista_seguidor', 'turista_seguido')
+        indexes = [
+            # Seguidores de un turista (lista de seguidores y fan-out) sin leer la tabla
+            models.Index(fields=['turista_seguido', 'turista_seguidor'], name='seguidor_seguido_idx'),
+            # Listas paginadas por keyset (usuarios/grafo.py): más recientes primero
+            models.Index(fields=['turista_seguido', '-id'], name='seguidores_recientes_idx'),
+            models.Index(fields=['turista_seguidor', '-id'], name='siguiendo_recientes_idx'),
+        ]
 
 
+class Sugerencia(models.Model):
+    """
+    "Personas que quizá conozcas", precalculadas por usuarios/sugerencias.py.
+    """
+    turista = models.ForeignKey(Turista, related_name='sugerencias', on_delete=models.CASCADE)
+    sugerido = models.ForeignKey(Turista, related_name='+', on_delete=models.CASCADE)
+    puntaje = models.FloatField()
+    # Cuántos de los que sigue `turista` siguen a `sugerido`
+    seguidos_en_comun = models.PositiveIntegerField(default=0)
+    # Lugares reseñados por los dos
+    lugares_en_comun = models.PositiveIntegerField(default=0)
+    fecha_calculo = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        unique_together = ('turista', 'sugerido')
+        indexes = [
+            # Las mejores sugerencias de un turista en una sola lectura del índice
+            models.Index(fields=['turista', '-puntaje'], name='sugerencia_turista_puntaje_idx'),
+        ]
+
+    def __str__(self):
+        return f"Sugerencia de {self.sugerido_id} para {self.turista_id}"
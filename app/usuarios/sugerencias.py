@@ -0,0 +1,175 @@
+"""
+"Personas que quizá conozcas": amigos de amigos y lugares en común.
+
+Para un lote de turistas B se arman matrices dispersas de 0/1 y se
+multiplican:
+
+    F_B (B × intermedios) · F_I (intermedios × candidatos)
+        = cuántos de los que sigue cada b siguen a cada candidato
+    L_B (B × lugares) · L_C(candidatos × lugares)ᵀ
+        = cuántos lugares reseñaron los dos
+
+Solo se carga la vecindad del lote (a quién siguen, a quién siguen esos, y
+los RESENADORES_POR_LUGAR que reseñaron más recientemente sus lugares), así
+que el costo depende del lote y no del tamaño de la red ni de lo popular de
+un lugar. El resultado se guarda en `Sugerencia` y las páginas lo
+leen con una consulta sobre el índice (turista, -puntaje).
+
+`calcular_sugerencias` recorre a todos por lotes; al seguir a alguien o
+publicar se recalcula solo a ese turista, con una tarea en la cola.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from scipy import sparse
+
+from cola.registro import encolar
+from feed.models import Publicacion
+from .models import Seguidor, Sugerencia, Turista
+
+PESO_SEGUIDOS = 1.0
+PESO_LUGARES = 0.5
+
+# Sugerencias guardadas por turista
+POR_TURISTA = 20
+
+TAMANO_LOTE = 500
+
+# Publicaciones más recientes por lugar que cuentan para "lugares en común";
+# un lugar muy visitado no mete a todos sus visitantes como candidatos
+RESENADORES_POR_LUGAR = 200
+
+# Varios cambios seguidos del mismo turista se recalculan una sola vez
+ESPERA = timedelta(minutes=5)
+
+
+def _indices(ids):
+    return {pk: i for i, pk in enumerate(sorted(set(ids)))}
+
+
+def _matriz(pares, filas, columnas):
+    pares = list(pares)
+    i = np.fromiter((filas[a] for a, _ in pares), dtype=np.int32, count=len(pares))
+    j = np.fromiter((columnas[b] for _, b in pares), dtype=np.int32, count=len(pares))
+    return sparse.csr_matrix(
+        (np.ones(len(pares), dtype=np.float32), (i, j)), shape=(len(filas), len(columnas))
+    )
+
+
+def _lugares_de(turista_ids):
+    return set(
+        Publicacion.objects.filter(turista_id__in=turista_ids)
+        .values_list('turista_id', 'resena__lugar_turistico_id')
+        .distinct()
+    )
+
+
+def _resenadores_de(lugar_ids):
+    """
+    (turista, lugar) de las últimas RESENADORES_POR_LUGAR publicaciones de
+    cada lugar.
+    """
+    recientes = (
+        Publicacion.objects.filter(resena__lugar_turistico_id__in=lugar_ids)
+        .annotate(orden=Window(
+            RowNumber(),
+            partition_by=F('resena__lugar_turistico_id'),
+            order_by=[F('fecha_publicacion').desc(), F('id').desc()],
+        ))
+        .filter(orden__lte=RESENADORES_POR_LUGAR)
+        .values_list('turista_id', 'resena__lugar_turistico_id')
+    )
+    return set(recientes)
+
+
+def calcular(turista_ids):
+    """
+    Recalcula y guarda las sugerencias de `turista_ids`.
+    """
+    lote = _indices(turista_ids)
+    if not lote:
+        return 0
+
+    siguiendo = set(Seguidor.objects.filter(turista_seguidor_id__in=list(lote)).values_list(
+        'turista_seguidor_id', 'turista_seguido_id'
+    ))
+    intermedios = _indices(seguido for _, seguido in siguiendo)
+    de_intermedios = set(Seguidor.objects.filter(turista_seguidor_id__in=list(intermedios)).values_list(
+        'turista_seguidor_id', 'turista_seguido_id'
+    ))
+
+    lugares_lote = _lugares_de(list(lote))
+    lugares = _indices(lugar for _, lugar in lugares_lote)
+    lugares_otros = _resenadores_de(list(lugares))
+
+    candidatos = _indices(
+        {seguido for _, seguido in de_intermedios} | {turista for turista, _ in lugares_otros}
+    )
+    mutuos = comunes = sparse.csr_matrix((len(lote), len(candidatos)), dtype=np.float32)
+    if intermedios:
+        mutuos = (_matriz(siguiendo, lote, intermedios) @ _matriz(de_intermedios, intermedios, candidatos)).tocsr()
+    if lugares:
+        comunes = (_matriz(lugares_lote, lote, lugares) @ _matriz(lugares_otros, candidatos, lugares).T).tocsr()
+    puntajes = (PESO_SEGUIDOS * mutuos + PESO_LUGARES * comunes).tocsr()
+
+    ids_candidatos = np.array(sorted(candidatos), dtype=np.int64)
+    sugerencias = []
+    for turista_id, fila in lote.items():
+        inicio, fin = puntajes.indptr[fila], puntajes.indptr[fila + 1]
+        columnas, valores = puntajes.indices[inicio:fin], puntajes.data[inicio:fin]
+        elegidos = 0
+        # De mayor a menor puntaje, sin sí mismo ni a quien ya sigue
+        for k in np.argsort(-valores, kind='stable'):
+            sugerido = int(ids_candidatos[columnas[k]])
+            if sugerido == turista_id or (turista_id, sugerido) in siguiendo:
+                continue
+            sugerencias.append(Sugerencia(
+                turista_id=turista_id, sugerido_id=sugerido, puntaje=float(valores[k]),
+                seguidos_en_comun=int(mutuos[fila, columnas[k]]),
+                lugares_en_comun=int(comunes[fila, columnas[k]]),
+            ))
+            elegidos += 1
+            if elegidos == POR_TURISTA:
+                break
+
+    with transaction.atomic():
+        Sugerencia.objects.filter(turista_id__in=list(lote)).delete()
+        Sugerencia.objects.bulk_create(sugerencias)
+    return len(sugerencias)
+
+
+def calcular_todos(lote=TAMANO_LOTE):
+    """
+    Recalcula a todos los turistas, `lote` a la vez. Regresa cuántas
+    sugerencias se guardaron.
+    """
+    total, desde = 0, 0
+    while True:
+        ids = list(Turista.objects.filter(id__gt=desde).order_by('id').values_list('id', flat=True)[:lote])
+        if not ids:
+            return total
+        total += calcular(ids)
+        desde = ids[-1]
+
+
+def programar(turista_id):
+    """
+    Agenda el recálculo de `turista_id` (uno por ESPERA aunque cambie varias veces).
+    """
+    if cache.add(f'sugerencias:programado:{turista_id}', True, ESPERA.total_seconds()):
+        encolar('usuarios.tareas.calcular_sugerencias', espera=ESPERA, turista_ids=[turista_id])
+
+
+def para(turista_id, limite=5):
+    """
+    Las mejores sugerencias de `turista_id`, con el usuario sugerido cargado.
+    """
+    return list(
+        Sugerencia.objects.filter(turista_id=turista_id)
+        .select_related('sugerido__usuario')
+        .order_by('-puntaje')[:limite]
+    )
@@ -0,0 +1,11 @@
+"""
+Tareas de la app usuarios que se ejecutan en los trabajadores de la cola
+(`manage.py run_workers`).
+"""
+from cola.registro import tarea
+from . import sugerencias
+
+
+@tarea
+def calcular_sugerencias(turista_ids):
+    sugerencias.calcular(turista_ids)
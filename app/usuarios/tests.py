@@ -1,3 +1,108 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from feed.models import LugarTuristico, Publicacion, Resena
+from . import grafo, sugerencias
+from .models import Seguidor, Turista
+
+
+class ConRedDeSeguidores(TestCase):
+    """
+    Base con cinco turistas: turista0 sigue a los demás y ellos a él, y todos
+    reseñaron los mismos dos lugares.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        turistas = [
+            Turista.objects.create(
+                usuario=User.objects.create_user(f'turista{i}', password='clave-segura'), fecha_nac='1990-01-01'
+            )
+            for i in range(5)
+        ]
+        cls.turista = turistas[0]
+        cls.otros = turistas[1:]
+        Seguidor.objects.bulk_create(
+            Seguidor(turista_seguidor=cls.turista, turista_seguido=otro) for otro in cls.otros
+        )
+        Seguidor.objects.bulk_create(
+            Seguidor(turista_seguidor=otro, turista_seguido=cls.turista) for otro in cls.otros
+        )
+        lugares = LugarTuristico.objects.bulk_create(
+            LugarTuristico(nombre=f'Lugar {i}', ubicacion='Centro') for i in range(2)
+        )
+        resenas = Resena.objects.bulk_create(
+            Resena(lugar_turistico=lugar, descripcion='Bonito', fecha_visita=timezone.now(), calificacion=8)
+            for _ in turistas for lugar in lugares
+        )
+        Publicacion.objects.bulk_create(
+            Publicacion(turista=turistas[i // len(lugares)], resena=resena, categoria=resena.lugar_turistico.categoria)
+            for i, resena in enumerate(resenas)
+        )
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.turista.usuario)
+
+
+class GrafoSeguidoresTests(ConRedDeSeguidores):
+
+    def test_sigue_a_en_lote_desde_la_cache(self):
+        otros = [otro.id for otro in self.otros]
+        self.assertEqual(grafo.sigue_a(self.turista.id, otros + [self.turista.id]), set(otros))
+        self.assertEqual(list(grafo.seguidores(self.turista.id)), sorted(otros))
+        with self.assertNumQueries(0):
+            self.assertTrue(grafo.sigue(self.turista.id, otros[0]))
+            self.assertEqual(list(grafo.seguidores(self.turista.id)), sorted(otros))
+
+    def test_dejar_de_seguir_invalida(self):
+        otro = self.otros[0]
+        self.assertTrue(grafo.sigue(self.turista.id, otro.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('toggle_seguir', args=[otro.id]))
+        self.assertFalse(grafo.sigue(self.turista.id, otro.id))
+        self.assertNotIn(self.turista.id, grafo.seguidores(otro.id))
+
+    def test_pagina_por_keyset(self):
+        vistos, cursor = [], None
+        while True:
+            filas, cursor = grafo.pagina(self.turista.id, grafo.SEGUIDORES, cursor, por_pagina=3)
+            vistos += [fila.turista_seguidor_id for fila in filas]
+            if cursor is None:
+                break
+        self.assertEqual(sorted(vistos), sorted(grafo.seguidores(self.turista.id)))
+        self.assertEqual(len(vistos), len(set(vistos)))
+
+
+class SugerenciasTests(ConRedDeSeguidores):
+
+    def test_amigos_de_amigos_y_lugares(self):
+        uno, *resto = self.otros
+        sugerencias.calcular_todos(lote=2)
+
+        sugeridas = sugerencias.para(uno.id, limite=10)
+        # Sigue a turista0, que sigue a los demás; ni él mismo ni a quien ya sigue
+        self.assertEqual({s.sugerido_id for s in sugeridas}, {t.id for t in resto})
+        self.assertTrue(all(s.seguidos_en_comun == 1 and s.lugares_en_comun == 2 for s in sugeridas))
+        self.assertEqual([s.puntaje for s in sugeridas], sorted((s.puntaje for s in sugeridas), reverse=True))
+
+        self.client.force_login(uno.usuario)
+        self.assertContains(self.client.get(reverse('inicio:feed')), 'Personas que quizá conozcas')
+
+        # Al seguir a una sugerencia deja de aparecer
+        self.client.post(reverse('toggle_seguir', args=[resto[0].id]))
+        self.assertNotIn(resto[0].id, {s.sugerido_id for s in sugerencias.para(uno.id, limite=10)})
+
+    def test_solo_cuentan_los_resenadores_recientes_de_cada_lugar(self):
+        uno, dos, tres, cuatro = self.otros
+        with mock.patch.object(sugerencias, 'RESENADORES_POR_LUGAR', 2):
+            sugerencias.calcular([uno.id])
 
-# Create your tests here.
+        comunes = {s.sugerido_id: s.lugares_en_comun for s in sugerencias.para(uno.id, limite=10)}
+        # Las últimas dos publicaciones de cada lugar son de turista3 y turista4
+        self.assertEqual(comunes, {dos.id: 0, tres.id: 2, cuatro.id: 2})
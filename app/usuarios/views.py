@@ -1,6 +1,8 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from .forms import FormUser, FormTurista, FormEdicionUser, FormEdicionTurista, FormCambiarContrasena
-from feed.models import Publicacion, Like
+from feed import likes, tarjetas
+from feed.models import Publicacion
+from . import grafo, sugerencias
 from .models import Turista, Seguidor
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
@@ -64,41 +66,34 @@ def perfil_usuario(request, username):
     Muestra el perfil de cualquier usuario por su username.
     """
     # Obtener el turista correspondiente al username
-    turista = get_object_or_404(Turista, usuario__username=username)
+    turista = get_object_or_404(Turista.objects.select_related('usuario'), usuario__username=username)
 
     # Publicaciones con paginación
     publicaciones_qs = (
         Publicacion.objects
         .filter(turista=turista)
-        .select_related('resena__lugar_turistico')
-        .prefetch_related('resena__fotografias')
-        .order_by('-fecha_publicacion')
+        .order_by('-fecha_publicacion', '-id')
     )
     paginator = Paginator(publicaciones_qs, 5)
     page_number = request.GET.get('page')
     publicaciones = paginator.get_page(page_number)
+    # Tarjetas desde la caché; las relaciones se cargan solo para las que faltan
+    publicaciones.object_list = tarjetas.preparar(publicaciones.object_list)
 
-    # Seguidores y siguiendo
-    seguidores = Seguidor.objects.filter(turista_seguido=turista)
-    siguiendo = Seguidor.objects.filter(turista_seguidor=turista)
+    # Ver si el usuario actual sigue a este perfil (grafo en caché)
+    siguiendo_a_usuario = grafo.sigue(request.user.datos.id, turista.id)
 
-    # Ver si el usuario actual sigue a este perfil
-    siguiendo_a_usuario = Seguidor.objects.filter(
-        turista_seguidor=request.user.datos,
-        turista_seguido=turista
-    ).exists()
-
-    # IDs de publicaciones que el usuario ha likeado
-    likes_usuario = Like.objects.filter(turista=request.user.datos).values_list('publicacion_id', flat=True)
+    # IDs de las publicaciones de esta página que el usuario ha likeado
+    likes_usuario = likes.dados_por(request.user.datos.id, [pub.id for pub in publicaciones])
 
     context = {
         'turista': turista,
         'username': request.user.username,
         'publicaciones': publicaciones,
-        'seguidores': seguidores,
-        'siguiendo': siguiendo,
         'siguiendo_a_usuario': siguiendo_a_usuario,
         'likes_usuario': likes_usuario,  
+        # Solo en el perfil propio
+        'sugerencias': sugerencias.para(turista.id) if turista.usuario_id == request.user.id else [],
     }
 
     return render(request, 'perfil_usuario.html', context)
@@ -112,22 +107,23 @@ def seguidores(request, username=None):
     else:
         turista = request.user.datos
 
+    # Listas por keyset (más recientes primero), cada una con su cursor
+    try:
+        cursor_siguiendo = int(request.GET.get('siguiendo') or 0)
+        cursor_seguidores = int(request.GET.get('seguidores') or 0)
+    except ValueError:
+        cursor_siguiendo = cursor_seguidores = 0
+
     # Personas que este usuario sigue
-    lista_siguiendo = (
-        Seguidor.objects.filter(turista_seguidor=turista)
-        .select_related('turista_seguido__usuario')
-    )
+    lista_siguiendo, siguiente_siguiendo = grafo.pagina(turista.id, grafo.SIGUIENDO, cursor_siguiendo)
 
     # Personas que siguen a este usuario
-    lista_seguidores = (
-        Seguidor.objects.filter(turista_seguido=turista)
-        .select_related('turista_seguidor__usuario')
-    )
+    lista_seguidores, siguiente_seguidores = grafo.pagina(turista.id, grafo.SEGUIDORES, cursor_seguidores)
 
-    # Lista de IDs de usuarios que el usuario logueado sigue
-    siguiendo_ids = set(
-        Seguidor.objects.filter(turista_seguidor=request.user.datos)
-        .values_list('turista_seguido__id', flat=True)
+    # De los que aparecen en la página, a cuáles sigue el usuario logueado
+    siguiendo_ids = grafo.sigue_a(
+        request.user.datos.id,
+        [s.turista_seguido_id for s in lista_siguiendo] + [s.turista_seguidor_id for s in lista_seguidores],
     )
 
     context = {
@@ -135,6 +131,8 @@ def seguidores(request, username=None):
         'seguidores': lista_seguidores,
         'siguiendo': lista_siguiendo,
         'siguiendo_ids': siguiendo_ids,
+        'siguiente_siguiendo': siguiente_siguiendo,
+        'siguiente_seguidores': siguiente_seguidores,
         'username': request.user.username,
     }
 
@@ -144,19 +142,21 @@ def seguidores(request, username=None):
 
 @login_required
 def toggle_seguir(request, turista_id):
-    turista_a_seguir = get_object_or_404(Turista, id=turista_id)
+    turista_a_seguir = get_object_or_404(Turista.objects.select_related('usuario'), id=turista_id)
     turista_actual = request.user.datos
 
     if turista_actual == turista_a_seguir:
         return redirect('perfil_usuario',turista_a_seguir.usuario.username)  
 
-    relacion, creado = Seguidor.objects.get_or_create(
-        turista_seguidor=turista_actual,
-        turista_seguido=turista_a_seguir
-    )
+    # Los contadores de seguidores/siguiendo se actualizan en las señales, dentro de esta transacción
+    with transaction.atomic():
+        relacion, creado = Seguidor.objects.get_or_create(
+            turista_seguidor=turista_actual,
+            turista_seguido=turista_a_seguir
+        )
 
-    if not creado:  
-        relacion.delete()
+        if not creado:  
+            relacion.delete()
 
     return redirect('perfil_usuario', turista_a_seguir.usuario.username)
 